@@ -9,4 +9,5 @@ setuptools.setup(
     packages=setuptools.find_packages("src"),
     provides=setuptools.find_packages("src"),
     install_requires=open("requirements.txt").readlines(),
+    entry_points={"console_scripts": ["ns-behave=ns_behave.runner:main"]},
 )
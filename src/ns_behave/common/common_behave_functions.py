@@ -1,16 +1,28 @@
 """All common behave functions that are used in behave frameworks"""
 # Ignoring prints in this file
 # flake8: noqa
+import asyncio
+from functools import lru_cache
 import logging
 import re
+from string import Formatter
+from typing import Any, Awaitable, Dict, List, Optional, Tuple, Union
 
 import ansicolor
 from behave.runner import Context
+from ns_behave.common.json_path import JsonPath, JsonPathIndex, KeyedCollectionIndex
+from ns_requests.async_requests import AsyncGenericRequests
+from ns_requests.generic_requests import GenericRequests
+from ns_requests.json_response import JsonResponseView
+from ns_requests.payload_templates import JsonBody, PayloadTemplateLibrary
 from requests import Session
 
 # Initialize a logger
 LOGGER = logging.getLogger(__name__)
 
+# Placeholder names that are interpolated from the context
+_TEMPLATE_FIELD = re.compile(r"[.,\w-]+")
+
 
 class CommonBehave:
     """Class for all static common behave functions"""
@@ -22,6 +34,9 @@ class CommonBehave:
         This function will parse out variable names with the following regex: {.*} taking all chars between braces
         If the string value read in is None at the start -> return None
 
+        Each string is parsed once into a template of its literal text and placeholders that is
+        reused on later calls, so rendering only looks up the placeholders on the context.
+
         Args:
             ctx: behave context that holds our attribute and value
             value: the string to traverse for attributes on the context
@@ -32,24 +47,202 @@ class CommonBehave:
         """
         if value is None:
             return None
-        else:
-            # Parse and replace any dimension-measure names that use "." notation,
-            # since Python would otherwise throw an error trying to receive properties for a
-            # non-existent object during string interpolation
-            parameters = re.findall(r"\{([.,\w-]+)\}", value)
-            for parameter in parameters:
-                if "." in parameter:
-                    dm_id = ctx.dimensions_measures_map[parameter]
-                    value = value.replace("{" + parameter + "}", dm_id)
-
-            # Replace the rest with properties on the context
-            namespace = {param: getattr(ctx, param) for param in parameters}
-            return value.format(**namespace)
+        # Strings without braces can never be changed by interpolation
+        if "{" not in value and "}" not in value:
+            return value
+        template = CommonBehave._compile_template(value)
+        if template is None:
+            return CommonBehave._format_context_attributes(ctx, value)
+        parts = []
+        for literal, parameter in template:
+            parts.append(literal)
+            if parameter is None:
+                continue
+            # Dimension-measure names use "." notation and are looked up in their own map
+            if "." in parameter:
+                parts.append(ctx.dimensions_measures_map[parameter])
+            else:
+                parts.append(format(getattr(ctx, parameter), ""))
+        return "".join(parts)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _compile_template(
+        value: str
+    ) -> Optional[Tuple[Tuple[str, Optional[str]], ...]]:
+        """Parse a string into the literal text and context attribute name of its placeholders
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            value: the string to parse
+
+        Returns:
+            A tuple of (literal text, attribute name or None) pairs in order. None if the string
+            has placeholders that only str.format can render, like escaped braces, positional
+            fields, format specs or conversions
+
+        """
+        if "{{" in value or "}}" in value:
+            return None
+        template = []
+        try:
+            for literal, field, format_spec, conversion in Formatter().parse(value):
+                if field is None:
+                    template.append((literal, None))
+                elif (
+                    _TEMPLATE_FIELD.fullmatch(field)
+                    and not field.isdigit()
+                    and not format_spec
+                    and conversion is None
+                ):
+                    template.append((literal, field))
+                else:
+                    return None
+        except ValueError:
+            return None
+        return tuple(template)
+
+    @staticmethod
+    def _format_context_attributes(ctx: Context, value: str) -> str:
+        """Interpolate context attributes into a string with str.format
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            ctx: behave context that holds our attribute and value
+            value: the string to traverse for attributes on the context
+
+        Returns:
+            the new string with all context vars replaced with values
+
+        """
+        # Parse and replace any dimension-measure names that use "." notation,
+        # since Python would otherwise throw an error trying to receive properties for a
+        # non-existent object during string interpolation
+        parameters = re.findall(r"\{([.,\w-]+)\}", value)
+        for parameter in parameters:
+            if "." in parameter:
+                dm_id = ctx.dimensions_measures_map[parameter]
+                value = value.replace("{" + parameter + "}", dm_id)
+
+        # Replace the rest with properties on the context
+        namespace = {param: getattr(ctx, param) for param in parameters}
+        return value.format(**namespace)
+
+    @staticmethod
+    def render_payload_template(
+        ctx: Context, name: str, values: Dict[str, Any] = None
+    ) -> JsonBody:
+        """Render a payload template from the directory set by the `payload_template_dir` user data value
+
+        The directory is loaded once per process. Placeholders are filled from the given values
+        first and then from the context the same way as interpolate_context_attributes.
+
+        Args:
+            ctx: The behave context
+            name: The name of the template. Its path relative to the directory without the extension
+            values: (OPTIONAL) Values of placeholders that override the context
+
+        Returns:
+            The JsonBody object of the rendered payload
+
+        """
+        library = PayloadTemplateLibrary.for_directory(
+            ctx.config.userdata.get("payload_template_dir", "payload_templates")
+        )
+        values = values or {}
+
+        def lookup(placeholder: str) -> Any:
+            if placeholder in values:
+                return values[placeholder]
+            if "." in placeholder:
+                return ctx.dimensions_measures_map[placeholder]
+            return getattr(ctx, placeholder)
+
+        return library.get(name).render(lookup)
+
+    @staticmethod
+    def get_response_json(ctx: Context) -> Any:
+        """Get the decoded JSON body of the response saved on the behave context
+
+        The body is decoded once per response and shared by every step that reads it. A new
+        response saved on the context is decoded again the first time it is read.
+
+        NOTE: The decoded body is shared, so it must not be modified in place.
+
+        Args:
+            ctx: The behave context
+
+        Returns:
+            The decoded JSON body of ctx.response
+
+        """
+        return JsonResponseView.of(ctx.response).json()
+
+    @staticmethod
+    def find_in_response(ctx: Context, expression: str) -> Union[List[Any], bool]:
+        """Find the values at a JSONPath expression in the response saved on the behave context
+
+        Plain paths are resolved through a flattened index of the response that is built on the
+        first lookup and reused for the rest of the lookups on that response. The number of levels
+        indexed is set by the `json_path_index_depth` user data value (default 4, 0 disables it).
+
+        Args:
+            ctx: The behave context
+            expression: The JSONPath expression
+
+        Returns:
+            The list of values found, or False if nothing was found (the same as jsonpath)
+
+        """
+        compiled = JsonPath.compile(expression)
+        document = CommonBehave.get_response_json(ctx)
+        depth = int(ctx.config.userdata.get("json_path_index_depth", 4))
+        if not compiled.is_plain or depth <= 0:
+            return compiled.find(document)
+        view = JsonResponseView.of(ctx.response)
+        index = view.derived.get("path_index")
+        if index is None:
+            index = view.derived["path_index"] = JsonPathIndex(document, depth)
+        return index.find(compiled)
+
+    @staticmethod
+    def get_keyed_collection_index(
+        ctx: Context, json_key: Optional[str], key: str
+    ) -> Optional[KeyedCollectionIndex]:
+        """Get the index of a collection in the response by the values at a key of its objects
+
+        The index is built on first use and reused for the rest of the lookups on that response.
+
+        Args:
+            ctx: The behave context
+            json_key: The json path key of the collection. The root of the response if None
+            key: The key of the objects in the collection to index
+
+        Returns:
+            The KeyedCollectionIndex object, or None if there is no collection at the json key
+
+        """
+        indexes = JsonResponseView.of(ctx.response).derived.setdefault(
+            "keyed_collection_indexes", {}
+        )
+        if (json_key, key) not in indexes:
+            list_of_values = JsonPath.find(
+                CommonBehave.get_response_json(ctx), json_key or "."
+            )
+            indexes[json_key, key] = (
+                KeyedCollectionIndex(list_of_values[0], key) if list_of_values else None
+            )
+        return indexes[json_key, key]
 
     @staticmethod
     def get_test_user_client(ctx: Context, user: str) -> Session:
         """Get a user session object form the test_users dict in the behave context
 
+        The session is pooled by the GenericRequests session manager under the gateway host and user
+        so it is tuned with the shared connection pool settings.
+
         Args:
             ctx: The behave context
             user: The user to get the session for
@@ -60,12 +253,74 @@ class CommonBehave:
         """
         test_users = getattr(ctx, "test_users")
         if user in test_users:
-            return test_users[user]["client"]
+            client = test_users[user]["client"]
+            if hasattr(ctx, "gateway_base_url"):
+                GenericRequests.session_manager.register_session(
+                    ctx.gateway_base_url, client, user=user
+                )
+            return client
         else:
             raise Exception(
                 f"The session for user: {user} was not found stored on the behave context."
             )
 
+    @staticmethod
+    def get_async_requests(ctx: Context) -> AsyncGenericRequests:
+        """Get the asyncio request engine owned by the behave context
+
+        The engine and its event loop are created on first use and saved to the context as
+        `async_requests` and `event_loop`. Both are closed when the context layer they were
+        created in is cleaned up.
+
+        Args:
+            ctx: The behave context
+
+        Returns:
+            The AsyncGenericRequests engine bound to the context event loop
+
+        """
+        if not hasattr(ctx, "event_loop"):
+            LOGGER.debug("Creating an event loop and asyncio request engine on context")
+            ctx.event_loop = asyncio.new_event_loop()
+            ctx.async_requests = AsyncGenericRequests()
+            ctx.add_cleanup(
+                CommonBehave._close_event_loop, ctx.event_loop, ctx.async_requests
+            )
+        return ctx.async_requests
+
+    @staticmethod
+    def run_async(ctx: Context, *awaitables: Awaitable) -> List[Any]:
+        """Run awaitables concurrently on the event loop owned by the behave context
+
+        Args:
+            ctx: The behave context
+            awaitables: The coroutines to gather on the event loop
+
+        Returns:
+            The results of the awaitables in the order they were read in
+
+        """
+        CommonBehave.get_async_requests(ctx)
+
+        async def gather_awaitables() -> List[Any]:
+            return await asyncio.gather(*awaitables)
+
+        return ctx.event_loop.run_until_complete(gather_awaitables())
+
+    @staticmethod
+    def _close_event_loop(
+        loop: asyncio.AbstractEventLoop, engine: AsyncGenericRequests
+    ) -> None:
+        """Close an asyncio request engine and the event loop it runs on
+
+        Args:
+            loop: The event loop to close
+            engine: The asyncio request engine to close
+
+        """
+        loop.run_until_complete(engine.close())
+        loop.close()
+
     @staticmethod
     def get_test_user_id(ctx: Context, user: str) -> str:
         """Get a user id from the test_users dict in the behave context
@@ -6,12 +6,27 @@ very specific actions should be kept somewhere else.
 """
 # Ignoring prints in this file
 # flake8: noqa
+import io
 import logging
+import os
+import re
+import sys
+import time
+import traceback
+from typing import Iterable
 
 import ansicolor
-from behave.model import Feature, Scenario
-from behave.runner import Context
+from behave.model import Feature, Scenario, Step
+from behave.model_core import Status
+from behave.runner import Context, ModelRunner
 import coloredlogs
+from ns_behave.common.parallel_examples import ParallelExamples
+from ns_behave.common.step_index import StepIndex
+from ns_requests.cassette import Cassette
+from ns_requests.generic_requests import GenericRequests
+from ns_requests.prewarm import ConnectionPrewarmer, DnsCache
+from ns_requests.request_logging import BodyLog
+from ns_requests.request_timing import RequestTimingLog
 
 # initialize a logger
 LOGGER = logging.getLogger(__name__)
@@ -75,6 +90,9 @@ def setup_logging(ctx: Context) -> None:
 def set_user_data(ctx: Context) -> None:
     """Grabs behave user data from the config file and saves it to the context
 
+    The `log_body_limit` user data value sets the maximum number of characters of a request or
+    response body written to the debug log (default 10000, 0 logs whole bodies).
+
     Args:
         ctx: The behave context
 
@@ -82,9 +100,256 @@ def set_user_data(ctx: Context) -> None:
     LOGGER.debug("Setting user data from the behave.ini config")
     user_data = ctx.config.userdata
     ctx.environment = user_data.get("environment", "ci")
+    GenericRequests.log_body_limit = int(user_data.get("log_body_limit", 10000))
     LOGGER.debug(f"User data: {user_data}")
 
 
+def prewarm_connections(
+    ctx: Context, urls: Iterable[str] = None
+) -> ConnectionPrewarmer:
+    """Resolve and open pooled connections to every service host on a background thread
+
+    Call this at the end of `before_all` so the work overlaps with behave parsing the features,
+    and stop_prewarm in the `after_all` hook.
+    The hosts are the gateway base URL on the context, every user data value whose name ends with
+    `_base_url` and the comma separated `prewarm_urls` user data value.
+
+    DNS results are cached for the rest of the run for `dns_cache_ttl` seconds (user data, default
+    300, 0 disables the cache). The number of connections opened to each host is set by the
+    `prewarm_connections` user data value (default 1).
+
+    Args:
+        ctx: The behave context
+        urls: (OPTIONAL) The URLs to prewarm instead of the configured ones
+
+    Returns:
+        The ConnectionPrewarmer, also saved on the context as prewarmer. Its stats() give the
+        latency the prewarm saved
+
+    """
+    user_data = ctx.config.userdata
+    if urls is None:
+        urls = [getattr(ctx, "gateway_base_url", None)]
+        urls.extend(
+            value for name, value in user_data.items() if name.endswith("_base_url")
+        )
+        urls.extend(url.strip() for url in user_data.get("prewarm_urls", "").split(","))
+    ttl = float(user_data.get("dns_cache_ttl", 300))
+    if ttl > 0:
+        ctx.dns_cache = DnsCache(ttl)
+        ctx.dns_cache.install()
+    ctx.prewarmer = ConnectionPrewarmer(
+        urls,
+        GenericRequests.session_manager,
+        connections_per_host=int(user_data.get("prewarm_connections", 1)),
+    ).start()
+    LOGGER.debug(f"Prewarming connections to: {ctx.prewarmer.urls}")
+    return ctx.prewarmer
+
+
+def stop_prewarm(ctx: Context) -> None:
+    """Wait for the prewarm started by prewarm_connections and restore DNS resolution
+
+    Call this in the `after_all` hook. The DNS cache is removed from socket.getaddrinfo.
+
+    Args:
+        ctx: The behave context
+
+    """
+    prewarmer = getattr(ctx, "prewarmer", None)
+    if prewarmer is not None:
+        prewarmer.wait(prewarmer.timeout)
+        LOGGER.debug(f"Connection prewarm: {prewarmer.stats()}")
+    dns_cache = getattr(ctx, "dns_cache", None)
+    if dns_cache is not None:
+        dns_cache.uninstall()
+        LOGGER.debug(f"DNS cache: {dns_cache.stats()}")
+
+
+def print_request_timing_summary(ctx: Context) -> None:
+    """Print the latency summary of every endpoint requested during the run
+
+    Call this in the `after_all` hook. Ids in the URL paths are collapsed so every request to the
+    same endpoint is summarized together.
+
+    Args:
+        ctx: The behave context
+
+    """
+    summary = RequestTimingLog.summary()
+    if not summary:
+        return
+    print(ansicolor.yellow("\nRequest latency by endpoint (ms):"))  # noqa
+    print(  # noqa
+        f"  {'count':>7} {'mean':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}  endpoint"
+    )
+    for (method, endpoint), stats in summary.items():
+        print(  # noqa
+            f"  {stats['count']:>7} {stats['mean']:>9.1f} {stats['p50']:>9.1f} {stats['p90']:>9.1f}"
+            f" {stats['p99']:>9.1f} {stats['max']:>9.1f}  {method} {endpoint}"
+        )
+    LOGGER.debug(f"Request latency by endpoint: {summary}")
+
+
+def start_body_log(ctx: Context, scenario: Scenario) -> None:
+    """Write the full request and response bodies of a scenario to its own file
+
+    Call this in the `before_scenario` hook and stop_body_log in the `after_scenario` hook. Nothing
+    is written unless the `body_log_dir` user data value is set. The bodies are written on a
+    background thread so sending requests is not slowed down.
+
+    Args:
+        ctx: The behave context
+        scenario: The behave scenario
+
+    """
+    directory = ctx.config.userdata.get("body_log_dir")
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    file_name = re.sub(r"[^\w-]+", "_", f"{scenario.feature.name}-{scenario.name}")
+    path = os.path.join(directory, f"{file_name}.log")
+    GenericRequests.body_log = BodyLog(path)
+    LOGGER.debug(f"Writing the request and response bodies of the scenario to: {path}")
+
+
+def stop_body_log(ctx: Context) -> None:
+    """Finish writing the bodies of the scenario started by start_body_log
+
+    Args:
+        ctx: The behave context
+
+    """
+    body_log = GenericRequests.body_log
+    if body_log is not None:
+        GenericRequests.body_log = None
+        body_log.close()
+
+
+def start_cassette(ctx: Context) -> None:
+    """Record every REST request of the run to a cassette, or answer them from one
+
+    Call this in the `before_all` hook and stop_cassette in the `after_all` hook. Nothing is
+    recorded or replayed unless the `cassette` user data value is set to the cassette file. The
+    other user data values are:
+    - cassette_mode: record or replay (default replay)
+    - cassette_match_on: The comma separated request parts to match on (default method,url,body)
+    - cassette_unmatched: What to do with unrecorded requests. error, passthrough or record
+      (default error)
+
+    Args:
+        ctx: The behave context
+
+    """
+    user_data = ctx.config.userdata
+    path = user_data.get("cassette")
+    if not path:
+        return
+    ctx.cassette = Cassette(
+        path,
+        mode=user_data.get("cassette_mode", "replay"),
+        match_on=[
+            part.strip()
+            for part in user_data.get("cassette_match_on", "method,url,body").split(",")
+        ],
+        unmatched=user_data.get("cassette_unmatched", "error"),
+    )
+    GenericRequests.cassette = ctx.cassette
+    LOGGER.debug(f"Using the cassette: {path} in {ctx.cassette.mode} mode")
+
+
+def stop_cassette(ctx: Context) -> None:
+    """Write the index of the cassette started by start_cassette
+
+    Args:
+        ctx: The behave context
+
+    """
+    cassette = GenericRequests.cassette
+    if cassette is None:
+        return
+    GenericRequests.cassette = None
+    cassette.close()
+    print(  # noqa
+        ansicolor.yellow(
+            f"\nCassette {cassette.path}: {cassette.recorded} recorded, "
+            f"{cassette.replayed} replayed, {cassette.missed} unmatched"
+        )
+    )
+
+
+def run_parallel_examples(ctx: Context, feature: Feature) -> None:
+    """Run the example rows of Scenario Outlines tagged @parallel_examples on worker threads
+
+    Call this in the `before_feature` hook. Every row runs with its own copy of the context and
+    the results are reported in row order. The number of rows run at once is set by the
+    `parallel_example_workers` user data value (default 8).
+
+    The rows are run one after another while a body log (`body_log_dir`) or cassette is used,
+    because they are shared by every request of the process.
+
+    Args:
+        ctx: The behave context
+        feature: The behave feature
+
+    """
+    if not ParallelExamples.tagged_outlines(feature):
+        return
+    if ctx.config.userdata.get("body_log_dir") or GenericRequests.cassette:
+        LOGGER.warning(
+            "Running @parallel_examples rows one after another since the body log or cassette is used"
+        )
+        return
+    ParallelExamples.enable(
+        ctx,
+        feature,
+        workers=int(ctx.config.userdata.get("parallel_example_workers", 8)),
+    )
+
+
+def index_step_definitions(ctx: Context) -> StepIndex:
+    """Dispatch every step through an index of the step definitions by the first word of the step
+
+    Call this in the `before_all` hook. The step definition resolved for a step line is memoized
+    for the `step_index_cache_size` user data value of step lines (default 4096). The StepIndex is
+    saved on the context as step_index, see print_ambiguous_steps.
+
+    Args:
+        ctx: The behave context
+
+    Returns:
+        The StepIndex object
+
+    """
+    ctx.step_index = StepIndex.install(
+        ctx, cache_size=int(ctx.config.userdata.get("step_index_cache_size", 4096))
+    )
+    return ctx.step_index
+
+
+def print_ambiguous_steps(ctx: Context) -> None:
+    """Print the step lines of the run that match more than one step definition
+
+    Call this in the `after_all` hook after index_step_definitions was called in `before_all`.
+
+    Args:
+        ctx: The behave context
+
+    """
+    step_index = getattr(ctx, "step_index", None)
+    if step_index is None:
+        return
+    LOGGER.debug(f"Step index: {step_index.stats()}")
+    ambiguous = step_index.ambiguous_steps()
+    if not ambiguous:
+        return
+    print(ansicolor.yellow("\nSteps matching more than one step definition:"))  # noqa
+    for step_line, patterns in ambiguous.items():
+        print(f"  {step_line}")  # noqa
+        for position, pattern in enumerate(patterns):
+            print(f"    {'used' if position == 0 else 'shadowed'}: {pattern}")  # noqa
+
+
 def run_setup_tags(ctx: Context, feature: Feature) -> None:
     """Handles setup and teardown tags on scenarios in feature files.
 
@@ -152,28 +417,121 @@ def run_teardown_tags(ctx: Context, feature: Feature) -> None:
 def execute_scenario_by_steps(ctx: Context, scenario: Scenario) -> None:
     """Step executor for setup and teardown tagged scenarios
 
+    The parsed steps of the scenario (with their tables and text) are dispatched straight to their
+    matched step functions, the same way behave runs the steps of a scenario, without turning them
+    back into Gherkin text for `ctx.execute_steps` to parse again. The steps are printed with their
+    durations in a single write once they are done.
+
     Args:
         ctx: The behave context
         scenario: The behave scenario object
 
     """
-    # Set an empty list of steps to run
-    parsed_steps = []
-    # For each step put the step in the parsed list
-    for step in scenario.steps:
-        parsed_steps.append(f"{step.keyword} {step.name}")
-        # check to see if we have a table with our step. If we do make sure we put the headings
-        # and rows into the parsed steps list so we execute the full step
-        if step.table:
-            heading_string = ""
-            for heading in step.table.headings:
-                heading_string += f"{heading}|"
-            parsed_steps.append(f"|{heading_string}")
-            for row in step.table.rows:
-                row_string = "|".join(row.cells)
-                parsed_steps.append(f"|{row_string}|")
-    steps_string = "\n".join(parsed_steps)
-    for step in parsed_steps:
-        print(ansicolor.green(f"    {step}"))  # noqa
-    print("\n")  # noqa
-    ctx.execute_steps(steps_string)
+    runner = ctx._runner
+    # Save the text and table of the step or hook that runs the scenario so they can be restored
+    original_table = getattr(ctx, "table", None)
+    original_text = getattr(ctx, "text", None)
+    output = io.StringIO()
+    try:
+        with ctx._use_with_behave_mode():
+            for step in scenario.steps:
+                _execute_step(ctx, runner, step)
+                _write_step(output, step)
+                if step.status in (Status.failed, Status.undefined):
+                    message = f"{step.status.name.upper()} SUB-STEP: {step.keyword} {step.name}"
+                    if step.error_message:
+                        message += f"\nSubstep info: {step.error_message}\n"
+                        message += "Traceback (of failed substep):\n"
+                        message += "".join(traceback.format_tb(step.exc_traceback))
+                    raise AssertionError(message)
+    finally:
+        ctx.table = original_table
+        ctx.text = original_text
+        output.write("\n\n")
+        sys.stdout.write(output.getvalue())
+        sys.stdout.flush()
+
+
+def _execute_step(ctx: Context, runner: ModelRunner, step: Step) -> None:
+    """Run a parsed step with its matched step function and the step hooks
+
+    The step is run the way behave's `Step.run` does: a failed before_step hook skips the step
+    function, a failed after_step hook fails the step and a step that skipped itself stays skipped.
+
+    Args:
+        ctx: The behave context
+        runner: The behave runner
+        step: The parsed behave step. Its status, duration and error are set
+
+    """
+    step.reset()
+    match = runner.step_registry.find_match(step)
+    if match is None:
+        runner.undefined_steps.append(step)
+        step.status = Status.undefined
+        return
+    error = ""
+    runner.run_hook("before_step", ctx, step)
+    start = time.perf_counter()
+    # A failed before_step hook leaves the step untested, the same way behave does
+    if not step.hook_failed:
+        try:
+            ctx.text = step.text
+            ctx.table = step.table
+            match.run(ctx)
+            # The step function may have skipped the scenario and itself
+            if step.status == Status.untested:
+                step.status = Status.passed
+        except KeyboardInterrupt as interrupt:
+            runner.aborted = True
+            step.status = Status.failed
+            step.store_exception_context(interrupt)
+            error = "ABORTED: By user (KeyboardInterrupt)."
+        except AssertionError as assertion:
+            step.status = Status.failed
+            step.store_exception_context(assertion)
+            if assertion.args:
+                error = f"Assertion Failed: {assertion}"
+            else:
+                error = traceback.format_exc()
+        except Exception as exception:
+            step.status = Status.failed
+            step.store_exception_context(exception)
+            error = traceback.format_exc()
+    step.duration = time.perf_counter() - start
+    runner.run_hook("after_step", ctx, step)
+    if step.hook_failed:
+        step.status = Status.failed
+    # Keep the HOOK-ERROR message the hook stored on the step if the step itself did not fail
+    if step.status == Status.failed and error:
+        step.error_message = error
+
+
+def _write_step(output: io.StringIO, step: Step) -> None:
+    """Write a step that was run, with its table or text, to the buffered output
+
+    Args:
+        output: The buffer of the scenario output
+        step: The behave step that was run
+
+    """
+    if step.status == Status.passed:
+        color = ansicolor.green
+    elif step.status == Status.skipped:
+        color = ansicolor.yellow
+    else:
+        color = ansicolor.red
+    output.write(
+        color(f"    {step.keyword} {step.name}") + f" ({step.duration * 1000:.1f} ms)\n"
+    )
+    if step.table:
+        output.write(color(f"      |{'|'.join(step.table.headings)}|") + "\n")
+        for row in step.table.rows:
+            output.write(color(f"      |{'|'.join(row.cells)}|") + "\n")
+    if step.text:
+        lines = [
+            '      """',
+            *(f"      {line}" for line in step.text.splitlines()),
+            '      """',
+        ]
+        output.write(color("\n".join(lines)) + "\n")
@@ -0,0 +1,208 @@
+"""Compiled paths for modifying JSON payloads
+
+Paths use the dotted notation of the payload steps (ie: `first_key.nested_key`) and can also index
+into lists and fan out over every item of a collection:
+- `items[0].name` sets the name of the first item
+- `items[*].name` or `items.*.name` sets the name of every item
+
+Paths are parsed once and cached by their text. Setting a value walks the path once. In copy on
+write mode only the dicts and lists along the modified path are copied and everything else is
+shared with the original payload, so a payload template can be modified into many variants without
+being deep copied or changed.
+"""
+from functools import lru_cache
+import logging
+import re
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from ns_requests.payload_templates import JsonBody
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+# A dotted path part: an optional key followed by any number of [index] or [*] selectors
+_PATH_PART = re.compile(r"(?P<key>[^\[\]]*)(?P<selectors>(?:\[(?:[0-9]+|\*)\])*)")
+_SELECTOR = re.compile(r"\[([0-9]+|\*)\]")
+
+# The kinds of path steps
+_KEY = "key"
+_INDEX = "index"
+_ALL = "all"
+
+
+class CompiledJsonMutator:
+    """A payload path that was parsed once into the steps that walk it"""
+
+    def __init__(self, path: str) -> None:
+        """Initialize a CompiledJsonMutator
+
+        Args:
+            path: The dotted path of the value to modify
+
+        """
+        self.path = path
+        self.steps = CompiledJsonMutator._parse_steps(path)
+
+    @staticmethod
+    def _parse_steps(path: str) -> Tuple[Tuple[str, Any], ...]:
+        """Parse a dotted path into the steps that walk it
+
+        Args:
+            path: The dotted path
+
+        Returns:
+            The tuple of (kind, key or index) steps. Raises a ValueError if the path is malformed
+
+        """
+        steps: List[Tuple[str, Any]] = []
+        for part in path.split("."):
+            match = _PATH_PART.fullmatch(part)
+            if not match or not (match.group("key") or match.group("selectors")):
+                raise ValueError(
+                    f"Invalid path to modify in the JSON payload: '{path}'"
+                )
+            key = match.group("key")
+            if key == "*":
+                steps.append((_ALL, None))
+            elif key:
+                steps.append((_KEY, key))
+            for selector in _SELECTOR.findall(match.group("selectors")):
+                if selector == "*":
+                    steps.append((_ALL, None))
+                else:
+                    steps.append((_INDEX, int(selector)))
+        return tuple(steps)
+
+    def apply(
+        self,
+        payload: Any,
+        new_value: Any,
+        copy_on_write: bool = False,
+        copied: Optional[Set[int]] = None,
+    ) -> Any:
+        """Set a value at the path in a payload
+
+        Args:
+            payload: The payload to modify. A JsonBody is decoded and always modified in copy on
+                write mode, so the rendered body is left unchanged
+            new_value: The value to set at the path
+            copy_on_write: Whether to copy the dicts and lists along the path instead of changing
+                the payload
+            copied: (OPTIONAL) The ids of containers that were already copied by earlier
+                modifications of the same payload, so they are not copied again
+
+        Returns:
+            The modified payload. This is a new object in copy on write mode
+
+        """
+        if isinstance(payload, JsonBody):
+            payload = payload.json()
+            copy_on_write = True
+        if copy_on_write and copied is None:
+            copied = set()
+        return self._apply(payload, 0, new_value, copy_on_write, copied)
+
+    def _apply(
+        self,
+        node: Any,
+        position: int,
+        new_value: Any,
+        copy_on_write: bool,
+        copied: Optional[Set[int]],
+    ) -> Any:
+        """Set a value at the rest of the path starting from a node
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            node: The dict or list the step at the position is applied to
+            position: The position of the step in the path
+            new_value: The value to set at the end of the path
+            copy_on_write: Whether to copy the node before changing it
+            copied: The ids of containers that were already copied
+
+        Returns:
+            The node, or its copy in copy on write mode
+
+        """
+        kind, token = self.steps[position]
+        last = position == len(self.steps) - 1
+        if copy_on_write and isinstance(node, (dict, list)) and id(node) not in copied:
+            node = node.copy()
+            copied.add(id(node))
+        if kind == _ALL:
+            if isinstance(node, dict):
+                tokens: Iterable[Any] = list(node)
+            elif isinstance(node, list):
+                tokens = range(len(node))
+            else:
+                raise TypeError(
+                    f"No dict or list found to modify every item of in the request payload: {node}"
+                )
+        elif kind == _KEY:
+            if not last and (not isinstance(node, dict) or token not in node):
+                raise KeyError(
+                    f"No key: '{token}' found in the request payload: {node}"
+                )
+            tokens = (token,)
+        else:
+            if not isinstance(node, list) or token >= len(node):
+                raise IndexError(
+                    f"No index: {token} found in the request payload: {node}"
+                )
+            tokens = (token,)
+        for item in tokens:
+            if last:
+                node[item] = new_value
+            else:
+                node[item] = self._apply(
+                    node[item], position + 1, new_value, copy_on_write, copied
+                )
+        return node
+
+
+class JsonMutator:
+    """Holds all static methods for compiling and applying payload modifications"""
+
+    @staticmethod
+    @lru_cache(maxsize=2048)
+    def compile(path: str) -> CompiledJsonMutator:
+        """Compile a path, reusing the compiled path for the same text
+
+        Args:
+            path: The dotted path of the value to modify
+
+        Returns:
+            The CompiledJsonMutator object
+
+        """
+        return CompiledJsonMutator(path)
+
+    @staticmethod
+    def apply(
+        payload: Any,
+        modifications: Iterable[Tuple[str, Any]],
+        copy_on_write: bool = False,
+    ) -> Any:
+        """Apply many modifications to a payload in order
+
+        In copy on write mode every container is copied at most once for all the modifications.
+
+        Args:
+            payload: The payload to modify. A JsonBody is decoded and modified in copy on write mode
+            modifications: The (path, new value) pairs to apply
+            copy_on_write: Whether to leave the payload unchanged and return a modified copy
+
+        Returns:
+            The modified payload
+
+        """
+        copied: Set[int] = set()
+        if isinstance(payload, JsonBody):
+            payload = payload.json()
+            copy_on_write = True
+        for path, new_value in modifications:
+            payload = JsonMutator.compile(path).apply(
+                payload, new_value, copy_on_write, copied
+            )
+        return payload
@@ -0,0 +1,285 @@
+"""Compiled JSONPath expressions used by the generic steps
+
+The jsonpath library re-parses its expression on every call. Expressions are compiled once here and
+cached by their text. Plain dotted and indexed paths (ie: `$.a.b[0].c`) are evaluated with a direct
+walk of the document. Anything else (wildcards, recursive descent, slices, filters) falls back to
+the full jsonpath engine. Both give the same results as calling jsonpath directly.
+
+Documents that are looked up many times can be flattened once into a JsonPathIndex so plain paths
+resolve with a single dict lookup. Collections that are searched for the object with a given value
+at a key can be indexed once into a KeyedCollectionIndex.
+"""
+from functools import lru_cache
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import jsonpath as jsonpath_engine
+from ns_requests.payload_templates import JsonBody
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+# Normalized path segments the fast evaluator can not handle
+_ENGINE_SEGMENTS = ("*", "..", "!")
+
+
+def _walk(value: Any, segments: Tuple[str, ...]) -> Union[List[Any], bool]:
+    """Walk plain path segments down from a value the same way jsonpath does
+
+    Args:
+        value: The value to start from
+        segments: The keys and indexes to walk
+
+    Returns:
+        A list holding the value found, or False if the path does not exist
+
+    """
+    for segment in segments:
+        if isinstance(value, dict) and segment in value:
+            value = value[segment]
+        elif (
+            isinstance(value, list) and segment.isdigit() and len(value) > int(segment)
+        ):
+            value = value[int(segment)]
+        else:
+            return False
+    return [value]
+
+
+class CompiledJsonPath:
+    """A JSONPath expression that was parsed once"""
+
+    def __init__(self, expression: str) -> None:
+        """Initialize a CompiledJsonPath
+
+        Args:
+            expression: The JSONPath expression
+
+        """
+        self.expression = expression
+        self.segments = CompiledJsonPath._parse_segments(expression)
+
+    @staticmethod
+    def _parse_segments(expression: str) -> Optional[Tuple[str, ...]]:
+        """Parse an expression into plain path segments
+
+        Args:
+            expression: The JSONPath expression
+
+        Returns:
+            The tuple of keys and indexes of the path. None if the expression needs the full engine
+
+        """
+        if not expression:
+            return None
+        normalized = jsonpath_engine.normalize(expression)
+        if normalized.startswith("$;"):
+            normalized = normalized[2:]
+        if not normalized:
+            return ()
+        segments = tuple(normalized.split(";"))
+        for segment in segments:
+            if (
+                not segment
+                or segment in _ENGINE_SEGMENTS
+                or segment.startswith("(")
+                or segment.startswith("?(")
+                or ":" in segment
+                or "," in segment
+            ):
+                return None
+        return segments
+
+    @property
+    def is_plain(self) -> bool:
+        """Whether the expression is evaluated without the full jsonpath engine"""
+        return self.segments is not None
+
+    def find(self, document: Any) -> Union[List[Any], bool]:
+        """Find the values at the expression in a document
+
+        Args:
+            document: The decoded JSON document, or a JsonBody that is decoded to search it
+
+        Returns:
+            The list of values found, or False if nothing was found (the same as jsonpath)
+
+        """
+        if isinstance(document, JsonBody):
+            document = document.json()
+        if self.segments is None:
+            return jsonpath_engine.jsonpath(document, self.expression)
+        if not document:
+            return False
+        return _walk(document, self.segments)
+
+
+class JsonPath:
+    """Holds all static methods for compiling and evaluating JSONPath expressions"""
+
+    @staticmethod
+    @lru_cache(maxsize=2048)
+    def compile(expression: str) -> CompiledJsonPath:
+        """Compile an expression, reusing the compiled expression for the same text
+
+        Args:
+            expression: The JSONPath expression
+
+        Returns:
+            The CompiledJsonPath object
+
+        """
+        return CompiledJsonPath(expression)
+
+    @staticmethod
+    def find(document: Any, expression: str) -> Union[List[Any], bool]:
+        """Find the values at an expression in a document
+
+        This is a drop in replacement for jsonpath(document, expression).
+
+        Args:
+            document: The decoded JSON document, or a JsonBody that is decoded to search it
+            expression: The JSONPath expression
+
+        Returns:
+            The list of values found, or False if nothing was found
+
+        """
+        return JsonPath.compile(expression).find(document)
+
+
+class JsonPathIndex:
+    """Flattened path to value mapping of a document for constant time lookups of plain paths
+
+    The document is flattened level by level on the first lookup. Memory is bounded by only
+    indexing down to `max_depth` levels and by stopping at the last complete level once
+    `max_entries` paths are indexed. Deeper paths are resolved by walking down from their deepest
+    indexed ancestor.
+    """
+
+    def __init__(
+        self, document: Any, max_depth: int = 4, max_entries: int = 200000
+    ) -> None:
+        """Initialize a JsonPathIndex
+
+        Args:
+            document: The decoded JSON document to index
+            max_depth: The number of levels of the document to index
+            max_entries: The maximum number of paths to index
+
+        """
+        self.document = document
+        self.max_depth = max_depth
+        self.max_entries = max_entries
+        self.depth = 0
+        self._values: Optional[Dict[Tuple[str, ...], Any]] = None
+
+    def _build(self) -> None:
+        """Flatten the document into the path to value mapping"""
+        values: Dict[Tuple[str, ...], Any] = {(): self.document}
+        level = [((), self.document)]
+        depth = 0
+        while level and depth < self.max_depth:
+            next_level = []
+            for path, value in level:
+                if isinstance(value, dict):
+                    next_level.extend(
+                        (path + (key,), child) for key, child in value.items()
+                    )
+                elif isinstance(value, list):
+                    next_level.extend(
+                        (path + (str(position),), child)
+                        for position, child in enumerate(value)
+                    )
+            if len(values) + len(next_level) > self.max_entries:
+                LOGGER.debug(
+                    f"Stopped indexing the JSON document at depth {depth} to stay under {self.max_entries} entries."
+                )
+                break
+            values.update(next_level)
+            level = next_level
+            depth += 1
+        self.depth = depth
+        self._values = values
+        LOGGER.debug(f"Indexed {len(values)} JSON paths down to depth {depth}.")
+
+    def find(self, compiled: CompiledJsonPath) -> Union[List[Any], bool]:
+        """Find the values at a compiled expression in the indexed document
+
+        Args:
+            compiled: The compiled expression
+
+        Returns:
+            The list of values found, or False if nothing was found (the same as jsonpath)
+
+        """
+        segments = compiled.segments
+        # Only plain paths with canonical list indexes can be looked up in the index
+        if segments is None or any(
+            segment.isdigit() and segment != str(int(segment)) for segment in segments
+        ):
+            return compiled.find(self.document)
+        if not self.document:
+            return False
+        if self._values is None:
+            self._build()
+        if len(segments) <= self.depth:
+            if segments in self._values:
+                return [self._values[segments]]
+            return False
+        ancestor = segments[: self.depth]
+        if ancestor not in self._values:
+            return False
+        return _walk(self._values[ancestor], segments[self.depth :])
+
+
+class KeyedCollectionIndex:
+    """Mapping of the values at a key of the objects in a collection to their first position
+
+    Lookups give the same result as scanning the collection in order for the first object whose
+    value at the key equals the given string. The scan stops at the first object that the key can
+    not be read from, so that error is raised for every value not found before it.
+    """
+
+    def __init__(self, collection: Any, key: str) -> None:
+        """Initialize a KeyedCollectionIndex
+
+        Args:
+            collection: The collection of objects to index
+            key: The key of the objects to index the values of
+
+        """
+        self.key = key
+        self.positions: Dict[str, int] = {}
+        self.last_object: Any = None
+        self._error: Optional[Exception] = None
+        for position, json_object in enumerate(collection):
+            self.last_object = json_object
+            try:
+                value = json_object[key]
+            except (KeyError, IndexError, TypeError) as error:
+                self._error = error
+                break
+            # Only strings can be equal to the values looked up
+            if isinstance(value, str) and value not in self.positions:
+                self.positions[value] = position
+        LOGGER.debug(
+            f"Indexed {len(self.positions)} distinct values at key: {key} of the collection."
+        )
+
+    def position(self, value: str) -> Optional[int]:
+        """Get the position of the first object that has a value at the key
+
+        Args:
+            value: The value to look for
+
+        Returns:
+            The position of the object, or None if no object has the value. Raises the error of
+            reading the key from the first object that does not have it if no object before that
+            one has the value
+
+        """
+        position = self.positions.get(value)
+        if position is None and self._error is not None:
+            raise self._error
+        return position
@@ -0,0 +1,288 @@
+"""Parallel execution of the example rows of tagged Scenario Outlines
+
+Behave runs the scenarios generated from the example rows of an outline one after another. For an
+outline tagged `@parallel_examples` every row is run on a worker thread instead, each with its own
+behave context. The context of a row starts as a copy of the feature context: dict and list values
+are deep copied and every other value is shared. Requests sessions (ie: the clients of test_users)
+are shared even inside copied dicts and lists, so rows keep using the pooled sessions. The scenario
+hooks of the environment run for every row on its worker thread, so they must be thread safe. The
+body log and cassette of GenericRequests are shared by the whole process, so rows are run one after
+another while either is used (see run_parallel_examples).
+
+Like a sequential outline, the remaining rows are not run once a row failed with `--stop` or the
+run was aborted. Rows that are already running are finished but reported as untested.
+
+Formatter calls are recorded while the rows run and replayed to the real formatters in row order
+once every row before them is done, so the output and reports look the same as a sequential run.
+Output capturing is disabled for the rows, because it replaces the process wide sys.stdout.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import logging
+from typing import Any, List, Tuple
+
+from behave.model import Feature, Scenario, ScenarioOutline
+from behave.runner import Context, ModelRunner
+import requests
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+# The tag that runs the rows of an outline in parallel
+PARALLEL_EXAMPLES_TAG = "parallel_examples"
+
+# Root context attributes that are managed by behave and never copied to a row context
+_BEHAVE_ROOT_ATTRIBUTES = (
+    "aborted",
+    "failed",
+    "config",
+    "active_outline",
+    "cleanup_errors",
+    "@cleanups",
+    "@layer",
+    "stdout_capture",
+    "stderr_capture",
+    "log_capture",
+)
+
+
+class _RecordingFormatter:
+    """Records every formatter call of a row so it can be replayed in row order"""
+
+    def __init__(self) -> None:
+        """Initialize a _RecordingFormatter"""
+        self.calls: List[Tuple[str, Tuple[Any, ...]]] = []
+
+    def __getattr__(self, name: str) -> Any:
+        """Get a function that records a call of the formatter method"""
+
+        def record(*args: Any) -> None:
+            self.calls.append((name, args))
+
+        return record
+
+    def replay(self, formatters: List[Any]) -> None:
+        """Make the recorded calls on the real formatters
+
+        Args:
+            formatters: The formatters of the behave runner
+
+        """
+        for name, args in self.calls:
+            for formatter in formatters:
+                getattr(formatter, name)(*args)
+
+
+class ParallelExamples:
+    """Runs the example rows of tagged Scenario Outlines in worker threads"""
+
+    @staticmethod
+    def tagged_outlines(feature: Feature) -> List[ScenarioOutline]:
+        """Get the outlines of a feature tagged @parallel_examples
+
+        Args:
+            feature: The behave feature
+
+        Returns:
+            The list of tagged ScenarioOutline objects
+
+        """
+        return [
+            scenario
+            for scenario in feature.scenarios
+            if isinstance(scenario, ScenarioOutline)
+            and PARALLEL_EXAMPLES_TAG in scenario.effective_tags
+        ]
+
+    @staticmethod
+    def enable(ctx: Context, feature: Feature, workers: int = 8) -> None:
+        """Run the rows of every outline of a feature tagged @parallel_examples in parallel
+
+        Args:
+            ctx: The behave context
+            feature: The behave feature
+            workers: The maximum number of rows run at once
+
+        """
+        for outline in ParallelExamples.tagged_outlines(feature):
+            LOGGER.debug(
+                f"Running the {len(outline.scenarios)} examples of: {outline.name} with {workers} workers"
+            )
+            # Behave calls run on the outline object, so shadow the method on the instance
+            outline.run = ParallelExamples._outline_runner(outline, workers)
+
+    @staticmethod
+    def _outline_runner(outline: ScenarioOutline, workers: int) -> Any:
+        """Build the replacement run method of an outline
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            outline: The scenario outline
+            workers: The maximum number of rows run at once
+
+        Returns:
+            The function that runs the outline with a behave runner
+
+        """
+        original_run = outline.run
+
+        def run(runner: ModelRunner) -> bool:
+            if runner.config.dry_run or len(outline.scenarios) < 2:
+                return original_run(runner)
+            outline.clear_status()
+            executor = ThreadPoolExecutor(max_workers=workers)
+            futures = [
+                executor.submit(ParallelExamples._run_row, runner, scenario)
+                for scenario in outline.scenarios
+            ]
+            failed_count = 0
+            reported = 0
+            try:
+                # Report the rows in order as soon as every row before them is done
+                for scenario, future in zip(outline.scenarios, futures):
+                    failed, row_runner, recorder = future.result()
+                    reported += 1
+                    runner.context._set_root_attribute("active_outline", scenario._row)
+                    recorder.replay(runner.formatters)
+                    runner.undefined_steps.extend(row_runner.undefined_steps)
+                    runner.hook_failures += row_runner.hook_failures
+                    if row_runner.aborted:
+                        runner.aborted = True
+                    if failed:
+                        failed_count += 1
+                        runner.context._set_root_attribute("failed", True)
+                        # Stop early the same as behave does for a sequential outline
+                        if runner.config.stop or runner.aborted:
+                            break
+            except KeyboardInterrupt:
+                runner.aborted = True
+                raise
+            finally:
+                # Rows that did not start yet are left untested. Running rows are waited for
+                for future in futures:
+                    future.cancel()
+                executor.shutdown(wait=True)
+                # Rows that ran but were not reported are left untested too, as behave would
+                for scenario in outline.scenarios[reported:]:
+                    row = scenario._row
+                    scenario.reset()
+                    scenario._row = row
+                runner.context._set_root_attribute("active_outline", None)
+            return failed_count > 0
+
+        return run
+
+    @staticmethod
+    def _run_row(
+        runner: ModelRunner, scenario: Scenario
+    ) -> Tuple[bool, ModelRunner, _RecordingFormatter]:
+        """Run the scenario of one example row with its own runner and context
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            runner: The behave runner of the feature
+            scenario: The scenario of the row
+
+        Returns:
+            A tuple of whether the scenario failed, the runner of the row and its recorded
+            formatter calls
+
+        """
+        config = copy.copy(runner.config)
+        config.stdout_capture = False
+        config.stderr_capture = False
+        config.log_capture = False
+        row_runner = ModelRunner(config, step_registry=runner.step_registry)
+        row_runner.hooks = runner.hooks
+        row_runner.feature = runner.feature
+        recorder = _RecordingFormatter()
+        row_runner.formatters = [recorder]
+        row_runner.context = ParallelExamples._copy_context(runner.context, row_runner)
+        row_runner.context._set_root_attribute("active_outline", scenario._row)
+        failed = scenario.run(row_runner)
+        return failed, row_runner, recorder
+
+    @staticmethod
+    def _copy_context(ctx: Context, runner: ModelRunner) -> Context:
+        """Copy the user attributes of every layer of a context to a new context
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            ctx: The behave context to copy
+            runner: The runner of the new context
+
+        Returns:
+            The new behave context
+
+        """
+        row_ctx = Context(runner)
+        row_ctx.feature = ctx.feature
+        # Behave looks up where an attribute was set when a scenario layer masks it
+        row_ctx._record.update(ctx._record)
+        row_ctx._origin.update(ctx._origin)
+        # Layers are stacked newest first with the root layer last
+        for name, value in ctx._stack[-1].items():
+            if name not in _BEHAVE_ROOT_ATTRIBUTES:
+                row_ctx._root[name] = ParallelExamples._copy_value(value)
+        for layer in reversed(ctx._stack[:-1]):
+            row_ctx._push(layer_name=layer.get("@layer"))
+            row_ctx._stack[0].update(
+                (name, ParallelExamples._copy_value(value))
+                for name, value in layer.items()
+                if not name.startswith("@")
+            )
+        return row_ctx
+
+    @staticmethod
+    def _copy_value(value: Any) -> Any:
+        """Copy a context value for a row
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            value: The context value
+
+        Returns:
+            A deep copy of a dict or list that shares the requests sessions inside it (ie: the
+            clients of test_users), otherwise the same value
+
+        """
+        if isinstance(value, (dict, list)):
+            # Deep copy sees the sessions as already copied, so every row uses the pooled ones
+            memo = {
+                id(session): session
+                for session in ParallelExamples._find_sessions(value)
+            }
+            try:
+                return copy.deepcopy(value, memo)
+            except (TypeError, copy.Error):
+                return copy.copy(value)
+        return value
+
+    @staticmethod
+    def _find_sessions(value: Any) -> List[requests.Session]:
+        """Find the requests sessions in nested dicts, lists, tuples and sets
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            value: The value to search
+
+        Returns:
+            The list of requests.Session objects found
+
+        """
+        if isinstance(value, requests.Session):
+            return [value]
+        if isinstance(value, dict):
+            value = list(value.values())
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return [
+                session
+                for item in value
+                for session in ParallelExamples._find_sessions(item)
+            ]
+        return []
@@ -0,0 +1,339 @@
+"""Indexed dispatch of steps to the step definitions of the registry
+
+Behave tries a step line against every step definition of its type (and every @step definition)
+one after another until one matches. The StepIndex buckets the regex step definitions by the first
+word of their literal prefix, so a step line is only tried against the definitions of its own
+first word and the definitions that can not be bucketed:
+- Patterns that start with a regex construct. ie: `(?P<negate>not )?`, `(?:a|an)`
+- Patterns with a top level alternation or compiled with flags such as re.IGNORECASE
+- Step definitions of the parse and cfparse matchers, which ignore case
+
+Candidates are tried in registration order, so the step definition that matches is always the one
+behave would have used. The step definition resolved for a step line is memoized, so a repeated
+step line is matched with a single regex. The index is rebuilt when step definitions are added to
+the registry.
+"""
+from collections import OrderedDict
+import heapq
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from behave.matchers import Match, RegexMatcher
+from behave.model import Step
+from behave.runner import Context
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+# The bucket of the step definitions that can not be indexed by their first word
+WILDCARD = "*"
+
+# Characters that start a regex construct. A literal prefix ends before them
+_REGEX_SPECIAL = set(".^$*+?{}[]\\|()")
+
+# Quantifiers that make the character before them optional or repeated
+_QUANTIFIERS = set("*+?{")
+
+# A step definition with its registration position in the candidates of its step type
+_Candidate = Tuple[int, Any]
+
+
+class StepIndex:
+    """Dispatches steps to the step definitions of a registry by the first word of the step"""
+
+    def __init__(self, registry: Any, cache_size: int = 4096) -> None:
+        """Initialize a StepIndex
+
+        Args:
+            registry: The behave StepRegistry to index
+            cache_size: The maximum number of step lines whose step definition is memoized
+
+        """
+        self.registry = registry
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # The number of step definitions in the registry when the index was built
+        self._size = -1
+        # The buckets of every step type. ie: {"given": {"the": [(0, matcher)], "*": [...]}}
+        self._buckets: Dict[str, Dict[str, List[_Candidate]]] = {}
+        # The merged candidates of a step type and first word
+        self._candidates: Dict[Tuple[str, str], List[Any]] = {}
+        # The step definition resolved for a step type and step line. None if it is undefined
+        self._cache: "OrderedDict[Tuple[str, str], Optional[Any]]" = OrderedDict()
+        # The step lines resolved so far, to look for ambiguous step definitions
+        self._resolved: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+
+    @staticmethod
+    def install(ctx: Context, cache_size: int = 4096) -> "StepIndex":
+        """Dispatch the steps of the run through a StepIndex of the runner's step registry
+
+        Args:
+            ctx: The behave context
+            cache_size: The maximum number of step lines whose step definition is memoized
+
+        Returns:
+            The StepIndex object
+
+        """
+        registry = ctx._runner.step_registry
+        index = StepIndex(registry, cache_size=cache_size)
+        # Shadow the lookups on the registry instance, which every runner shares
+        registry.find_match = index.find_match
+        registry.find_step_definition = index.find_step_definition
+        return index
+
+    @staticmethod
+    def first_word(matcher: Any) -> str:
+        """Get the bucket of a step definition
+
+        Args:
+            matcher: The step definition (behave matcher)
+
+        Returns:
+            The first word every step line it matches starts with, or WILDCARD if it can not be
+            known from the pattern
+
+        """
+        if not isinstance(matcher, RegexMatcher) or matcher.regex.flags & (
+            re.IGNORECASE | re.VERBOSE
+        ):
+            return WILDCARD
+        pattern = matcher.regex.pattern
+        if pattern.startswith("^"):
+            pattern = pattern[1:]
+        if StepIndex._has_top_level_alternation(pattern):
+            return WILDCARD
+        literal = ""
+        for position, character in enumerate(pattern):
+            if character in _REGEX_SPECIAL:
+                # A fully literal pattern of a single word only matches that word
+                if pattern[position:] == "$":
+                    return literal or WILDCARD
+                break
+            if pattern[position + 1 : position + 2] in _QUANTIFIERS:
+                break
+            if character == " ":
+                return literal or WILDCARD
+            literal += character
+        return WILDCARD
+
+    @staticmethod
+    def _has_top_level_alternation(pattern: str) -> bool:
+        """Check whether a regex pattern has a `|` outside of any group
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            pattern: The regex pattern
+
+        Returns:
+            True if the whole pattern is an alternation
+
+        """
+        depth = 0
+        in_class = False
+        escaped = False
+        for character in pattern:
+            if escaped:
+                escaped = False
+            elif character == "\\":
+                escaped = True
+            elif in_class:
+                in_class = character != "]"
+            elif character == "[":
+                in_class = True
+            elif character == "(":
+                depth += 1
+            elif character == ")":
+                depth -= 1
+            elif character == "|" and depth == 0:
+                return True
+        return False
+
+    def _build(self) -> None:
+        """Bucket every step definition of the registry if the registry changed
+
+        NOTE: This method is private and for internal class use only.
+
+        """
+        size = sum(len(definitions) for definitions in self.registry.steps.values())
+        if size == self._size:
+            return
+        self._buckets = {}
+        for step_type, definitions in self.registry.steps.items():
+            buckets: Dict[str, List[_Candidate]] = {WILDCARD: []}
+            for position, matcher in enumerate(definitions):
+                buckets.setdefault(StepIndex.first_word(matcher), []).append(
+                    (position, matcher)
+                )
+            self._buckets[step_type] = buckets
+        self._candidates = {}
+        self._cache.clear()
+        self._size = size
+        LOGGER.debug(f"Indexed {size} step definitions: {self.stats()}")
+
+    def candidates(self, step_type: str, step_text: str) -> List[Any]:
+        """Get the step definitions a step line is tried against, in registration order
+
+        Args:
+            step_type: The type of the step. ie: given, when, then, step
+            step_text: The step line without its keyword
+
+        Returns:
+            The step definitions of the step type followed by the @step definitions, only the ones
+            of the first word of the step line and the unbucketed ones
+
+        """
+        with self._lock:
+            self._build()
+            word = step_text.split(" ", 1)[0]
+            key = (step_type, word)
+            candidates = self._candidates.get(key)
+            if candidates is None:
+                step_types = [step_type]
+                if step_type != "step":
+                    step_types.append("step")
+                candidates = []
+                for candidate_type in step_types:
+                    buckets = self._buckets.get(candidate_type, {})
+                    candidates.extend(
+                        matcher
+                        for _, matcher in heapq.merge(
+                            buckets.get(word, []),
+                            buckets.get(WILDCARD, []),
+                            key=lambda candidate: candidate[0],
+                        )
+                    )
+                self._candidates[key] = candidates
+            return candidates
+
+    def _lookup(self, step: Step) -> Tuple[Optional[Any], Optional[Match]]:
+        """Resolve the step definition of a step, from the memoized ones if possible
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            step: The behave step
+
+        Returns:
+            A tuple of the step definition and its match. The match is None if the step definition
+            was memoized and both are None if the step is undefined
+
+        """
+        key = (step.step_type, step.name)
+        with self._lock:
+            self._build()
+            if key in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key], None
+            self.misses += 1
+        found, match = None, None
+        for matcher in self.candidates(step.step_type, step.name):
+            match = matcher.match(step.name)
+            if match:
+                found = matcher
+                break
+        with self._lock:
+            self._cache[key] = found
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self._resolved[key] = None
+        return found, match
+
+    def find_step_definition(self, step: Step) -> Optional[Any]:
+        """Find the step definition of a step
+
+        Args:
+            step: The behave step
+
+        Returns:
+            The first step definition that matches the step line, or None if the step is undefined
+
+        """
+        return self._lookup(step)[0]
+
+    def find_match(self, step: Step) -> Optional[Match]:
+        """Find the match of a step, with the arguments of its step definition
+
+        Args:
+            step: The behave step
+
+        Returns:
+            The behave Match object, or None if the step is undefined
+
+        """
+        matcher, match = self._lookup(step)
+        if matcher is None or match is not None:
+            return match
+        return matcher.match(step.name)
+
+    def buckets(self) -> Dict[str, Dict[str, List[str]]]:
+        """Get the patterns of every bucket
+
+        Returns:
+            A dict of step type to a dict of first word (or WILDCARD) to the patterns of the bucket
+            in registration order
+
+        """
+        with self._lock:
+            self._build()
+            return {
+                step_type: {
+                    word: [matcher.pattern for _, matcher in candidates]
+                    for word, candidates in buckets.items()
+                }
+                for step_type, buckets in self._buckets.items()
+            }
+
+    def ambiguous_steps(self) -> Dict[str, List[str]]:
+        """Find the step lines resolved so far that match more than one step definition
+
+        The first pattern is the one that was used. The others are shadowed for that step line,
+        which usually means a pattern is missing an anchor or is too loose.
+
+        Returns:
+            A dict of the step line (with its step type) to every pattern that matches it
+
+        """
+        with self._lock:
+            resolved = list(self._resolved)
+        ambiguous = {}
+        for step_type, step_text in resolved:
+            patterns = [
+                matcher.pattern
+                for matcher in self.candidates(step_type, step_text)
+                if matcher.match(step_text)
+            ]
+            if len(patterns) > 1:
+                ambiguous[f"{step_type} {step_text}"] = patterns
+        return ambiguous
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the size of the index and its cache hits
+
+        Returns:
+            A dict of the number of step definitions, buckets, unbucketed step definitions, the
+            largest bucket and the memoized lookups
+
+        """
+        buckets = [
+            candidates
+            for step_buckets in self._buckets.values()
+            for word, candidates in step_buckets.items()
+            if word != WILDCARD
+        ]
+        return {
+            "definitions": max(self._size, 0),
+            "buckets": len(buckets),
+            "wildcard": sum(
+                len(step_buckets[WILDCARD]) for step_buckets in self._buckets.values()
+            ),
+            "largest_bucket": max((len(bucket) for bucket in buckets), default=0),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,425 @@
+"""Parallel feature runner for behave
+
+Behave runs every feature of a suite one after another in a single process. This runner shards the
+features across a pool of behave worker processes, one feature per worker at a time:
+
+    ns-behave -j 4 features/ -D gateway_base_url=https://api.example.com
+
+Every option other than the runner's own is passed to the workers as is. Each worker is a full behave
+run of a single feature, so it builds its own context and runs the `environment.py` hooks of the
+project (and the environment_functions they call) with `@setup` and `@teardown` scenarios handled
+per feature as usual. The output of a worker is buffered and printed in one block once its feature
+is done, so logs of different features never interleave. Each worker also writes a JSON report,
+and the reports are merged in feature order into one report and summary for the whole run. Output
+files (`-o`) are not supported since every worker would write them, use `--report` instead. For the
+same reason a cassette (see ns_requests.cassette) can be replayed by parallel workers but is only
+recorded with `-j 1`.
+
+Features are started longest first by their durations in past runs, which are kept in a local
+SQLite database (see ns_behave.timing_db). `--shard i/N` runs only one of N shards of the suite,
+balanced by expected duration.
+
+The NS_BEHAVE_WORKER environment variable of a worker holds its worker number (ie: to pick a free
+port for a stub server per worker).
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from behave.configuration import Configuration, options as behave_options
+from ns_behave.timing_db import longest_first, shard, TimingDatabase
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+# The argparse actions of behave options that do not take a value
+_FLAG_ACTIONS = ("store_true", "store_false", "store_const", "count", "help", "version")
+
+# The behave option strings, and the ones that take a value
+_OPTION_STRINGS = [option for fixed, _ in behave_options for option in fixed]
+_VALUE_OPTIONS = {
+    option
+    for fixed, keywords in behave_options
+    if keywords.get("action", "store") not in _FLAG_ACTIONS
+    for option in fixed
+}
+
+
+class FeatureResult:
+    """The outcome of running one feature in a worker"""
+
+    def __init__(
+        self,
+        feature: str,
+        worker: int,
+        returncode: int,
+        output: str,
+        report: List[Dict[str, Any]],
+        seconds: float,
+    ) -> None:
+        """Initialize a FeatureResult
+
+        Args:
+            feature: The feature file (and optional line) that was run
+            worker: The number of the worker that ran it
+            returncode: The exit code of the worker
+            output: The combined stdout and stderr of the worker
+            report: The features of the behave JSON report of the worker
+            seconds: The number of seconds the worker ran for
+
+        """
+        self.feature = feature
+        self.worker = worker
+        self.returncode = returncode
+        self.output = output
+        self.report = report
+        self.seconds = seconds
+
+    @property
+    def passed(self) -> bool:
+        """Whether every scenario of the feature passed"""
+        return self.returncode == 0
+
+
+class ParallelRunner:
+    """Runs features in parallel behave worker processes"""
+
+    def __init__(
+        self, features: Sequence[str], behave_args: Sequence[str], jobs: int = 1
+    ) -> None:
+        """Initialize a ParallelRunner
+
+        Args:
+            features: The feature files to run, in the order they are started
+            behave_args: The behave options passed to every worker, without any paths
+            jobs: The number of features run at once
+
+        """
+        self.features = list(features)
+        self.behave_args = list(behave_args)
+        self.jobs = max(1, jobs)
+        self.results: List[FeatureResult] = []
+        self._output_lock = threading.Lock()
+        self._workers: "queue.Queue[int]" = queue.Queue()
+
+    @staticmethod
+    def find_features(paths: Sequence[str]) -> List[str]:
+        """Find the feature files to run
+
+        Args:
+            paths: The feature files (optionally with a line number) and directories to search
+
+        Returns:
+            The list of feature files in path order. Directories are searched in sorted order
+
+        """
+        features: List[str] = []
+        for path in paths or ["features"]:
+            if os.path.isdir(path):
+                for root, directories, file_names in os.walk(path):
+                    directories.sort()
+                    features.extend(
+                        os.path.join(root, file_name)
+                        for file_name in sorted(file_names)
+                        if file_name.endswith(".feature")
+                    )
+            else:
+                features.append(path)
+        # Run every feature once even if it was found through several paths
+        return list(dict.fromkeys(features))
+
+    def run(self) -> int:
+        """Run every feature and print the merged summary
+
+        Returns:
+            The exit code of the run. 0 if every feature passed, otherwise 1
+
+        """
+        for worker in range(1, self.jobs + 1):
+            self._workers.put(worker)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            results = list(executor.map(self._run_feature, self.features))
+        self.results = results
+        self._print_summary(time.perf_counter() - start)
+        return 0 if all(result.passed for result in results) else 1
+
+    def _run_feature(self, feature: str) -> FeatureResult:
+        """Run a feature in a behave worker process and print its output when it is done
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            feature: The feature file to run
+
+        Returns:
+            The FeatureResult object
+
+        """
+        worker = self._workers.get()
+        descriptor, report_path = tempfile.mkstemp(prefix="ns-behave-", suffix=".json")
+        os.close(descriptor)
+        try:
+            command = [sys.executable, "-m", "behave", "-f", "json", "-o", report_path]
+            command.extend(self.behave_args)
+            command.append(feature)
+            start = time.perf_counter()
+            process = subprocess.run(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                env=dict(os.environ, NS_BEHAVE_WORKER=str(worker)),
+            )
+            seconds = time.perf_counter() - start
+            result = FeatureResult(
+                feature,
+                worker,
+                process.returncode,
+                process.stdout.decode("utf-8", errors="replace"),
+                ParallelRunner._read_report(report_path),
+                seconds,
+            )
+        finally:
+            os.remove(report_path)
+            self._workers.put(worker)
+        status = "passed" if result.passed else "failed"
+        with self._output_lock:
+            sys.stdout.write(
+                f"\n=== [worker {worker}] {feature} {status} in {seconds:.1f}s ===\n"
+                f"{result.output}"
+            )
+            sys.stdout.flush()
+        return result
+
+    @staticmethod
+    def _read_report(path: str) -> List[Dict[str, Any]]:
+        """Read the JSON report of a worker
+
+        Args:
+            path: The report file
+
+        Returns:
+            The list of features in the report. Empty if the worker did not write a report
+
+        """
+        try:
+            with open(path, encoding="utf-8") as report_file:
+                return json.load(report_file)
+        except ValueError:
+            return []
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Get the merged JSON report of the run
+
+        Returns:
+            The features of every worker report in the order the features were started
+
+        """
+        return [feature for result in self.results for feature in result.report]
+
+    def _print_summary(self, seconds: float) -> None:
+        """Print the feature, scenario and step counts of the whole run
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            seconds: The wall clock seconds of the run
+
+        """
+        counts: Dict[str, Dict[str, int]] = {
+            "features": {},
+            "scenarios": {},
+            "steps": {},
+        }
+        for feature in self.report():
+            status = feature.get("status", "skipped")
+            counts["features"][status] = counts["features"].get(status, 0) + 1
+            for element in feature.get("elements", []):
+                if element.get("type") != "scenario":
+                    continue
+                status = element.get("status", "skipped")
+                counts["scenarios"][status] = counts["scenarios"].get(status, 0) + 1
+                for step in element.get("steps", []):
+                    status = step.get("result", {}).get("status", "skipped")
+                    counts["steps"][status] = counts["steps"].get(status, 0) + 1
+        lines = [
+            "",
+            f"Parallel run of {len(self.results)} features on {self.jobs} workers:",
+        ]
+        for kind, statuses in counts.items():
+            lines.append(
+                f"{statuses.get('passed', 0)} {kind} passed, {statuses.get('failed', 0)} failed, "
+                f"{statuses.get('skipped', 0)} skipped"
+            )
+        failed = [result.feature for result in self.results if not result.passed]
+        if failed:
+            lines.append("Failing features:")
+            lines.extend(f"  {feature}" for feature in failed)
+        lines.append(f"Took {seconds:.1f}s")
+        print("\n".join(lines))  # noqa
+
+
+def split_behave_args(args: Sequence[str]) -> Tuple[List[str], List[str]]:
+    """Split behave command line arguments into its options and its feature paths
+
+    Arguments are told apart by position with the options of behave, so an option value that
+    happens to be the same as a path (ie: `--include features`) stays with its option.
+
+    Args:
+        args: The behave command line arguments
+
+    Returns:
+        A tuple of the options with their values and the positional feature paths
+
+    """
+    options: List[str] = []
+    paths: List[str] = []
+    remaining = list(args)
+    while remaining:
+        arg = remaining.pop(0)
+        if arg == "--":
+            paths.extend(remaining)
+            break
+        if not arg.startswith("-") or arg == "-":
+            paths.append(arg)
+            continue
+        options.append(arg)
+        if "=" in arg or not remaining:
+            continue
+        name = _option_name(arg)
+        # A short option can have its value attached. ie: -ofile
+        if (
+            name is not None
+            and name in _VALUE_OPTIONS
+            and (len(arg) == 2 or arg.startswith("--"))
+        ):
+            options.append(remaining.pop(0))
+    return options, paths
+
+
+def _option_name(arg: str) -> Optional[str]:
+    """Get the behave option string of an argument, expanding an abbreviated long option
+
+    NOTE: This function is private and for internal module use only.
+
+    Args:
+        arg: The command line argument. ie: -o, --outfile, --out
+
+    Returns:
+        The option string, or None if it is not a behave option
+
+    """
+    if arg in _OPTION_STRINGS:
+        return arg
+    if arg.startswith("--"):
+        matches = [option for option in _OPTION_STRINGS if option.startswith(arg)]
+        if len(matches) == 1:
+            return matches[0]
+    if not arg.startswith("--") and arg[:2] in _OPTION_STRINGS:
+        return arg[:2]
+    return None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run behave features in parallel worker processes
+
+    Args:
+        argv: (OPTIONAL) The command line arguments. The arguments of the process if None
+
+    Returns:
+        The exit code of the run
+
+    """
+    parser = argparse.ArgumentParser(
+        prog="ns-behave",
+        description="Run behave features in parallel. Other options are passed to behave.",
+        allow_abbrev=False,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="The number of features run at once (default: the number of CPUs)",
+    )
+    parser.add_argument(
+        "--report", help="Write the merged behave JSON report of the run to this file"
+    )
+    parser.add_argument(
+        "--timings",
+        default=".behave_timings.sqlite",
+        help="The SQLite database of past feature durations (default: .behave_timings.sqlite)",
+    )
+    parser.add_argument(
+        "--no-timings",
+        action="store_true",
+        help="Do not read or record feature durations. Features run in the order they are found",
+    )
+    parser.add_argument(
+        "--shard",
+        help="Only run shard i of N shards of about the same expected duration (ie: 2/4)",
+    )
+    args, behave_args = parser.parse_known_args(argv)
+    behave_args, paths = split_behave_args(behave_args)
+    config = Configuration(behave_args + paths, load_config=True)
+    # Every worker writes its JSON report to its own file, so an output file would be written by all
+    if any(output.name for output in config.outputs):
+        parser.error(
+            "-o/--outfile is not supported in a parallel run. Use --report for the merged JSON report"
+        )
+    # Every worker opens the cassette, so recording workers would overwrite each other
+    user_data = config.userdata
+    if (
+        args.jobs > 1
+        and user_data.get("cassette")
+        and "record"
+        in (
+            user_data.get("cassette_mode", "replay"),
+            user_data.get("cassette_unmatched", "error"),
+        )
+    ):
+        parser.error(
+            "A cassette can only be recorded with -j 1. Replay it in parallel once it is recorded"
+        )
+    # Paths of the behave configuration file are used when none are given
+    paths = paths or config.paths
+    # The JSON report formatter of the workers would replace the default formatter
+    if not config.format:
+        behave_args.extend(["-f", config.default_format])
+
+    features = ParallelRunner.find_features(paths)
+    timings = None if args.no_timings else TimingDatabase(args.timings)
+    expected = timings.expected_seconds(features) if timings else {}
+    if args.shard:
+        index, count = (int(part) for part in args.shard.split("/"))
+        features = shard(features, expected, index, count)
+    elif timings:
+        features = longest_first(features, expected)
+    runner = ParallelRunner(features, behave_args, args.jobs)
+    exit_code = runner.run()
+    if timings:
+        for result in runner.results:
+            timings.record_feature(
+                result.feature,
+                result.seconds,
+                "passed" if result.passed else "failed",
+                result.report,
+            )
+        timings.close()
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as report_file:
+            json.dump(runner.report(), report_file, indent=2)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,13 @@
 """Generic assertion step definitions for REST APIs"""
 
 import logging
+from typing import Callable, Tuple
 
 from behave import then, use_step_matcher
+from behave.model import Row
 from behave.runner import Context
-from jsonpath import jsonpath
 from ns_behave.common.common_behave_functions import CommonBehave
+from ns_behave.common.json_path import JsonPath
 
 # Enable the regex step matcher for behave in this class
 use_step_matcher("re")
@@ -142,22 +144,7 @@ def step_assert_rest_response_key(ctx: Context, negate: str, key: str) -> None:
         key: The key that should be present in the response
 
     """
-    list_of_values = jsonpath(
-        ctx.response.json(),
-        CommonBehave.interpolate_context_attributes(ctx, f"$.{key}"),
-    )
-    if negate:
-        LOGGER.debug(f"Checking that the JSON response should not include key: {key}.")
-        assert (
-            not list_of_values
-        ), f"Expected no key to be found at '{key}', but it was present. Response: {ctx.response.text}"
-        LOGGER.debug(f"Validated that the JSON response did not include key: {key}.")
-    else:
-        LOGGER.debug(f"Checking that the JSON response should include key: {key}.")
-        assert (
-            list_of_values
-        ), f"Expected key to be found at '{key}', but it was not present. Response: {ctx.response.text}"
-        LOGGER.debug(f"Validated that the JSON response did include key: {key}.")
+    _check_rest_response_key(ctx, negate, key)
 
 
 @then(
@@ -166,14 +153,17 @@ def step_assert_rest_response_key(ctx: Context, negate: str, key: str) -> None:
 def step_assert_rest_response_key_table(ctx: Context, negate: str) -> None:
     """Checks that the JSON response contains all keys from a given table.
 
+    Every row is checked and all the failed rows are reported together.
+
     Args:
         ctx: The behave context
         negate: A string representing whether or not a response should be negated. If it should be negated, it will have
             a value 'not'. Otherwise, it will be None
 
     """
-    for row in ctx.table:
-        step_assert_rest_response_key(ctx, negate, row[0])
+    _assert_table_rows(
+        ctx, lambda row: _check_rest_response_key(ctx, negate, row[0], False)
+    )
 
 
 @then(
@@ -192,37 +182,7 @@ def step_assert_rest_response_data_type(
         data_type: The data type of the key
 
     """
-    list_of_values = jsonpath(
-        ctx.response.json(),
-        CommonBehave.interpolate_context_attributes(ctx, f"$.{key}"),
-    )
-    if list_of_values:
-        found_value = list_of_values[0]
-        class_name = found_value.__class__.__name__
-        if negate:
-            LOGGER.debug(
-                f"Checking that the JSON response at key: {key} should not have data type: {data_type}."
-            )
-            assert (
-                class_name != data_type
-            ), f"Expected the data type at key: '{key}' to not be '{data_type}', but we found: '{class_name}'"
-            LOGGER.debug(
-                f"Validated that the JSON response at key: {key} did not have data type: {data_type}."
-            )
-        else:
-            LOGGER.debug(
-                f"Checking that the JSON response at key: {key} should have data type: {data_type}."
-            )
-            assert (
-                class_name == data_type
-            ), f"Expected the data type at key: '{key}' to be '{data_type}', but we found: '{class_name}'"
-            LOGGER.debug(
-                f"Validated that the JSON response at key: {key} did have data type: {data_type}."
-            )
-    else:
-        raise KeyError(
-            f"No key: '{key}' found in the JSON response: {ctx.response.json()}"
-        )
+    _check_rest_response_data_type(ctx, key, negate, data_type)
 
 
 @then(
@@ -231,14 +191,18 @@ def step_assert_rest_response_data_type(
 def step_assert_rest_response_data_type_table(ctx: Context, negate: str) -> None:
     """Checks that the JSON response has keys of the given data types.
 
+    Every row is checked and all the failed rows are reported together.
+
     Args:
         ctx: The behave context
         negate: A string representing whether or not a response should be negated. If it should be negated, it will have
             a value 'not'. Otherwise, it will be None
 
     """
-    for row in ctx.table:
-        step_assert_rest_response_data_type(ctx, row[0], negate, row[1])
+    _assert_table_rows(
+        ctx,
+        lambda row: _check_rest_response_data_type(ctx, row[0], negate, row[1], False),
+    )
 
 
 @then(
@@ -260,51 +224,24 @@ def step_assert_rest_response_value(
         value: the expected value in the assert
 
     """
-    list_of_values = jsonpath(
-        ctx.response.json(), CommonBehave.interpolate_context_attributes(ctx, key)
-    )
-    desired_value = CommonBehave.interpolate_context_attributes(ctx, value)
-    if list_of_values:
-        found_value = str(list_of_values[0])
-
-        if negate:
-            LOGGER.debug(
-                f"Checking that the JSON response at key: {key} should not be: {value}."
-            )
-            assert (
-                found_value != desired_value
-            ), f"Expected the JSON value at key: {key} to not be: {desired_value}, but we found: {found_value}"
-            LOGGER.debug(
-                f"Validated that the JSON response at key: {key} was not value: {value}"
-            )
-        else:
-            LOGGER.debug(
-                f"Checking that the JSON response at key: {key} should be: {value}."
-            )
-            assert (
-                found_value == desired_value
-            ), f"Expected the JSON value at key: {key} to be: {desired_value}, but we found: {found_value}"
-            LOGGER.debug(
-                f"Validated that the JSON response at key: {key} was value: {value}"
-            )
-    else:
-        raise KeyError(
-            f"No key: '{key}' found in the JSON response: {ctx.response.json()}"
-        )
+    _check_rest_response_value(ctx, key, negate, value)
 
 
 @then("the (?:JSON|json)? response should (?P<negate>not )?be the following(?::|)?")
 def step_assert_rest_response_value_table(ctx: Context, negate: str) -> None:
     """Checks that the JSON response have the given values.
 
+    Every row is checked and all the failed rows are reported together.
+
     Args:
         ctx: The behave context
         negate: A string representing whether or not a response should be negated. If it should be negated, it will have
             a value 'not'. Otherwise, it will be None
 
     """
-    for row in ctx.table:
-        step_assert_rest_response_value(ctx, row[0], negate, row[1])
+    _assert_table_rows(
+        ctx, lambda row: _check_rest_response_value(ctx, row[0], negate, row[1], False)
+    )
 
 
 @then(
@@ -325,8 +262,9 @@ def step_assert_rest_response_collection_size(
     """
 
     if key:
-        list_of_values = jsonpath(
-            ctx.response.json(), CommonBehave.interpolate_context_attributes(ctx, key)
+        list_of_values = JsonPath.find(
+            CommonBehave.get_response_json(ctx),
+            CommonBehave.interpolate_context_attributes(ctx, key),
         )
         if list_of_values:
             found_value = list_of_values[0]
@@ -359,13 +297,13 @@ def step_assert_rest_response_collection_size(
                 )
         else:
             raise KeyError(
-                f"No key: '{key}' found in the JSON response: {ctx.response.json()}"
+                f"No key: '{key}' found in the JSON response: {CommonBehave.get_response_json(ctx)}"
             )
     else:
         LOGGER.debug(
             f"Checking that the JSON response should have size: {collection_size}."
         )
-        found_value = len(ctx.response.json())
+        found_value = len(CommonBehave.get_response_json(ctx))
         assert found_value == int(collection_size), (
             f"Expected the JSON value to be a collection with size: {int(collection_size)},"
             f" but we found: {found_value} in the collection"
@@ -373,3 +311,513 @@ def step_assert_rest_response_collection_size(
         LOGGER.debug(
             f"Validated that the JSON response did have size: {collection_size}."
         )
+
+
+# ------------------------------------------------------------------------
+# Generic steps for streamed responses
+# ------------------------------------------------------------------------
+
+
+@then(
+    'the streamed (?:JSON|json)? response should (?P<negate>not )?include "(?P<key>.*)"'
+)
+def step_assert_streamed_response_key(ctx: Context, negate: str, key: str) -> None:
+    """Checks that the streamed JSON response does or does not include a key.
+
+    The body is parsed incrementally and only until the key is found.
+
+    Args:
+        ctx: The behave context
+        negate: A string representing whether or not a response should be negated. If it should be negated, it will have
+            a value 'not'. Otherwise, it will be None
+        key: The key that should be present in the response
+
+    """
+    found = ctx.streamed_json.contains(_get_streamed_segments(ctx, f"$.{key}"))
+    if negate:
+        LOGGER.debug(
+            f"Checking that the streamed response should not include key: {key}."
+        )
+        assert not found, f"Expected no key to be found at '{key}', but it was present."
+        LOGGER.debug(
+            f"Validated that the streamed response did not include key: {key}."
+        )
+    else:
+        LOGGER.debug(f"Checking that the streamed response should include key: {key}.")
+        assert found, f"Expected key to be found at '{key}', but it was not present."
+        LOGGER.debug(f"Validated that the streamed response did include key: {key}.")
+
+
+@then(
+    'the streamed (?:JSON|json)? response at "(?P<key>.*)" should (?P<negate>not )?be "(?P<value>.*)"'
+)
+def step_assert_streamed_response_value(
+    ctx: Context, key: str, negate: str, value: str
+) -> None:
+    """Checks that the value at a json path key of the streamed JSON response is or is not a value.
+
+    Only the value at the key is built in memory.
+
+    Args:
+        ctx: The behave context
+        key: A plain json path key expression (ie: $.a.b[0].c)
+        negate: A string representing whether or not a response should be negated. If it should be negated, it will have
+            a value 'not'. Otherwise, it will be None
+        value: The expected value in the assert
+
+    """
+    found, found_value = ctx.streamed_json.find(_get_streamed_segments(ctx, key))
+    if not found:
+        raise KeyError(f"No key: '{key}' found in the streamed JSON response")
+    found_value = str(found_value)
+    desired_value = CommonBehave.interpolate_context_attributes(ctx, value)
+    if negate:
+        assert (
+            found_value != desired_value
+        ), f"Expected the JSON value at key: {key} to not be: {desired_value}, but we found: {found_value}"
+    else:
+        assert (
+            found_value == desired_value
+        ), f"Expected the JSON value at key: {key} to be: {desired_value}, but we found: {found_value}"
+    LOGGER.debug(f"Validated the streamed response value at key: {key}.")
+
+
+@then(
+    'the streamed (?:JSON|json)? response(?: at "(?P<key>.*)")? should (?P<negate>not )?have (?P<collection_size>[0-9]+) (?:.*)'
+)
+def step_assert_streamed_response_collection_size(
+    ctx: Context, key: str, negate: str, collection_size: str
+) -> None:
+    """Checks that the streamed JSON response does or does not have a collection of the given size.
+
+    The items of the collection are counted without being built in memory.
+
+    Args:
+        ctx: The behave context
+        key: (OPTIONAL) A plain json path key expression of the collection. Defaults to the root
+        negate: A string representing whether or not a response should be negated. If it should be negated, it will have
+            a value 'not'. Otherwise, it will be None
+        collection_size: The expected size of the collection
+
+    """
+    found_size = ctx.streamed_json.size(_get_streamed_segments(ctx, key) if key else ())
+    if found_size is None:
+        raise KeyError(f"No key: '{key}' found in the streamed JSON response")
+    if negate:
+        assert found_size != int(collection_size), (
+            f"Expected the JSON value at key: {key} to not be a collection with size: {int(collection_size)},"
+            f" but we found: {found_size} in the collection"
+        )
+    else:
+        assert found_size == int(collection_size), (
+            f"Expected the JSON value at key: {key} to be a collection with size: {int(collection_size)},"
+            f" but we found: {found_size} in the collection"
+        )
+    LOGGER.debug(f"Validated the streamed response collection size at key: {key}.")
+
+
+# ------------------------------------------------------------------------
+# Generic steps for downloaded files
+# ------------------------------------------------------------------------
+
+
+@then(
+    'the downloaded file should (?P<negate>not )?have (?:the )?(?i)(?P<algorithm>sha256|sha1|md5|sha512) "(?P<digest>.*)"'
+)
+def step_assert_downloaded_file_checksum(
+    ctx: Context, negate: str, algorithm: str, digest: str
+) -> None:
+    """Checks a checksum of the downloaded response body.
+
+    Checksums computed during the download are compared without reading the file again.
+
+    Args:
+        ctx: The behave context
+        negate: A string representing whether or not a response should be negated. If it should be negated, it will have
+            a value 'not'. Otherwise, it will be None
+        algorithm: The hash algorithm of the checksum
+        digest: The expected hex digest
+
+    """
+    digest = CommonBehave.interpolate_context_attributes(ctx, digest).lower()
+    actual = ctx.downloaded_file.hash(algorithm)
+    if negate:
+        assert (
+            actual != digest
+        ), f"Expected the {algorithm} of the downloaded file to not be {digest}"
+    else:
+        assert (
+            actual == digest
+        ), f"Expected the {algorithm} of the downloaded file to be {digest}, but it was {actual}"
+    LOGGER.debug(f"Validated the {algorithm} of the downloaded file: {actual}.")
+
+
+@then(
+    "the downloaded file should (?P<negate>not )?have a size of (?P<size>[0-9]+) bytes"
+)
+def step_assert_downloaded_file_size(ctx: Context, negate: str, size: str) -> None:
+    """Checks the size of the downloaded response body.
+
+    Args:
+        ctx: The behave context
+        negate: A string representing whether or not a response should be negated. If it should be negated, it will have
+            a value 'not'. Otherwise, it will be None
+        size: The expected number of bytes
+
+    """
+    actual = ctx.downloaded_file.size
+    if negate:
+        assert actual != int(
+            size
+        ), f"Expected the downloaded file to not have a size of {size} bytes"
+    else:
+        assert actual == int(
+            size
+        ), f"Expected the downloaded file to have a size of {size} bytes, but it had {actual} bytes"
+
+
+@then('the downloaded file should (?P<negate>not )?contain "(?P<text>.*)"')
+def step_assert_downloaded_file_contains(ctx: Context, negate: str, text: str) -> None:
+    """Checks that the downloaded response body does or does not contain a text.
+
+    The file is memory-mapped and searched in place, so it is never read into memory.
+
+    Args:
+        ctx: The behave context
+        negate: A string representing whether or not a response should be negated. If it should be negated, it will have
+            a value 'not'. Otherwise, it will be None
+        text: The text to search for
+
+    """
+    text = CommonBehave.interpolate_context_attributes(ctx, text)
+    found = ctx.downloaded_file.contains(text.encode("utf-8"))
+    if negate:
+        assert not found, f"Expected the downloaded file to not contain: {text}"
+    else:
+        assert found, f"Expected the downloaded file to contain: {text}"
+
+
+# ------------------------------------------------------------------------
+# Generic steps for response timing
+# ------------------------------------------------------------------------
+
+# The timing attribute of each phase that can be checked
+_TIMING_PHASES = {
+    "response": "total_ms",
+    "dns": "dns_ms",
+    "connect": "connect_ms",
+    "tls": "tls_ms",
+    "time to first byte": "ttfb_ms",
+    "download": "download_ms",
+}
+
+
+@then(
+    "the (?P<phase>response|dns|connect|tls|time to first byte|download) time should (?P<negate>not )?be under (?P<limit>[0-9.]+) ?ms"
+)
+def step_assert_response_time(
+    ctx: Context, phase: str, negate: str, limit: str
+) -> None:
+    """Checks the time a phase of the last request took against a limit.
+
+    Args:
+        ctx: The behave context
+        phase: The phase of the request. The response time is the total time of the request
+        negate: A string representing whether or not a response should be negated. If it should be negated, it will have
+            a value 'not'. Otherwise, it will be None
+        limit: The limit in milliseconds
+
+    """
+    timing = ctx.response.timing
+    elapsed = getattr(timing, _TIMING_PHASES[phase])
+    if elapsed is None:
+        raise ValueError(
+            f"The {phase} time was not recorded for the last request. Timing: {timing.as_dict()}"
+        )
+    if negate:
+        assert elapsed >= float(
+            limit
+        ), f"Expected the {phase} time to not be under {limit} ms, but it was {elapsed} ms"
+    else:
+        assert elapsed < float(
+            limit
+        ), f"Expected the {phase} time to be under {limit} ms, but it was {elapsed} ms. Timing: {timing.as_dict()}"
+    LOGGER.debug(f"Validated the {phase} time of the last request: {elapsed} ms.")
+
+
+@then("the upload throughput should (?P<negate>not )?be over (?P<limit>[0-9.]+) ?MB/s")
+def step_assert_upload_throughput(ctx: Context, negate: str, limit: str) -> None:
+    """Checks the throughput of the files uploaded by the last request against a limit.
+
+    Args:
+        ctx: The behave context
+        negate: A string representing whether or not a response should be negated. If it should be negated, it will have
+            a value 'not'. Otherwise, it will be None
+        limit: The limit in megabytes per second
+
+    """
+    stats = getattr(ctx.response, "upload_stats", None)
+    if stats is None:
+        raise ValueError("The last request did not upload any files")
+    if negate:
+        assert stats["mb_per_s"] <= float(
+            limit
+        ), f"Expected the upload throughput to not be over {limit} MB/s, but it was {stats['mb_per_s']} MB/s"
+    else:
+        assert stats["mb_per_s"] > float(
+            limit
+        ), f"Expected the upload throughput to be over {limit} MB/s, but it was {stats['mb_per_s']} MB/s. Upload: {stats}"
+    LOGGER.debug(f"Validated the upload throughput of the last request: {stats}.")
+
+
+# ------------------------------------------------------------------------
+# Generic steps for load runs
+# ------------------------------------------------------------------------
+
+
+@then(
+    "the (?P<statistic>p[0-9]+(?:\.[0-9]+)?|mean|max) latency should (?P<negate>not )?be below (?P<limit>[0-9.]+) ?ms"
+)
+def step_assert_load_latency(
+    ctx: Context, statistic: str, negate: str, limit: str
+) -> None:
+    """Checks a latency statistic of the last load run against a limit.
+
+    Args:
+        ctx: The behave context
+        statistic: The percentile (ie: p50, p99.9), mean or max latency
+        negate: A string representing whether or not a response should be negated. If it should be negated, it will have
+            a value 'not'. Otherwise, it will be None
+        limit: The limit in milliseconds
+
+    """
+    if statistic.startswith("p"):
+        latency = ctx.load_result.histogram.percentile(float(statistic[1:]))
+    else:
+        latency = ctx.load_result.histogram.summary()[statistic]
+    if negate:
+        LOGGER.debug(f"Checking that the {statistic} latency is not below {limit} ms.")
+        assert latency >= float(
+            limit
+        ), f"Expected the {statistic} latency to not be below {limit} ms, but it was {latency} ms"
+    else:
+        LOGGER.debug(f"Checking that the {statistic} latency is below {limit} ms.")
+        assert latency < float(
+            limit
+        ), f"Expected the {statistic} latency to be below {limit} ms, but it was {latency} ms. Load run: {ctx.load_result.summary()}"
+    LOGGER.debug(f"Validated the {statistic} latency of the load run: {latency} ms.")
+
+
+@then("the throughput should be at least (?P<limit>[0-9.]+) requests per second")
+def step_assert_load_throughput(ctx: Context, limit: str) -> None:
+    """Checks the throughput of the last load run against a minimum.
+
+    Args:
+        ctx: The behave context
+        limit: The minimum number of requests per second
+
+    """
+    throughput = ctx.load_result.throughput
+    assert throughput >= float(
+        limit
+    ), f"Expected a throughput of at least {limit} requests per second, but it was {throughput}"
+    LOGGER.debug(
+        f"Validated the throughput of the load run: {throughput} requests per second."
+    )
+
+
+@then("the error rate should be below (?P<limit>[0-9.]+) ?%")
+def step_assert_load_error_rate(ctx: Context, limit: str) -> None:
+    """Checks the percentage of failed requests of the last load run against a limit.
+
+    Args:
+        ctx: The behave context
+        limit: The limit in percent
+
+    """
+    error_rate = ctx.load_result.error_rate
+    assert error_rate < float(limit), (
+        f"Expected an error rate below {limit}%, but it was {error_rate}%."
+        f" Errors: {dict(ctx.load_result.errors)}"
+    )
+    LOGGER.debug(f"Validated the error rate of the load run: {error_rate}%.")
+
+
+# ------------------------------------------------------------------------
+# Supporting functions for steps
+# ------------------------------------------------------------------------
+
+
+def _assert_table_rows(ctx: Context, check_row: Callable[[Row], None]) -> None:
+    """Run a check on every row of the step table and report all failed rows in one failure.
+
+    Args:
+        ctx: The behave context
+        check_row: The function that checks a single row. It raises an AssertionError or KeyError
+            when the row fails
+
+    """
+    failures = []
+    for row_number, row in enumerate(ctx.table, start=1):
+        try:
+            check_row(row)
+        except (AssertionError, KeyError) as error:
+            failures.append(
+                f"  Row {row_number} | {' | '.join(row.cells)} | -> {error.args[0]}"
+            )
+    if failures:
+        failure_list = "\n".join(failures)
+        raise AssertionError(
+            f"{len(failures)} of {len(ctx.table.rows)} rows failed:\n{failure_list}\n"
+            f"Response: {ctx.response.text}"
+        )
+    LOGGER.debug(f"Validated all {len(ctx.table.rows)} rows of the table.")
+
+
+def _check_rest_response_key(
+    ctx: Context, negate: str, key: str, include_response: bool = True
+) -> None:
+    """Check that the JSON response does or does not contain a given key.
+
+    Args:
+        ctx: The behave context
+        negate: A string representing whether or not a response should be negated. If it should be negated, it will have
+            a value 'not'. Otherwise, it will be None
+        key: The key that should be present in the response
+        include_response: Whether the response is included in the failure message
+
+    """
+    list_of_values = CommonBehave.find_in_response(
+        ctx, CommonBehave.interpolate_context_attributes(ctx, f"$.{key}")
+    )
+    response = f" Response: {ctx.response.text}" if include_response else ""
+    if negate:
+        LOGGER.debug(f"Checking that the JSON response should not include key: {key}.")
+        assert (
+            not list_of_values
+        ), f"Expected no key to be found at '{key}', but it was present.{response}"
+        LOGGER.debug(f"Validated that the JSON response did not include key: {key}.")
+    else:
+        LOGGER.debug(f"Checking that the JSON response should include key: {key}.")
+        assert (
+            list_of_values
+        ), f"Expected key to be found at '{key}', but it was not present.{response}"
+        LOGGER.debug(f"Validated that the JSON response did include key: {key}.")
+
+
+def _check_rest_response_data_type(
+    ctx: Context, key: str, negate: str, data_type: str, include_response: bool = True
+) -> None:
+    """Check that the key in the response is or is not of the given data type.
+
+    Args:
+        ctx: The behave context
+        key: The key in the response
+        negate: A string representing whether or not a response should be negated. If it should be negated, it will have
+            a value 'not'. Otherwise, it will be None
+        data_type: The data type of the key
+        include_response: Whether the response is included in the failure message
+
+    """
+    list_of_values = CommonBehave.find_in_response(
+        ctx, CommonBehave.interpolate_context_attributes(ctx, f"$.{key}")
+    )
+    if list_of_values:
+        found_value = list_of_values[0]
+        class_name = found_value.__class__.__name__
+        if negate:
+            LOGGER.debug(
+                f"Checking that the JSON response at key: {key} should not have data type: {data_type}."
+            )
+            assert (
+                class_name != data_type
+            ), f"Expected the data type at key: '{key}' to not be '{data_type}', but we found: '{class_name}'"
+            LOGGER.debug(
+                f"Validated that the JSON response at key: {key} did not have data type: {data_type}."
+            )
+        else:
+            LOGGER.debug(
+                f"Checking that the JSON response at key: {key} should have data type: {data_type}."
+            )
+            assert (
+                class_name == data_type
+            ), f"Expected the data type at key: '{key}' to be '{data_type}', but we found: '{class_name}'"
+            LOGGER.debug(
+                f"Validated that the JSON response at key: {key} did have data type: {data_type}."
+            )
+    elif include_response:
+        raise KeyError(
+            f"No key: '{key}' found in the JSON response: {CommonBehave.get_response_json(ctx)}"
+        )
+    else:
+        raise KeyError(f"No key: '{key}' found in the JSON response")
+
+
+def _check_rest_response_value(
+    ctx: Context, key: str, negate: str, value: str, include_response: bool = True
+) -> None:
+    """Check that the value at a json path key in the response is or is not the given value.
+
+    Args:
+        ctx: behave context
+        key: json path key expression
+        negate: type of assert. Either should be or should not be. represented by optional gherkin syntax = 'no'
+        value: the expected value in the assert
+        include_response: Whether the response is included in the failure message
+
+    """
+    list_of_values = CommonBehave.find_in_response(
+        ctx, CommonBehave.interpolate_context_attributes(ctx, key)
+    )
+    desired_value = CommonBehave.interpolate_context_attributes(ctx, value)
+    if list_of_values:
+        found_value = str(list_of_values[0])
+
+        if negate:
+            LOGGER.debug(
+                f"Checking that the JSON response at key: {key} should not be: {value}."
+            )
+            assert (
+                found_value != desired_value
+            ), f"Expected the JSON value at key: {key} to not be: {desired_value}, but we found: {found_value}"
+            LOGGER.debug(
+                f"Validated that the JSON response at key: {key} was not value: {value}"
+            )
+        else:
+            LOGGER.debug(
+                f"Checking that the JSON response at key: {key} should be: {value}."
+            )
+            assert (
+                found_value == desired_value
+            ), f"Expected the JSON value at key: {key} to be: {desired_value}, but we found: {found_value}"
+            LOGGER.debug(
+                f"Validated that the JSON response at key: {key} was value: {value}"
+            )
+    elif include_response:
+        raise KeyError(
+            f"No key: '{key}' found in the JSON response: {CommonBehave.get_response_json(ctx)}"
+        )
+    else:
+        raise KeyError(f"No key: '{key}' found in the JSON response")
+
+
+def _get_streamed_segments(ctx: Context, key: str) -> Tuple[str, ...]:
+    """Get the plain path segments of a key for looking it up in a streamed response.
+
+    Args:
+        ctx: The behave context
+        key: The json path key expression
+
+    Returns:
+        The tuple of keys and indexes of the path. Raises a ValueError if the expression needs the
+        full jsonpath engine, since those can not be evaluated on a stream
+
+    """
+    segments = JsonPath.compile(
+        CommonBehave.interpolate_context_attributes(ctx, key)
+    ).segments
+    if segments is None:
+        raise ValueError(
+            f"Only plain paths (ie: $.a.b[0].c) can be checked in a streamed response. We found: {key}"
+        )
+    return segments
@@ -5,6 +5,7 @@ import logging
 from behave import given, use_step_matcher, when
 from behave.runner import Context
 import boto3
+from ns_requests.payload_templates import JsonBody
 
 LOGGER = logging.getLogger(__name__)
 
@@ -51,5 +52,9 @@ def send_s3_payload(ctx: Context, bucket: str, key_path: str) -> None:
     """
     LOGGER.debug(f"Attempting to send data to {bucket}/{key_path}")
     s3 = boto3.client("s3")
-    ctx.response = s3.put_object(Body=ctx.request_data, Bucket=bucket, Key=key_path)
+    body = ctx.request_data
+    # A rendered payload template is sent as its JSON text
+    if isinstance(body, JsonBody):
+        body = body.content
+    ctx.response = s3.put_object(Body=body, Bucket=bucket, Key=key_path)
     LOGGER.debug(f"Successfully sent data to {bucket}/{key_path}")
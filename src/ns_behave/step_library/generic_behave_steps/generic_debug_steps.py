@@ -74,7 +74,7 @@ def step_log_response(
     try:
         if hasattr(ctx, "response"):
             if response_type.upper() == "JSON":
-                response = pformat(ctx.response.json())
+                response = pformat(CommonBehave.get_response_json(ctx))
             else:
                 response = ctx.response
             LOGGER.info(response) if log_level == "info" else LOGGER.debug(response)
@@ -1,12 +1,17 @@
 """Common REST behave steps"""
 
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import time
+from typing import Any, Dict, Optional, Tuple
 
 from behave import use_step_matcher, when
 from behave.runner import Context
 from ns_behave.common.common_behave_functions import CommonBehave
 from ns_requests.generic_requests import GenericRequests
-from requests import Session
+from ns_requests.load_generator import LoadGenerator
+from ns_requests.streaming_json import StreamingJsonReader
+from requests import Response, Session
 
 # Enable the regex step matcher
 use_step_matcher("re")
@@ -15,6 +20,44 @@ use_step_matcher("re")
 LOGGER = logging.getLogger(__name__)
 
 
+# NOTE: This step must be registered before the generic request step since that step would
+# otherwise match the whole load step text as its endpoint
+@when(
+    "(?:a|an)? (?i)(?P<method>post|get|put|patch|delete|options) request is sent to (?P<endpoint>[^ ]+) (?P<count>[0-9]+) times with (?P<workers>[0-9]+) workers"
+)
+def step_send_generic_rest_request_load(
+    ctx: Context, method: str, endpoint: str, count: str, workers: str
+) -> None:
+    """Send the same rest request many times from a pool of workers and record the latencies.
+
+    Args:
+        ctx: The behave context
+        method: The REST method. ie: POST, GET, etc.
+        endpoint: The URL to send the request to. NOTE: BASE URL is already defined in framework setup
+        count: The total number of requests to send
+        workers: The number of requests in flight at once
+
+    Returns:
+        load_result saved on the behave context
+
+    """
+    url, headers, payload, _ = _get_request_attributes(ctx, endpoint)
+    client = getattr(ctx, "client") if hasattr(ctx, "client") else None
+    ctx.load_result = LoadGenerator.run(
+        client,
+        method.lower(),
+        url,
+        int(count),
+        int(workers),
+        headers=headers,
+        json=payload,
+    )
+    LOGGER.debug(f"Load run summary: {ctx.load_result.summary()}")
+    # Reset the request data but save on context in case we need it still
+    ctx.previous_payload = payload
+    ctx.request_data = None
+
+
 @when(
     "(?:a|an)? (?i)(?P<method>post|get|put|patch|delete|options) request is sent to (?i)(?P<endpoint>.*)"
 )
@@ -39,6 +82,190 @@ def step_send_generic_rest_request(ctx: Context, method: str, endpoint: str) ->
     Returns:
         response saved on the behave context
 
+    """
+    url, headers, payload, file = _get_request_attributes(ctx, endpoint)
+
+    # Check to see which session client to use. If there is no client saved to context
+    # use the pooled client session for the host.
+    if hasattr(ctx, "client"):
+        client = getattr(ctx, "client")
+    else:
+        LOGGER.debug(
+            "There was no client saved to the context. Using the pooled client for this request..."
+        )
+        client = GenericRequests.session_manager.get_session(url)
+
+    # Send the request
+    ctx.response = GenericRequests._generic_request(
+        client,
+        method.lower(),
+        url,
+        headers=headers,
+        json=payload,
+        file_path=file,
+        files=getattr(ctx, "files", None),
+    )
+    # Reset the request data but save on context in case we need it still
+    ctx.previous_payload = payload
+    ctx.request_data = None
+    ctx.files = None
+
+
+@when(
+    "(?:a|an)? (?i)(?P<method>post|get|put|patch|delete|options) request is streamed from (?P<endpoint>.*)"
+)
+def step_send_generic_rest_request_streamed(
+    ctx: Context, method: str, endpoint: str
+) -> None:
+    """Send a rest request to an endpoint without downloading the response body into memory.
+
+    Use this step for very large JSON responses. The body is read incrementally by the streamed
+    response assertion steps.
+
+    Args:
+        ctx: The behave context
+        method: The REST method. ie: POST, GET, etc.
+        endpoint: The URL to send the request to. NOTE: BASE URL is already defined in framework setup
+
+    Returns:
+        response and streamed_json saved on the behave context
+
+    """
+    url, headers, payload, file = _get_request_attributes(ctx, endpoint)
+    if hasattr(ctx, "client"):
+        client = getattr(ctx, "client")
+    else:
+        client = GenericRequests.session_manager.get_session(url)
+
+    ctx.response = GenericRequests._generic_request(
+        client,
+        method.lower(),
+        url,
+        headers=headers,
+        json=payload,
+        file_path=file,
+        stream=True,
+        files=getattr(ctx, "files", None),
+    )
+    ctx.streamed_json = StreamingJsonReader(ctx.response)
+    ctx.add_cleanup(ctx.streamed_json.close)
+    # Reset the request data but save on context in case we need it still
+    ctx.previous_payload = payload
+    ctx.request_data = None
+    ctx.files = None
+
+
+@when("the following requests are sent asynchronously(?::|)?")
+def step_send_generic_rest_requests_async(ctx: Context) -> None:
+    """Send a table of rest requests concurrently on the event loop owned by the context.
+
+    The table needs "method" and "endpoint" columns. Every request is sent with the headers and
+    payload saved on the context through the shared asyncio client session. If a client is saved
+    on the context its headers, auth and cookies are sent with every request.
+
+    Args:
+        ctx: The behave context
+
+    Returns:
+        responses saved on the behave context in table order. The last response is also saved as
+        the response so the assertion steps can be used on it.
+
+    """
+    engine = CommonBehave.get_async_requests(ctx)
+    session = getattr(ctx, "client", None)
+    pending_requests = []
+    payload = None
+    for row in ctx.table:
+        url, headers, payload, file = _get_request_attributes(ctx, row["endpoint"])
+        pending_requests.append(
+            engine._generic_request(
+                None,
+                row["method"].lower(),
+                url,
+                headers=headers,
+                json=payload,
+                file_path=file,
+                session=session,
+            )
+        )
+    LOGGER.debug(f"Sending {len(pending_requests)} requests asynchronously...")
+    ctx.responses = CommonBehave.run_async(ctx, *pending_requests)
+    ctx.response = ctx.responses[-1]
+    # Reset the request data but save on context in case we need it still
+    ctx.previous_payload = payload
+    ctx.request_data = None
+
+
+@when(
+    "the following requests are sent concurrently(?: with (?P<workers>[0-9]+) workers)?(?::|)?"
+)
+def step_send_generic_rest_requests_concurrently(
+    ctx: Context, workers: str = None
+) -> None:
+    """Send a table of rest requests concurrently through a bounded thread pool.
+
+    The table needs "method" and "endpoint" columns. An optional "payload" column holds the name of
+    a context variable to send as the payload of that row. Rows without one use the request data
+    saved on the context. The number of workers defaults to the `max_concurrent_requests` user
+    data value, or 10 if it is not set.
+
+    Args:
+        ctx: The behave context
+        workers: (OPTIONAL) The maximum number of requests in flight at once
+
+    Returns:
+        responses and response_latencies (in milliseconds) saved on the behave context in table
+        order. The last response is also saved as the response so the assertion steps can be used
+        on it.
+
+    """
+    max_workers = int(workers or ctx.config.userdata.get("max_concurrent_requests", 10))
+    client = getattr(ctx, "client") if hasattr(ctx, "client") else None
+    # Resolve every row on the main thread so the workers never touch the context
+    pending_requests = []
+    payload = None
+    for row in ctx.table:
+        url, headers, payload, file = _get_request_attributes(ctx, row["endpoint"])
+        if "payload" in row.headings and row["payload"]:
+            payload = getattr(ctx, row["payload"])
+        pending_requests.append(
+            (
+                client,
+                row["method"].lower(),
+                url,
+                {"headers": headers, "json": payload, "file_path": file},
+            )
+        )
+    LOGGER.debug(
+        f"Sending {len(pending_requests)} requests concurrently with {max_workers} workers..."
+    )
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_send_timed_request, pending_requests))
+    ctx.responses = [response for response, _ in results]
+    ctx.response_latencies = [latency for _, latency in results]
+    ctx.response = ctx.responses[-1]
+    # Reset the request data but save on context in case we need it still
+    ctx.previous_payload = payload
+    ctx.request_data = None
+
+
+# ------------------------------------------------------------------------
+# Supporting functions for steps
+# ------------------------------------------------------------------------
+
+
+def _get_request_attributes(
+    ctx: Context, endpoint: str
+) -> Tuple[str, Optional[Dict[str, Any]], Any, Optional[str]]:
+    """Get the URL, headers, payload and file to send a request with from the behave context
+
+    Args:
+        ctx: The behave context
+        endpoint: The URL to send the request to. NOTE: BASE URL is already defined in framework setup
+
+    Returns:
+        A tuple of the interpolated URL, the headers, the payload and the file path
+
     """
     # First form a URL using any variables that were stored in the context and denoted in the endpoint
     url = CommonBehave.interpolate_context_attributes(
@@ -65,21 +292,22 @@ def step_send_generic_rest_request(ctx: Context, method: str, endpoint: str) ->
         LOGGER.debug(f"We found a file to use as our payload. File path: {file}")
     else:
         file = None
+    return url, headers, payload, file
 
-    # Check to see which session client to use. If there is no client saved to context
-    # create a new client session to use.
-    if hasattr(ctx, "client"):
-        client = getattr(ctx, "client")
-    else:
-        LOGGER.debug(
-            "There was no client saved to the context. Generating a new client for this request..."
-        )
-        client = Session()
 
-    # Send the request
-    ctx.response = GenericRequests._generic_request(
-        client, method.lower(), url, headers=headers, json=payload, file_path=file
-    )
-    # Reset the request data but save on context in case we need it still
-    ctx.previous_payload = payload
-    ctx.request_data = None
+def _send_timed_request(
+    pending_request: Tuple[Optional[Session], str, str, Dict[str, Any]]
+) -> Tuple[Response, float]:
+    """Send a request and measure how long it took
+
+    Args:
+        pending_request: A tuple of the client, method, URL and keyword arguments of the request
+
+    Returns:
+        A tuple of the response and the latency of the request in milliseconds
+
+    """
+    client, method, url, kwargs = pending_request
+    start = time.perf_counter()
+    response = GenericRequests._generic_request(client, method, url, **kwargs)
+    return response, (time.perf_counter() - start) * 1000
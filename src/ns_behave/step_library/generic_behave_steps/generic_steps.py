@@ -1,13 +1,17 @@
 """Generic step definitions for REST APIs"""
 
+import copy
 import logging
-from typing import Dict, Union
+from typing import Any, Dict, Union
 import uuid
 
 from behave import given, step, use_step_matcher
 from behave.runner import Context
-from jsonpath import jsonpath
 from ns_behave.common.common_behave_functions import CommonBehave
+from ns_behave.common.json_mutation import JsonMutator
+from ns_behave.common.json_path import JsonPath
+from ns_requests.download import DownloadedFile
+from ns_requests.multipart import MultipartFile
 
 # Enable the regex step matcher for behave in this class
 use_step_matcher("re")
@@ -109,17 +113,22 @@ def step_save_response_attribute_to_context(
 
     """
     interpolated_key = CommonBehave.interpolate_context_attributes(ctx, f"$.{key}")
-    list_of_values = jsonpath(ctx.response.json(), interpolated_key)
+    list_of_values = JsonPath.find(
+        CommonBehave.get_response_json(ctx), interpolated_key
+    )
     LOGGER.debug(
         f"Attempting to save JSON response at: {interpolated_key} as: {value_name}."
     )
     if list_of_values:
         found_value = list_of_values[0]
+        # The decoded response is shared between steps so save a copy of any collection
+        if isinstance(found_value, (dict, list)):
+            found_value = copy.deepcopy(found_value)
         setattr(ctx, value_name, found_value)
         LOGGER.debug(f"Successfully saved response attribute: {key} as {value_name}.")
     else:
         raise KeyError(
-            f"No key: '{interpolated_key}' found in the JSON response: {ctx.response.json()}"
+            f"No key: '{interpolated_key}' found in the JSON response: {CommonBehave.get_response_json(ctx)}"
         )
 
 
@@ -135,6 +144,35 @@ def step_save_response_attributes_to_context(ctx: Context) -> None:
         step_save_response_attribute_to_context(ctx, row[0], row[1])
 
 
+@step('the response body is saved to (?:a temporary file|file "(?P<path>.*)")')
+def step_save_response_body_to_file(ctx: Context, path: str = None) -> None:
+    """Downloads the body of the last response to a file, computing its checksums on the way.
+
+    Send the request with the streamed request step (ie: "a GET request is streamed from ...") so
+    the body is written to disk in chunks and never held in memory. The checksums computed during
+    the download are set by the comma separated `download_checksums` user data value (default
+    sha256,md5). A temporary file is removed when the scenario ends.
+
+    Args:
+        ctx: The behave context
+        path: (OPTIONAL) The file to save the body to. A temporary file is used if None
+
+    Returns:
+        downloaded_file saved on the behave context
+
+    """
+    if path is not None:
+        path = CommonBehave.interpolate_context_attributes(ctx, path)
+    algorithms = ctx.config.userdata.get("download_checksums", "sha256,md5")
+    ctx.downloaded_file = DownloadedFile.download(
+        ctx.response,
+        path,
+        algorithms=[algorithm.strip() for algorithm in algorithms.split(",")],
+    )
+    ctx.add_cleanup(ctx.downloaded_file.close)
+    LOGGER.debug(f"Successfully saved the response body to: {ctx.downloaded_file}.")
+
+
 @given('the (?:JSON|json)? payload at "(?P<key>.*)" is saved as "(?P<value_name>.*)"')
 def step_save_request_attribute_to_context(
     ctx: Context, key: str, value_name: str
@@ -148,7 +186,7 @@ def step_save_request_attribute_to_context(
 
     """
     LOGGER.debug(f"Attempting to save JSON payload at: {key} as: {value_name}.")
-    list_of_values = jsonpath(ctx.request_data, f"$.{key}")
+    list_of_values = JsonPath.find(ctx.request_data, f"$.{key}")
     if list_of_values:
         found_value = list_of_values[0]
         setattr(ctx, value_name, found_value)
@@ -179,30 +217,42 @@ def step_save_position_attribute_to_context(
     """
     interpolated_key = CommonBehave.interpolate_context_attributes(ctx, key)
     interpolated_value = CommonBehave.interpolate_context_attributes(ctx, value)
-    # Check if we are at the root of the json. If we are then use the '.' instead of the json key
-    if json_key:
-        list_of_values = jsonpath(ctx.response.json(), json_key)
-    else:
-        list_of_values = jsonpath(ctx.response.json(), ".")
     LOGGER.debug(
-        f"Attempting to find position where key: {key} is value: {value} at: {list_of_values}."
+        f"Attempting to find position where key: {key} is value: {value} at: {json_key}."
     )
-    if list_of_values:
-        json_objects = list_of_values[0]
-        for json_object in json_objects:
-            if json_object[interpolated_key] == interpolated_value:
-                setattr(ctx, "position", str(json_objects.index(json_object)))
-                LOGGER.debug(
-                    f"Successfully saved position as: {ctx.position} for key: {key} and value {value} at {list_of_values}."
-                )
-                break
-        else:
-            raise KeyError(
-                f"No key: '{interpolated_key}' found in the dictionary: {json_object}"
-            )
-    else:
-        raise KeyError(
-            f"No collection found at '{json_key}' in the JSON response: {ctx.response.json()}"
+    position = _find_position(ctx, json_key, interpolated_key, interpolated_value)
+    setattr(ctx, "position", str(position))
+    LOGGER.debug(
+        f"Successfully saved position as: {ctx.position} for key: {key} and value {value} at {json_key}."
+    )
+
+
+@step(
+    'the positions where "(?P<key>.*)" is the following values are saved from the JSON response(?: at "(?P<json_key>.*)")?(?::|)?'
+)
+def step_save_position_attributes_to_context(
+    ctx: Context, key: str, json_key: str = None
+) -> None:
+    """Save the positions of many values of a key in a collection of the JSON response to the behave context
+
+    The table needs "value" and "name" columns. The position of the first object in the collection
+    whose key has the value is saved as the name. The collection is indexed once for all the rows.
+
+    Args:
+        ctx: The behave context
+        key: The positional key that is being searched for
+        json_key: The json key that indicates where the search for the positional key should occur
+
+    """
+    interpolated_key = CommonBehave.interpolate_context_attributes(ctx, key)
+    for row in ctx.table:
+        interpolated_value = CommonBehave.interpolate_context_attributes(
+            ctx, row["value"]
+        )
+        position = _find_position(ctx, json_key, interpolated_key, interpolated_value)
+        setattr(ctx, row["name"], str(position))
+        LOGGER.debug(
+            f"Successfully saved position as: {row['name']} for key: {key} and value {row['value']}."
         )
 
 
@@ -228,18 +278,39 @@ def step_generic_modify_request_json(ctx: Context, target_key: str, value: str)
     )
     desired_value = CommonBehave.interpolate_context_attributes(ctx, value)
     parsed_key = CommonBehave.interpolate_context_attributes(ctx, target_key)
-    if desired_value.lower() in ("none", "null"):
-        ctx.request_data = modify_json_value(ctx.request_data, parsed_key, None)
-    elif desired_value.lower() in ("invalid", "empty", "empty string"):
-        ctx.request_data = modify_json_value(ctx.request_data, parsed_key, "")
-    elif desired_value.lower() in "uuid":
-        ctx.request_data = modify_json_value(
-            ctx.request_data, parsed_key, str(uuid.uuid4())
-        )
-    else:
-        ctx.request_data = modify_json_value(
-            ctx.request_data, parsed_key, desired_value
+    # Copy on write so a payload shared with other context variables is not changed
+    ctx.request_data = JsonMutator.compile(parsed_key).apply(
+        ctx.request_data, _parse_modified_value(desired_value), copy_on_write=True
+    )
+    LOGGER.debug("Successfully updated JSON request payload.")
+
+
+@given("the (?:JSON|json)? request payload is modified as follows(?::|)?")
+def step_generic_modify_request_json_table(ctx: Context) -> None:
+    """Modifies the request data in the behave context with every key and value of the table in one pass.
+
+    The table needs "key" and "value" columns. Keys can index into lists (ie: items[0].name) and
+    use * to modify every item of a collection (ie: items[*].name).
+
+    Args:
+        ctx: The behave context
+
+    """
+    modifications = [
+        (
+            CommonBehave.interpolate_context_attributes(ctx, row["key"]),
+            _parse_modified_value(
+                CommonBehave.interpolate_context_attributes(ctx, row["value"])
+            ),
         )
+        for row in ctx.table
+    ]
+    LOGGER.debug(
+        f"Attempting to apply {len(modifications)} modifications to the JSON request payload."
+    )
+    ctx.request_data = JsonMutator.apply(
+        ctx.request_data, modifications, copy_on_write=True
+    )
     LOGGER.debug("Successfully updated JSON request payload.")
 
 
@@ -310,6 +381,58 @@ def step_generic_json_dictionary(ctx: Context, value_name: str = None) -> None:
     LOGGER.debug(f"Successfully saved payload: {payload} as: {value_name}.")
 
 
+@given(
+    'the payload template "(?P<template>.*)" is used as the request data(?: with the following values)?(?::|)?'
+)
+def step_render_payload_template(ctx: Context, template: str) -> None:
+    """Sets the request data to a payload template with its placeholders filled in.
+
+    Templates are the JSON files in the directory set by the `payload_template_dir` user data value.
+    Placeholders are filled from the optional key and value table first and then from the context.
+    Only the placeholder slots are substituted, the rest of the payload is sent as it was read.
+
+    Args:
+        ctx: The behave context
+        template: The name of the template. Its path relative to the directory without the extension
+
+    """
+    LOGGER.debug(f"Attempting to render the payload template: {template}.")
+    values: Dict[str, Union[str, int]] = {}
+    for row in ctx.table or []:
+        value = CommonBehave.interpolate_context_attributes(ctx, row[1])
+        # If value is a digit .. cast to int
+        values[row[0]] = int(value) if value.isdigit() else value
+    ctx.request_data = CommonBehave.render_payload_template(
+        ctx, CommonBehave.interpolate_context_attributes(ctx, template), values
+    )
+    LOGGER.debug(f"Successfully rendered the payload template: {ctx.request_data}.")
+
+
+@given("the following files are uploaded with the request(?::|)?")
+def step_set_request_files(ctx: Context) -> None:
+    """Sets the files to upload with the next request as a streamed multipart body.
+
+    The table needs a "path" column. The optional "field" column holds the form field name of each
+    file (default upload_file) and the optional "content_type" column its content type (guessed
+    from the file name by default). Files are read from disk in chunks while they are sent, so
+    files of any size can be uploaded.
+
+    Args:
+        ctx: The behave context
+
+    """
+    ctx.files = []
+    for row in ctx.table:
+        ctx.files.append(
+            MultipartFile(
+                CommonBehave.interpolate_context_attributes(ctx, row["path"]),
+                field=row.get("field") or "upload_file",
+                content_type=row.get("content_type") or None,
+            )
+        )
+    LOGGER.debug(f"Successfully set the files to upload: {ctx.files}.")
+
+
 # ------------------------------------------------------------------------
 # Supporting functions for steps
 # ------------------------------------------------------------------------
@@ -318,29 +441,58 @@ def step_generic_json_dictionary(ctx: Context, value_name: str = None) -> None:
 def modify_json_value(
     current_payload: dict, path_to_value: str, new_value: str
 ) -> dict:
-    """Function that will recursively traverse a dictionary and replace a value at a given key.
+    """Function that will traverse a dictionary and replace a value at a given key.
 
     The "key" is evaluated using JSON path such as "first_key.nested_key" when we have nested dictionaries.
+    List indexes (ie: "items[0].name") and wildcards (ie: "items[*].name") are supported too.
 
     Args:
-        current_payload: the dictionary we want to recursively search for a key value pair to replace
+        current_payload: the dictionary we want to search for a key value pair to replace
         path_to_value: the JSON path expression of the key to search for
         new_value: The new value we will replace at the key once found
 
     """
-    if "." not in path_to_value:
-        current_payload[path_to_value] = new_value
-        return current_payload
-    else:
-        first_key = path_to_value.split(".")[0]
-        remaining_keys = ".".join(path_to_value.split(".")[1:])
-        # TODO: QUALITY-713 - evaluate 'first_key' and check if it contains []. If so we need to traverse in the array.
-        if first_key in current_payload:
-            current_payload[first_key] = modify_json_value(
-                current_payload[first_key], remaining_keys, new_value
-            )
-        else:
-            raise KeyError(
-                f"No key: '{first_key}' found in the request payload: {current_payload}"
-            )
-        return current_payload
+    return JsonMutator.compile(path_to_value).apply(current_payload, new_value)
+
+
+def _parse_modified_value(desired_value: str) -> Any:
+    """Convert the string representation of a modified payload value into the actual value.
+
+    Args:
+        desired_value: A string representation of what the new value should be
+
+    Returns:
+        The actual value
+
+    """
+    if desired_value.lower() in ("none", "null"):
+        return None
+    elif desired_value.lower() in ("invalid", "empty", "empty string"):
+        return ""
+    elif desired_value.lower() in "uuid":
+        return str(uuid.uuid4())
+    return desired_value
+
+
+def _find_position(ctx: Context, json_key: str, key: str, value: str) -> int:
+    """Find the position of the first object in a collection of the response with a value at a key
+
+    Args:
+        ctx: The behave context
+        json_key: The json key of the collection. The root of the response if None
+        key: The key of the objects in the collection
+        value: The value the key should have
+
+    Returns:
+        The position of the object in the collection
+
+    """
+    index = CommonBehave.get_keyed_collection_index(ctx, json_key, key)
+    if index is None:
+        raise KeyError(
+            f"No collection found at '{json_key}' in the JSON response: {CommonBehave.get_response_json(ctx)}"
+        )
+    position = index.position(value)
+    if position is None:
+        raise KeyError(f"No key: '{key}' found in the dictionary: {index.last_object}")
+    return position
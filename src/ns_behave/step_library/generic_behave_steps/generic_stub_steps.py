@@ -0,0 +1,140 @@
+"""Generic steps that drive the local stub server standing in for downstream services"""
+
+import logging
+
+from behave import given, step, then, use_step_matcher
+from behave.runner import Context
+from ns_behave.common.common_behave_functions import CommonBehave
+from ns_requests.stub_server import StubRoute, StubServer
+
+# Enable the regex step matcher
+use_step_matcher("re")
+
+# Setup a logger
+LOGGER = logging.getLogger(__name__)
+
+
+@given("the stub server is started(?: with a latency of (?P<latency>[0-9.]+) ?ms)?")
+def step_start_stub_server(ctx: Context, latency: str = None) -> None:
+    """Start a local stub server and send every following request to it.
+
+    The gateway base URL on the context is pointed at the stub server until the scenario ends. The
+    server binds to the `stub_port` user data value, or a free port if it is not set. Every
+    response is delayed by the latency unless its route sets its own.
+
+    Args:
+        ctx: The behave context
+        latency: (OPTIONAL) The default milliseconds to wait before every response
+
+    Returns:
+        stub_server saved on the behave context
+
+    """
+    ctx.stub_server = StubServer(
+        port=int(ctx.config.userdata.get("stub_port", 0)),
+        latency_ms=float(latency or 0),
+    ).start()
+    ctx.add_cleanup(ctx.stub_server.stop)
+    ctx.gateway_base_url = ctx.stub_server.url
+
+
+@step(
+    'the stub returns (?P<status>[0-9]{3})(?: with the payload (?:"(?P<payload>.*?)"|from context variable "(?P<context_variable>.*?)"))? for (?i)(?P<method>post|get|put|patch|delete|options|head|any) (?P<path>[^ ]+)(?: after (?P<latency>[0-9.]+) ?ms)?(?::|)?'
+)
+def step_add_stub_route(
+    ctx: Context,
+    status: str,
+    method: str,
+    path: str,
+    payload: str = None,
+    context_variable: str = None,
+    latency: str = None,
+) -> None:
+    """Answer the requests to a path of the stub server with a canned response.
+
+    The payload is either the quoted text as is (ie: JSON), the value of a context variable or the
+    docstring of the step. It is sent as application/json if it is JSON and as text/plain
+    otherwise. Context variables in the path are interpolated. A `*` in the path matches any
+    characters (ie: orders/*).
+
+    Args:
+        ctx: The behave context
+        status: The status code to return
+        method: The REST method to answer. ie: POST, GET, etc. ANY answers every method
+        path: The path to answer, relative to the stub server base URL
+        payload: (OPTIONAL) The response body
+        context_variable: (OPTIONAL) The name of the context variable holding the response body
+        latency: (OPTIONAL) The milliseconds to wait before responding
+
+    """
+    if context_variable:
+        body = getattr(ctx, context_variable)
+    elif payload is not None:
+        body = payload
+    else:
+        body = ctx.text
+    path = CommonBehave.interpolate_context_attributes(ctx=ctx, value=path)
+    route = ctx.stub_server.add_route(
+        StubRoute(
+            "*" if method.lower() == "any" else method,
+            f"/{path.lstrip('/')}",
+            status=int(status),
+            body=body,
+            latency_ms=None if latency is None else float(latency),
+        )
+    )
+    LOGGER.debug(f"Added the stub route: {route}")
+
+
+@then(
+    "the stub server should (?P<negate>not )?have received (?P<count>[0-9]+) (?i)(?P<method>post|get|put|patch|delete|options|head|any) requests? (?:for|to) (?P<path>[^ ]+)"
+)
+def step_assert_stub_requests(
+    ctx: Context, negate: str, count: str, method: str, path: str
+) -> None:
+    """Checks the number of requests the stub server received for a path.
+
+    Args:
+        ctx: The behave context
+        negate: A string representing whether or not a response should be negated. If it should be negated, it will have
+            a value 'not'. Otherwise, it will be None
+        count: The number of requests
+        method: The REST method of the requests. ANY counts every method
+        path: The path of the requests. A `*` matches any characters
+
+    """
+    path = CommonBehave.interpolate_context_attributes(ctx=ctx, value=path)
+    received = ctx.stub_server.received(
+        "*" if method.lower() == "any" else method, f"/{path.lstrip('/')}"
+    )
+    if negate:
+        assert len(received) != int(
+            count
+        ), f"Expected the stub server to not have received {count} {method} requests for {path}"
+    else:
+        assert len(received) == int(
+            count
+        ), f"Expected the stub server to have received {count} {method} requests for {path}, but it received {len(received)}"
+
+
+@step(
+    'the last (?i)(?P<method>post|get|put|patch|delete|options|any) request received by the stub server for (?P<path>[^ ]+) is saved as "(?P<value_name>.*)"'
+)
+def step_save_stub_request(
+    ctx: Context, method: str, path: str, value_name: str
+) -> None:
+    """Save the JSON body of the last request the stub server received for a path to the behave context.
+
+    Args:
+        ctx: The behave context
+        method: The REST method of the request. ANY matches every method
+        path: The path of the request. A `*` matches any characters
+        value_name: The name of the context attribute to save the body to
+
+    """
+    path = CommonBehave.interpolate_context_attributes(ctx=ctx, value=path)
+    received = ctx.stub_server.received(
+        "*" if method.lower() == "any" else method, f"/{path.lstrip('/')}"
+    )
+    assert received, f"The stub server has not received a {method} request for {path}"
+    setattr(ctx, value_name, received[-1].json())
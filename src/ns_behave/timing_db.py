@@ -0,0 +1,193 @@
+"""Historical feature and scenario durations for scheduling parallel runs
+
+The parallel runner records how long every feature and scenario took in a local SQLite database.
+The expected duration of a feature is the average of its most recent runs. The runner uses it to:
+- Start the longest features first, so a slow feature does not start last and hold up the run
+- Split the suite into shards of about the same expected duration (`--shard i/N`) instead of the
+  same number of files. Features are placed longest first on the shard with the least work so far
+
+Features with no history are expected to take the median duration of the known features.
+"""
+import logging
+import os
+import sqlite3
+import statistics
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+# The duration of a feature when there is no history at all
+DEFAULT_SECONDS = 1.0
+
+
+class TimingDatabase:
+    """SQLite database of the durations of past feature and scenario runs"""
+
+    def __init__(self, path: str, history: int = 5) -> None:
+        """Initialize a TimingDatabase, creating its tables if needed
+
+        Args:
+            path: The SQLite database file
+            history: The number of most recent runs averaged for the expected duration
+
+        """
+        self.path = path
+        self.history = history
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS feature_runs "
+                "(feature TEXT NOT NULL, seconds REAL NOT NULL, status TEXT, recorded_at REAL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS scenario_runs "
+                "(feature TEXT NOT NULL, scenario TEXT NOT NULL, seconds REAL NOT NULL, "
+                "status TEXT, recorded_at REAL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS feature_runs_feature ON feature_runs (feature)"
+            )
+
+    @staticmethod
+    def feature_key(feature: str) -> str:
+        """Normalize a feature path so the same file is recorded under one name
+
+        Args:
+            feature: The feature file path (optionally with a line number)
+
+        Returns:
+            The normalized path with forward slashes
+
+        """
+        return os.path.normpath(feature).replace(os.sep, "/")
+
+    def record_feature(
+        self,
+        feature: str,
+        seconds: float,
+        status: str,
+        report: Iterable[Dict[str, Any]] = (),
+    ) -> None:
+        """Record a run of a feature and its scenarios
+
+        Args:
+            feature: The feature file that was run
+            seconds: The number of seconds the feature took
+            status: The status of the feature run. ie: passed, failed
+            report: (OPTIONAL) The features of the behave JSON report of the run. The duration of
+                every scenario is the sum of the durations of its steps
+
+        """
+        now = time.time()
+        key = TimingDatabase.feature_key(feature)
+        scenarios: List[Tuple[str, str, float, str, float]] = []
+        for report_feature in report:
+            for element in report_feature.get("elements", []):
+                if element.get("type") != "scenario":
+                    continue
+                scenario_seconds = sum(
+                    step.get("result", {}).get("duration", 0)
+                    for step in element.get("steps", [])
+                )
+                scenarios.append(
+                    (
+                        key,
+                        element.get("name", ""),
+                        scenario_seconds,
+                        element.get("status"),
+                        now,
+                    )
+                )
+        with self._connection:
+            self._connection.execute(
+                "INSERT INTO feature_runs VALUES (?, ?, ?, ?)",
+                (key, seconds, status, now),
+            )
+            self._connection.executemany(
+                "INSERT INTO scenario_runs VALUES (?, ?, ?, ?, ?)", scenarios
+            )
+
+    def expected_seconds(self, features: Iterable[str]) -> Dict[str, float]:
+        """Get the expected duration of features from their most recent runs
+
+        Args:
+            features: The feature files
+
+        Returns:
+            A dict of the expected seconds by feature as it was given
+
+        """
+        known: Dict[str, Optional[float]] = {}
+        for feature in features:
+            rows = self._connection.execute(
+                "SELECT seconds FROM feature_runs WHERE feature = ? "
+                "ORDER BY recorded_at DESC LIMIT ?",
+                (TimingDatabase.feature_key(feature), self.history),
+            ).fetchall()
+            if rows:
+                known[feature] = sum(row[0] for row in rows) / len(rows)
+            else:
+                known.setdefault(feature, None)
+        durations = [seconds for seconds in known.values() if seconds is not None]
+        default = statistics.median(durations) if durations else DEFAULT_SECONDS
+        return {
+            feature: default if seconds is None else seconds
+            for feature, seconds in known.items()
+        }
+
+    def close(self) -> None:
+        """Close the database"""
+        self._connection.close()
+
+
+def longest_first(features: Sequence[str], expected: Dict[str, float]) -> List[str]:
+    """Order features by their expected duration, longest first
+
+    Args:
+        features: The feature files
+        expected: The expected seconds of every feature
+
+    Returns:
+        The features ordered longest first. Features of the same duration keep their order
+
+    """
+    return sorted(features, key=lambda feature: -expected.get(feature, DEFAULT_SECONDS))
+
+
+def shard(
+    features: Sequence[str], expected: Dict[str, float], index: int, count: int
+) -> List[str]:
+    """Get the features of one shard of a suite split into shards of about the same duration
+
+    Every shard computes the same split, so the shards of a CI job only need the same feature list
+    and timing database.
+
+    Args:
+        features: The feature files of the whole suite
+        expected: The expected seconds of every feature
+        index: The number of the shard to get, from 1 to count
+        count: The number of shards
+
+    Returns:
+        The features of the shard, longest first
+
+    """
+    if not 1 <= index <= count:
+        raise ValueError(
+            f"The shard number must be between 1 and {count}. We found: {index}"
+        )
+    loads = [0.0] * count
+    shards: List[List[str]] = [[] for _ in range(count)]
+    for feature in longest_first(features, expected):
+        lightest = loads.index(min(loads))
+        shards[lightest].append(feature)
+        loads[lightest] += expected.get(feature, DEFAULT_SECONDS)
+    LOGGER.debug(
+        f"Expected shard durations in seconds: {[round(load, 1) for load in loads]}"
+    )
+    return shards[index - 1]
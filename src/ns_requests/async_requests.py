@@ -0,0 +1,469 @@
+"""Asyncio REST request functions that mirror the GenericRequests wrapper
+
+These functions allow scenarios that fan out to many endpoints to send their requests concurrently
+on one event loop. Every request returns a requests.Response object so the existing assertion steps
+keep working on the results.
+
+These functions will allow for the following REST operations:
+1) POST
+2) GET
+3) PUT
+4) PATCH
+5) DELETE
+6) OPTIONS
+"""
+from datetime import timedelta
+import io
+import logging
+import os
+import time
+from typing import Any, Dict
+
+import aiohttp
+from ns_requests.generic_requests import GenericRequests
+from ns_requests.json_response import JsonResponseView
+from ns_requests.request_timing import RequestTiming, RequestTimingLog
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+
+class AsyncGenericRequests:
+    """Holds all generic asyncio methods for REST requests
+
+    One shared connector is used by every request sent through the instance so connections are
+    pooled and kept alive. The instance must be used from a single event loop.
+    """
+
+    def __init__(
+        self, limit: int = 100, limit_per_host: int = 20, keepalive_timeout: float = 15
+    ) -> None:
+        """Initialize an AsyncGenericRequests engine
+
+        Args:
+            limit: The total number of simultaneous connections
+            limit_per_host: The number of simultaneous connections to a single host
+            keepalive_timeout: The number of seconds an idle connection is kept open
+
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._connector: aiohttp.TCPConnector = None
+        self._session: aiohttp.ClientSession = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared client session, creating it and its connector on first use
+
+        NOTE: This must be called from inside the running event loop.
+
+        Returns:
+            The shared aiohttp.ClientSession object
+
+        """
+        if self._session is None or self._session.closed:
+            self._connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            # Cookies are never shared between requests of different users through the engine.
+            # They are only kept on the requests session of a user (see _save_cookies)
+            self._session = aiohttp.ClientSession(
+                connector=self._connector, cookie_jar=aiohttp.DummyCookieJar()
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Close the shared client session and its connector"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._connector = None
+
+    @staticmethod
+    def _session_headers(
+        session: requests.Session, method: str, url: str, headers: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """Merge the headers, auth and cookies of a requests session into the request headers
+
+        The headers are built the same way the session prepares a request, so the request is sent
+        as the same user as the synchronous steps.
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            session: The requests session of the user
+            method: The method of the request
+            url: The URL the request is sent to
+            headers: (OPTIONAL) The headers dict of the request. They win over the session headers
+
+        Return:
+            The merged headers dict
+
+        """
+        prepared = session.prepare_request(
+            requests.Request(method=method.upper(), url=url, headers=headers)
+        )
+        # aiohttp sets the length of the body it sends
+        prepared.headers.pop("Content-Length", None)
+        return dict(prepared.headers)
+
+    @staticmethod
+    def _save_cookies(
+        session: requests.Session, client_response: aiohttp.ClientResponse
+    ) -> None:
+        """Save the cookies set by a response on the requests session of the user
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            session: The requests session of the user
+            client_response: The aiohttp response object
+
+        """
+        for name, morsel in client_response.cookies.items():
+            session.cookies.set(
+                name,
+                morsel.value,
+                domain=morsel["domain"] or client_response.url.host,
+                path=morsel["path"] or "/",
+            )
+
+    @staticmethod
+    def _to_response(
+        method: str,
+        url: str,
+        client_response: aiohttp.ClientResponse,
+        body: bytes,
+        elapsed: float,
+        headers: Dict[str, Any] = None,
+    ) -> requests.Response:
+        """Convert an aiohttp response into a requests.Response object
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            method: The method of the request that was sent
+            url: The URL the request was sent to
+            client_response: The aiohttp response object
+            body: The fully read response body
+            elapsed: The number of seconds the request took
+            headers: (OPTIONAL) The headers dict that was sent with the request
+
+        Return:
+            requests.Response object
+
+        """
+        response = requests.Response()
+        response.status_code = client_response.status
+        response.reason = client_response.reason
+        response.headers = CaseInsensitiveDict(client_response.headers)
+        response.url = str(client_response.url)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.elapsed = timedelta(seconds=elapsed)
+        response._content = body
+        # The body was already read, so iter_content and raw readers get it from memory
+        response._content_consumed = True
+        response.raw = io.BytesIO(body)
+        response.request = requests.Request(
+            method=method.upper(), url=url, headers=headers
+        ).prepare()
+        # Only the total time and body size are known for requests sent through aiohttp
+        response.timing = RequestTiming()
+        response.timing.total_ms = elapsed * 1000
+        response.timing.bytes_received = len(body)
+        RequestTimingLog.record(method, url, response.timing)
+        JsonResponseView.attach(response)
+        return response
+
+    async def _generic_request(
+        self,
+        client: aiohttp.ClientSession,
+        method: str,
+        url: str,
+        headers: Dict[str, Any] = None,
+        json: Dict[str, Any] = None,
+        data: Any = None,
+        file_path: str = None,
+        session: requests.Session = None,
+    ) -> requests.Response:
+        """Common asyncio REST request that uses the aiohttp library.
+
+        This will read in a client session object to use as a client.
+        If no client is read in we will use the shared client session of this engine.
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            client: The aiohttp client session object
+            method: The method of the desired request. IE: POST, GET, etc...
+            url: The URL to send the request to
+            headers: (OPTIONAL) The headers dict to send with the request
+            json: (OPTIONAL) The JSON data to send with the request
+            data: (OPTIONAL) The data to send with the request. Can be any MIME type
+            file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            session: (OPTIONAL) The requests session of the user. Its headers, auth and cookies
+                are sent with the request and cookies set by the response are saved on it
+
+        Return:
+            requests.Response object
+
+        """
+        if session is not None:
+            headers = AsyncGenericRequests._session_headers(
+                session, method, url, headers
+            )
+        GenericRequests._log_request(method, url, headers, json, data, file_path)
+        headers, json, data = GenericRequests._prepare_json_body(headers, json, data)
+        if not client:
+            client = self._get_session()
+        start = time.perf_counter()
+        # We have a file payload to upload
+        if file_path:
+            with open(file_path, "rb") as file:
+                form = aiohttp.FormData()
+                form.add_field(
+                    "upload_file", file, filename=os.path.basename(file_path)
+                )
+                async with client.request(
+                    method, url, data=form, headers=headers
+                ) as client_response:
+                    body = await client_response.read()
+        else:
+            async with client.request(
+                method, url, json=json, data=data, headers=headers
+            ) as client_response:
+                body = await client_response.read()
+        response = self._to_response(
+            method, url, client_response, body, time.perf_counter() - start, headers
+        )
+        if session is not None:
+            AsyncGenericRequests._save_cookies(session, client_response)
+        GenericRequests._log_response(response)
+        return response
+
+    async def post_request(
+        self,
+        client: aiohttp.ClientSession,
+        url: str,
+        headers: Dict[str, Any] = None,
+        json: Dict[str, Any] = None,
+        data: Any = None,
+        file_path: str = None,
+        session: requests.Session = None,
+    ) -> requests.Response:
+        """Sends a POST REST request with necessary attributes and parameters
+
+        Args:
+            client: The aiohttp client session object
+            url: The URL to send the request to
+            headers: (OPTIONAL) The headers dict to send with the request
+            json: (OPTIONAL) The JSON data to send with the request
+            data: (OPTIONAL) The data to send with the request. Can be any MIME type
+            file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            session: (OPTIONAL) The requests session of the user. Its headers, auth and cookies
+                are sent with the request and cookies set by the response are saved on it
+
+        Return:
+            requests.Response object
+
+        """
+        return await self._generic_request(
+            client,
+            method="post",
+            url=url,
+            headers=headers,
+            json=json,
+            data=data,
+            file_path=file_path,
+            session=session,
+        )
+
+    async def get_request(
+        self,
+        client: aiohttp.ClientSession,
+        url: str,
+        headers: Dict[str, Any] = None,
+        json: Dict[str, Any] = None,
+        data: Any = None,
+        file_path: str = None,
+        session: requests.Session = None,
+    ) -> requests.Response:
+        """Sends a GET REST request with necessary attributes and parameters
+
+        Args:
+            client: The aiohttp client session object
+            url: The URL to send the request to
+            headers: (OPTIONAL) The headers dict to send with the request
+            json: (OPTIONAL) The JSON data to send with the request
+            data: (OPTIONAL) The data to send with the request. Can be any MIME type
+            file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            session: (OPTIONAL) The requests session of the user. Its headers, auth and cookies
+                are sent with the request and cookies set by the response are saved on it
+
+        Return:
+            requests.Response object
+
+        """
+        return await self._generic_request(
+            client,
+            method="get",
+            url=url,
+            headers=headers,
+            json=json,
+            data=data,
+            file_path=file_path,
+            session=session,
+        )
+
+    async def put_request(
+        self,
+        client: aiohttp.ClientSession,
+        url: str,
+        headers: Dict[str, Any] = None,
+        json: Dict[str, Any] = None,
+        data: Any = None,
+        file_path: str = None,
+        session: requests.Session = None,
+    ) -> requests.Response:
+        """Sends a PUT REST request with necessary attributes and parameters
+
+        Args:
+            client: The aiohttp client session object
+            url: The URL to send the request to
+            headers: (OPTIONAL) The headers dict to send with the request
+            json: (OPTIONAL) The JSON data to send with the request
+            data: (OPTIONAL) The data to send with the request. Can be any MIME type
+            file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            session: (OPTIONAL) The requests session of the user. Its headers, auth and cookies
+                are sent with the request and cookies set by the response are saved on it
+
+        Return:
+            requests.Response object
+
+        """
+        return await self._generic_request(
+            client,
+            method="put",
+            url=url,
+            headers=headers,
+            json=json,
+            data=data,
+            file_path=file_path,
+            session=session,
+        )
+
+    async def patch_request(
+        self,
+        client: aiohttp.ClientSession,
+        url: str,
+        headers: Dict[str, Any] = None,
+        json: Dict[str, Any] = None,
+        data: Any = None,
+        file_path: str = None,
+        session: requests.Session = None,
+    ) -> requests.Response:
+        """Sends a PATCH REST request with necessary attributes and parameters
+
+        Args:
+            client: The aiohttp client session object
+            url: The URL to send the request to
+            headers: (OPTIONAL) The headers dict to send with the request
+            json: (OPTIONAL) The JSON data to send with the request
+            data: (OPTIONAL) The data to send with the request. Can be any MIME type
+            file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            session: (OPTIONAL) The requests session of the user. Its headers, auth and cookies
+                are sent with the request and cookies set by the response are saved on it
+
+        Return:
+            requests.Response object
+
+        """
+        return await self._generic_request(
+            client,
+            method="patch",
+            url=url,
+            headers=headers,
+            json=json,
+            data=data,
+            file_path=file_path,
+            session=session,
+        )
+
+    async def delete_request(
+        self,
+        client: aiohttp.ClientSession,
+        url: str,
+        headers: Dict[str, Any] = None,
+        json: Dict[str, Any] = None,
+        data: Any = None,
+        file_path: str = None,
+        session: requests.Session = None,
+    ) -> requests.Response:
+        """Sends a DELETE REST request with necessary attributes and parameters
+
+        Args:
+            client: The aiohttp client session object
+            url: The URL to send the request to
+            headers: (OPTIONAL) The headers dict to send with the request
+            json: (OPTIONAL) The JSON data to send with the request
+            data: (OPTIONAL) The data to send with the request. Can be any MIME type
+            file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            session: (OPTIONAL) The requests session of the user. Its headers, auth and cookies
+                are sent with the request and cookies set by the response are saved on it
+
+        Return:
+            requests.Response object
+
+        """
+        return await self._generic_request(
+            client,
+            method="delete",
+            url=url,
+            headers=headers,
+            json=json,
+            data=data,
+            file_path=file_path,
+            session=session,
+        )
+
+    async def options_request(
+        self,
+        client: aiohttp.ClientSession,
+        url: str,
+        headers: Dict[str, Any] = None,
+        json: Dict[str, Any] = None,
+        data: Any = None,
+        file_path: str = None,
+        session: requests.Session = None,
+    ) -> requests.Response:
+        """Sends a OPTIONS REST request with necessary attributes and parameters
+
+        Args:
+            client: The aiohttp client session object
+            url: The URL to send the request to
+            headers: (OPTIONAL) The headers dict to send with the request
+            json: (OPTIONAL) The JSON data to send with the request
+            data: (OPTIONAL) The data to send with the request. Can be any MIME type
+            file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            session: (OPTIONAL) The requests session of the user. Its headers, auth and cookies
+                are sent with the request and cookies set by the response are saved on it
+
+        Return:
+            requests.Response object
+
+        """
+        return await self._generic_request(
+            client,
+            method="options",
+            url=url,
+            headers=headers,
+            json=json,
+            data=data,
+            file_path=file_path,
+            session=session,
+        )
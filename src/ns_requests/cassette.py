@@ -0,0 +1,435 @@
+"""Record and replay of REST requests through an on-disk cassette
+
+In record mode every request GenericRequests sends is appended with its response to a cassette file
+as one JSON line. In replay mode requests are answered from the cassette without any network I/O,
+which makes a suite run independent of service latency and availability.
+
+Requests are matched by a key built from the parts listed in `match_on`:
+- method: The HTTP method
+- url: The full URL with its query parameters sorted
+- path: The URL without the scheme and host, so cassettes can be replayed against another host
+- body: The request body. JSON bodies are compared by content, not by formatting
+
+A sidecar index file maps every key to the offsets of its lines so a replay only reads the lines it
+needs. The index is rebuilt from the cassette if it is missing or out of date. Requests that were
+recorded more than once are replayed in the order they were recorded.
+
+The body of a streamed response (stream=True) is not read into memory to record it. It is copied
+to a temporary file while the step reads it, and the response is recorded once its body was read
+to the end. Streamed responses whose body is not read to the end are not recorded.
+
+Requests with no recorded response are handled by the `unmatched` policy:
+- error: Raise a CassetteMissError
+- passthrough: Send the request over the network
+- record: Send the request over the network and add it to the cassette
+"""
+import base64
+from datetime import timedelta
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+# The parts of a request that can be matched on
+MATCH_ON_OPTIONS = ("method", "url", "path", "body")
+# The policies for requests with no recorded response
+UNMATCHED_POLICIES = ("error", "passthrough", "record")
+
+# Stands in for the response body when the line of a recording is written around it
+_BODY_SLOT = "\u0000body\u0000"
+
+# The number of body bytes base64 encoded at a time. A multiple of 3 so the chunks join up
+_ENCODE_CHUNK_SIZE = 3 * 256 * 1024
+
+
+class CassetteMissError(requests.exceptions.ConnectionError):
+    """Raised when a replayed request has no recorded response"""
+
+
+class Cassette:
+    """A file of recorded request and response pairs"""
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "replay",
+        match_on: Iterable[str] = ("method", "url", "body"),
+        unmatched: str = "error",
+    ) -> None:
+        """Initialize a Cassette
+
+        Args:
+            path: The cassette file. The index is kept next to it with an `.idx` extension
+            mode: Either record, to record every request, or replay, to answer from the cassette
+            match_on: The parts of a request that must match a recording to replay it
+            unmatched: The policy for replayed requests with no recording. Either error,
+                passthrough or record
+
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: '{mode}'. Use record or replay")
+        if unmatched not in UNMATCHED_POLICIES:
+            raise ValueError(
+                f"Unknown unmatched request policy: '{unmatched}'. Use one of {UNMATCHED_POLICIES}"
+            )
+        self.match_on = tuple(match_on)
+        for part in self.match_on:
+            if part not in MATCH_ON_OPTIONS:
+                raise ValueError(
+                    f"Unknown cassette match rule: '{part}'. Use any of {MATCH_ON_OPTIONS}"
+                )
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self.mode = mode
+        self.unmatched = unmatched
+        self.recorded = 0
+        self.replayed = 0
+        self.missed = 0
+        self._lock = threading.Lock()
+        self._plays: Dict[str, int] = {}
+        if mode == "record" and os.path.exists(path):
+            os.remove(path)
+        self._index = self._load_index()
+
+    @property
+    def replaying(self) -> bool:
+        """Whether requests are answered from the cassette"""
+        return self.mode == "replay"
+
+    def _load_index(self) -> Dict[str, List[int]]:
+        """Load the index of the cassette, rebuilding it if it is missing or out of date
+
+        Returns:
+            The dict of the line offsets of every request key
+
+        """
+        if not os.path.exists(self.path):
+            return {}
+        size = os.path.getsize(self.path)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as index_file:
+                index = json.load(index_file)
+            if index.get("size") == size and index.get("match_on") == list(
+                self.match_on
+            ):
+                return index["keys"]
+        LOGGER.debug(f"Rebuilding the index of the cassette: {self.path}")
+        keys: Dict[str, List[int]] = {}
+        with open(self.path, "rb") as cassette_file:
+            offset = 0
+            for line in cassette_file:
+                if line.strip():
+                    request = json.loads(line)["request"]
+                    key = self._key(
+                        request["method"],
+                        request["url"],
+                        base64.b64decode(request["body"]),
+                    )
+                    keys.setdefault(key, []).append(offset)
+                offset += len(line)
+        return keys
+
+    def _key(self, method: str, url: str, body: Optional[bytes]) -> str:
+        """Build the match key of a request
+
+        Args:
+            method: The HTTP method
+            url: The full URL
+            body: The request body
+
+        Returns:
+            The hex digest of the parts of the request that are matched on
+
+        """
+        parts = urlsplit(url)
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        key_parts: Dict[str, Any] = {}
+        if "method" in self.match_on:
+            key_parts["method"] = method.upper()
+        if "url" in self.match_on:
+            key_parts["url"] = urlunsplit(
+                (parts.scheme.lower(), parts.netloc.lower(), parts.path, query, "")
+            )
+        if "path" in self.match_on:
+            key_parts["path"] = urlunsplit(("", "", parts.path, query, ""))
+        if "body" in self.match_on:
+            key_parts["body"] = Cassette._normalize_body(body)
+        return hashlib.sha1(
+            json.dumps(key_parts, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    @staticmethod
+    def _normalize_body(body: Optional[bytes]) -> str:
+        """Normalize a request body so equal JSON documents match
+
+        Args:
+            body: The request body
+
+        Returns:
+            The canonical JSON text of a JSON body, otherwise the base64 of the body
+
+        """
+        if not body:
+            return ""
+        try:
+            return json.dumps(json.loads(body), sort_keys=True, separators=(",", ":"))
+        except ValueError:
+            return base64.b64encode(body).decode("ascii")
+
+    @staticmethod
+    def _body_bytes(body: Any) -> bytes:
+        """Get the bytes of a prepared request body
+
+        Args:
+            body: The body of a requests.PreparedRequest
+
+        Returns:
+            The body as bytes, or a placeholder with the length of a streamed body
+
+        """
+        if body is None:
+            return b""
+        if isinstance(body, str):
+            return body.encode("utf-8")
+        if isinstance(body, (bytes, bytearray)):
+            return bytes(body)
+        # Streamed bodies (ie: file uploads) are not read twice, so they only match by size
+        return f"<streamed body of {len(body)} bytes>".encode("utf-8")
+
+    def replay(self, request: requests.PreparedRequest) -> Optional[requests.Response]:
+        """Answer a request from the cassette
+
+        Args:
+            request: The prepared request
+
+        Returns:
+            The recorded response, or None if the request should be sent over the network.
+            Raises a CassetteMissError if there is no recording and the unmatched policy is error
+
+        """
+        body = Cassette._body_bytes(request.body)
+        key = self._key(request.method, request.url, body)
+        with self._lock:
+            offsets = self._index.get(key)
+            if not offsets:
+                self.missed += 1
+                if self.unmatched == "error":
+                    raise CassetteMissError(
+                        f"No recorded response for {request.method} {request.url} in the cassette: {self.path}",
+                        request=request,
+                    )
+                return None
+            # Replay repeated requests in the order they were recorded, then keep the last one
+            play = self._plays.get(key, 0)
+            self._plays[key] = play + 1
+            with open(self.path, "rb") as cassette_file:
+                cassette_file.seek(offsets[min(play, len(offsets) - 1)])
+                recording = json.loads(cassette_file.readline())
+            self.replayed += 1
+        return Cassette._to_response(recording["response"], request)
+
+    @property
+    def recording(self) -> bool:
+        """Whether responses received over the network are added to the cassette"""
+        return self.mode == "record" or self.unmatched == "record"
+
+    def record(self, response: requests.Response) -> None:
+        """Add a response and the request that was sent for it to the cassette
+
+        Args:
+            response: The response. A streamed body that was not read yet is recorded once it was
+                read to the end
+
+        """
+        if not response._content_consumed:
+            response.raw = _RecordingStream(
+                response.raw, lambda body_file: self._write(response, body_file)
+            )
+            return
+        self._write(response, io.BytesIO(response.content or b""))
+
+    def _write(self, response: requests.Response, body_file: BinaryIO) -> None:
+        """Append the line of a recording to the cassette
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            response: The response
+            body_file: The response body, read in chunks and base64 encoded into the line
+
+        """
+        request = response.request
+        body = Cassette._body_bytes(request.body)
+        line = json.dumps(
+            {
+                "request": {
+                    "method": request.method,
+                    "url": request.url,
+                    "body": base64.b64encode(body).decode("ascii"),
+                },
+                "response": {
+                    "status_code": response.status_code,
+                    "reason": response.reason,
+                    "url": response.url,
+                    "headers": dict(response.headers),
+                    "body": _BODY_SLOT,
+                    "elapsed": response.elapsed.total_seconds(),
+                },
+            },
+            separators=(",", ":"),
+        )
+        before, after = line.split(json.dumps(_BODY_SLOT)[1:-1])
+        key = self._key(request.method, request.url, body)
+        with self._lock:
+            with open(self.path, "ab") as cassette_file:
+                offset = cassette_file.tell()
+                cassette_file.write(before.encode("utf-8"))
+                for chunk in iter(lambda: body_file.read(_ENCODE_CHUNK_SIZE), b""):
+                    cassette_file.write(base64.b64encode(chunk))
+                cassette_file.write(after.encode("utf-8") + b"\n")
+            self._index.setdefault(key, []).append(offset)
+            self.recorded += 1
+
+    @staticmethod
+    def _to_response(
+        recording: Dict[str, Any], request: requests.PreparedRequest
+    ) -> requests.Response:
+        """Build a response from a recording
+
+        Args:
+            recording: The recorded response
+            request: The request that is answered
+
+        Returns:
+            requests.Response object
+
+        """
+        response = requests.Response()
+        response.status_code = recording["status_code"]
+        response.reason = recording["reason"]
+        response.url = recording["url"]
+        response.headers = CaseInsensitiveDict(recording["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        body = base64.b64decode(recording["body"])
+        response._content = body
+        # The body was already read, so iter_content and raw readers get it from memory
+        response._content_consumed = True
+        response.raw = io.BytesIO(body)
+        response.elapsed = timedelta(seconds=recording["elapsed"])
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        """Write the index of the cassette"""
+        with self._lock:
+            if not os.path.exists(self.path):
+                return
+            # Replace the index in one step so a process replaying the cassette at the same time
+            # never reads a partly written index
+            temporary_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as index_file:
+                json.dump(
+                    {
+                        "size": os.path.getsize(self.path),
+                        "match_on": list(self.match_on),
+                        "keys": self._index,
+                    },
+                    index_file,
+                )
+            os.replace(temporary_path, self.index_path)
+        LOGGER.debug(
+            f"Closed the cassette: {self.path}. Recorded: {self.recorded}, replayed: {self.replayed}, missed: {self.missed}"
+        )
+
+
+class _RecordingStream:
+    """Wraps the raw stream of a response to copy its body to a file while it is read"""
+
+    def __init__(self, raw: Any, on_complete: Callable[[BinaryIO], None]) -> None:
+        """Initialize a _RecordingStream
+
+        Args:
+            raw: The urllib3 response of the streamed requests.Response
+            on_complete: Called with the copied body, rewound to the start, once it was read to the end
+
+        """
+        self._raw = raw
+        self._on_complete = on_complete
+        self._spool: Optional[BinaryIO] = tempfile.TemporaryFile()
+
+    def stream(
+        self, amt: int = 2 ** 16, decode_content: bool = None
+    ) -> Iterator[bytes]:
+        """Read the body in chunks the same as the urllib3 response, copying every chunk
+
+        Args:
+            amt: The maximum number of bytes of a chunk
+            decode_content: Whether to decode the body according to its Content-Encoding
+
+        Yields:
+            The chunks of the body
+
+        """
+        for chunk in self._raw.stream(amt, decode_content=decode_content):
+            self._copy(chunk)
+            yield chunk
+        self._complete()
+
+    def read(self, amt: int = None, **kwargs: Any) -> bytes:
+        """Read bytes of the body the same as the urllib3 response, copying them
+
+        Args:
+            amt: The maximum number of bytes to read. The rest of the body if None
+            kwargs: The other arguments of the urllib3 read
+
+        Returns:
+            The bytes read. Empty once the whole body was read
+
+        """
+        data = self._raw.read(amt, **kwargs)
+        self._copy(data)
+        if not data or amt is None:
+            self._complete()
+        return data
+
+    def _copy(self, data: bytes) -> None:
+        """Copy bytes of the body to the spool file
+
+        Args:
+            data: The bytes read
+
+        """
+        if self._spool is not None and data:
+            self._spool.write(data)
+
+    def _complete(self) -> None:
+        """Hand over the copied body once it was read to the end"""
+        if self._spool is None:
+            return
+        spool, self._spool = self._spool, None
+        with spool:
+            spool.seek(0)
+            self._on_complete(spool)
+
+    def close(self) -> None:
+        """Close the urllib3 response and drop a body that was not read to the end"""
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+        self._raw.close()
+
+    def __getattr__(self, name: str) -> Any:
+        """Get any other attribute from the urllib3 response. ie: release_conn"""
+        return getattr(self._raw, name)
@@ -0,0 +1,163 @@
+"""Download of response bodies straight to disk with incremental checksums
+
+The body of a streamed response is written to a file in chunks and every chunk is fed to the hash
+objects as it arrives, so a body of any size is downloaded and checksummed with one chunk of memory
+and a single pass. The file is memory-mapped on demand for content assertions, which lets the
+operating system page it in instead of loading it into the Python heap.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import time
+from typing import Dict, Iterable, Optional, Union
+
+import requests
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+# The checksums computed while downloading unless others are asked for
+DEFAULT_ALGORITHMS = ("sha256", "md5")
+
+
+class DownloadedFile:
+    """A response body that was downloaded to a file"""
+
+    def __init__(
+        self,
+        path: str,
+        size: int,
+        hashes: Dict[str, str],
+        seconds: float,
+        temporary: bool = False,
+    ) -> None:
+        """Initialize a DownloadedFile
+
+        Args:
+            path: The location of the file
+            size: The number of bytes downloaded
+            hashes: The hex digests of the body by hash algorithm
+            seconds: The number of seconds the download took
+            temporary: Whether the file is removed when it is closed
+
+        """
+        self.path = path
+        self.size = size
+        self.hashes = hashes
+        self.seconds = seconds
+        self.temporary = temporary
+        self._file = None
+        self._mmap: Optional[mmap.mmap] = None
+
+    @staticmethod
+    def download(
+        response: requests.Response,
+        path: str = None,
+        algorithms: Iterable[str] = DEFAULT_ALGORITHMS,
+        chunk_size: int = 1024 * 1024,
+    ) -> "DownloadedFile":
+        """Download the body of a response to a file, hashing it as it is written
+
+        Args:
+            response: The response. Send it with stream=True so its body was not read into memory
+            path: (OPTIONAL) The file to write. A temporary file that is removed on close if None
+            algorithms: The hashlib algorithms to compute while downloading
+            chunk_size: The number of bytes read from the response at a time
+
+        Returns:
+            The DownloadedFile object
+
+        """
+        hashes = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+        temporary = path is None
+        if temporary:
+            descriptor, path = tempfile.mkstemp(prefix="download-")
+            file = os.fdopen(descriptor, "wb")
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            file = open(path, "wb")
+        size = 0
+        start = time.perf_counter()
+        try:
+            with file:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    file.write(chunk)
+                    for hash_object in hashes.values():
+                        hash_object.update(chunk)
+                    size += len(chunk)
+        finally:
+            response.close()
+        seconds = time.perf_counter() - start
+        downloaded = DownloadedFile(
+            path,
+            size,
+            {
+                algorithm: hash_object.hexdigest()
+                for algorithm, hash_object in hashes.items()
+            },
+            seconds,
+            temporary=temporary,
+        )
+        LOGGER.debug(f"Downloaded the response body to: {downloaded}")
+        return downloaded
+
+    def hash(self, algorithm: str) -> str:
+        """Get a checksum of the file, computing it from the file if it was not computed while downloading
+
+        Args:
+            algorithm: The hashlib algorithm. ie: sha256, md5
+
+        Returns:
+            The hex digest of the file
+
+        """
+        algorithm = algorithm.lower()
+        if algorithm not in self.hashes:
+            hash_object = hashlib.new(algorithm)
+            with open(self.path, "rb") as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                    hash_object.update(chunk)
+            self.hashes[algorithm] = hash_object.hexdigest()
+        return self.hashes[algorithm]
+
+    @property
+    def content(self) -> Union[mmap.mmap, bytes]:
+        """The read only memory map of the file. Empty files are mapped as empty bytes"""
+        # Empty files can not be memory-mapped
+        if not self.size:
+            return b""
+        if self._mmap is None:
+            self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def contains(self, value: bytes) -> bool:
+        """Check whether the file contains a sequence of bytes
+
+        Args:
+            value: The bytes to search for
+
+        Returns:
+            True if the bytes are found in the file
+
+        """
+        return self.content.find(value) != -1
+
+    def close(self) -> None:
+        """Unmap the file and remove it if it is temporary"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.temporary and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __repr__(self) -> str:
+        """Representation of the downloaded file"""
+        return f"<DownloadedFile {self.path} {self.size} bytes in {self.seconds:.3f}s {self.hashes}>"
@@ -8,11 +8,19 @@ These functions will allow for the following REST operations:
 5) DELETE
 6) OPTIONS
 """
+import io
 import json as j
 import logging
 from pprint import pformat
-from typing import Any, Dict
-
+from typing import Any, Dict, List, Optional, Tuple
+
+from ns_requests.cassette import Cassette
+from ns_requests.json_response import JsonResponseView
+from ns_requests.multipart import MultipartFile, StreamingMultipartEncoder
+from ns_requests.payload_templates import JsonBody
+from ns_requests.request_logging import BodyLog, truncate
+from ns_requests.request_timing import RequestTiming, RequestTimingLog
+from ns_requests.session_manager import SessionManager
 import requests
 
 # Initialize a logger
@@ -22,6 +30,15 @@ LOGGER = logging.getLogger(__name__)
 class GenericRequests:
     """Holds all generic static methods for REST requests"""
 
+    # Pooled sessions used whenever a request is sent without a client
+    session_manager: SessionManager = SessionManager()
+    # The maximum number of characters of a body written to the debug log. 0 logs whole bodies
+    log_body_limit: int = 10000
+    # Full bodies are also written to this log when it is set
+    body_log: Optional[BodyLog] = None
+    # Requests are recorded to or replayed from this cassette when it is set
+    cassette: Optional[Cassette] = None
+
     @staticmethod
     def _generic_request(
         client: requests.Session,
@@ -31,11 +48,13 @@ class GenericRequests:
         json: Dict[str, Any] = None,
         data: Any = None,
         file_path: str = None,
+        stream: bool = False,
+        files: List[MultipartFile] = None,
     ) -> requests.Response:
         """Common REST request that uses the HTTP requests library.
 
         This will read in a session object to use as a client.
-        If no client is read in we will create a new request Session object.
+        If no client is read in we will use the pooled Session object for the host of the URL.
 
         NOTE: This method is private and for internal class use only.
 
@@ -47,63 +66,236 @@ class GenericRequests:
             json: (OPTIONAL) The JSON data to send with the request
             data: (OPTIONAL) The data to send with the request. Can be any MIME type
             file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            stream: (OPTIONAL) Whether to defer downloading the response body until it is read
+            files: (OPTIONAL) The files to upload with their form field names and content types
 
         Return:
             requests.Response object
 
         """
-        # Set our request meta data
-        request_meta: Dict[str, Any] = {
-            "method": method,
-            "url": url,
-            "headers": headers,
-            "json": json,
-            "data": data,
-            "files": file_path,
-        }
-        LOGGER.debug(
-            f"HTTP REQUEST: Sending a request with the following attributes: \n{j.dumps(request_meta, sort_keys=True, indent=2)}\n"
+        GenericRequests._log_request(
+            method, url, headers, json, data, file_path if files is None else files
         )
-        # We have a client and a file
-        if client and file_path:
-            with open(file_path, "r") as file:
-                response = client.request(
+        headers, json, data = GenericRequests._prepare_json_body(headers, json, data)
+        # If no client was read in use the pooled session for the host of the URL
+        if not client:
+            client = GenericRequests.session_manager.get_session(url)
+        upload = GenericRequests._prepare_upload(file_path, files, data)
+        timing = RequestTiming.start()
+        try:
+            # We have files to upload. They are streamed from disk in chunks
+            if upload is not None:
+                try:
+                    response = GenericRequests._send(
+                        client,
+                        stream,
+                        method=method,
+                        url=url,
+                        data=upload,
+                        headers=dict(
+                            headers or {}, **{"Content-Type": upload.content_type}
+                        ),
+                    )
+                finally:
+                    upload.close()
+            # All else fails send a generic request with no file support
+            else:
+                response = GenericRequests._send(
+                    client,
+                    stream,
                     method=method,
                     url=url,
                     json=json,
                     data=data,
-                    files={"upload_file": file},
                     headers=headers,
                 )
-        # We have a client but no file payload
-        elif client and not file_path:
-            response = client.request(
-                method=method, url=url, json=json, data=data, headers=headers
+        except Exception:
+            timing.finish()
+            raise
+        # A streamed body is only downloaded when it is read. A replayed body is read from memory
+        if isinstance(response.raw, io.BytesIO):
+            timing.finish(len(response.content))
+        else:
+            timing.finish(None if stream else response.raw.tell())
+        response.timing = timing
+        if upload is not None:
+            response.upload_stats = upload.stats()
+            LOGGER.debug(f"Uploaded {len(upload.files)} files: {response.upload_stats}")
+        RequestTimingLog.record(method, url, timing)
+        JsonResponseView.attach(response)
+        # Reading a streamed body to log it would download it all into memory
+        if stream:
+            LOGGER.debug(
+                f"HTTP RESPONSE: {response.status_code} with a streamed body\n"
             )
-        # We have no client but a file payload
-        elif not client and file_path:
-            with open(file_path, "r") as file:
-                response = requests.Session().request(
-                    method=method,
-                    url=url,
-                    json=json,
-                    data=data,
-                    files={"upload_file": file},
-                    headers=headers,
-                )
-        # All else fails send a generic request with a new Session and no file support
         else:
-            response = requests.Session().request(
-                method=method, url=url, json=json, data=data, headers=headers
+            GenericRequests._log_response(response)
+        return response
+
+    @staticmethod
+    def _send(
+        client: requests.Session, stream: bool, **request_kwargs: Any
+    ) -> requests.Response:
+        """Send a request, or answer it from the cassette when one is replayed.
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            client: The HttpClient session object
+            stream: Whether to defer downloading the response body until it is read
+            request_kwargs: The arguments of the requests.Request to send
+
+        Return:
+            requests.Response object
+
+        """
+        cassette = GenericRequests.cassette
+        if cassette is None:
+            return client.request(stream=stream, **request_kwargs)
+        request = client.prepare_request(requests.Request(**request_kwargs))
+        if cassette.replaying:
+            response = cassette.replay(request)
+            if response is not None:
+                return response
+        # Send the prepared request with the same settings as Session.request
+        settings = client.merge_environment_settings(
+            request.url, {}, stream, None, None
+        )
+        response = client.send(request, **settings)
+        if cassette.recording:
+            cassette.record(response)
+        return response
+
+    @staticmethod
+    def _prepare_upload(
+        file_path: Optional[str], files: Optional[List[MultipartFile]], data: Any
+    ) -> Optional[StreamingMultipartEncoder]:
+        """Build the streamed multipart body of the files to upload.
+
+        NOTE: This method is private and for internal use by the request engines only.
+
+        Args:
+            file_path: The location of a file to upload as the upload_file field
+            files: The files to upload
+            data: The data to send with the request. A dict is sent as plain form fields
+
+        Return:
+            The StreamingMultipartEncoder of the body, or None if there are no files to upload
+
+        """
+        upload_files = list(files or [])
+        if file_path:
+            upload_files.insert(0, MultipartFile(file_path))
+        if not upload_files:
+            return None
+        return StreamingMultipartEncoder(
+            upload_files, fields=data if isinstance(data, dict) else None
+        )
+
+    @staticmethod
+    def _prepare_json_body(
+        headers: Optional[Dict[str, Any]], json: Any, data: Any
+    ) -> Tuple[Optional[Dict[str, Any]], Any, Any]:
+        """Send an already serialized JsonBody as the raw request data with a JSON content type.
+
+        NOTE: This method is private and for internal use by the request engines only.
+
+        Args:
+            headers: The headers dict to send with the request
+            json: The JSON data to send with the request
+            data: The data to send with the request
+
+        Return:
+            The headers, JSON data and data to send the request with
+
+        """
+        if not isinstance(json, JsonBody):
+            return headers, json, data
+        headers = dict(headers or {})
+        if not any(header.lower() == "content-type" for header in headers):
+            headers["Content-Type"] = "application/json"
+        return headers, None, json.content
+
+    @staticmethod
+    def _log_request(
+        method: str,
+        url: str,
+        headers: Dict[str, Any] = None,
+        json: Dict[str, Any] = None,
+        data: Any = None,
+        file_path: Any = None,
+    ) -> None:
+        """Log the attributes of a request that is about to be sent.
+
+        NOTE: This method is private and for internal use by the request engines only.
+
+        Args:
+            method: The method of the desired request. IE: POST, GET, etc...
+            url: The URL to send the request to
+            headers: (OPTIONAL) The headers dict to send with the request
+            json: (OPTIONAL) The JSON data to send with the request
+            data: (OPTIONAL) The data to send with the request. Can be any MIME type
+            file_path: (OPTIONAL) The location of the file to upload, or the list of files to upload
+
+        """
+        body_log = GenericRequests.body_log
+        debug = LOGGER.isEnabledFor(logging.DEBUG)
+        # Skip building and serializing the request when nothing would be logged
+        if not debug and body_log is None:
+            return
+        # Set our request meta data
+        request_meta: Dict[str, Any] = {
+            "method": method,
+            "url": url,
+            "headers": headers,
+            "json": repr(json) if isinstance(json, JsonBody) else json,
+            "data": data,
+            "files": file_path,
+        }
+        if body_log is not None:
+            body_log.write(
+                f"HTTP REQUEST: {method.upper()} {url}",
+                dict(request_meta, json=json.text)
+                if isinstance(json, JsonBody)
+                else request_meta,
+            )
+        if debug:
+            request_text = j.dumps(request_meta, sort_keys=True, indent=2, default=repr)
+            LOGGER.debug(
+                f"HTTP REQUEST: Sending a request with the following attributes: \n{truncate(request_text, GenericRequests.log_body_limit)}\n"
             )
+
+    @staticmethod
+    def _log_response(response: requests.Response) -> None:
+        """Log the body of a response that was received.
+
+        Bodies over the log body limit are logged as truncated text instead of pretty printed JSON.
+
+        NOTE: This method is private and for internal use by the request engines only.
+
+        Args:
+            response: The requests.Response object to log
+
+        """
+        body_log = GenericRequests.body_log
+        if body_log is not None:
+            body_log.write(
+                f"HTTP RESPONSE: {response.status_code} {response.url}",
+                response.content,
+            )
+        if not LOGGER.isEnabledFor(logging.DEBUG):
+            return
+        limit = GenericRequests.log_body_limit
+        if limit and len(response.content) > limit:
+            LOGGER.debug(f"HTTP RESPONSE: {truncate(response.text, limit)}\n")
+            return
         try:
             LOGGER.debug(
-                f"HTTP RESPONSE: \n{j.dumps(response.json(), sort_keys=True, indent=2)}\n"
+                f"HTTP RESPONSE: \n{j.dumps(JsonResponseView.of(response).json(), sort_keys=True, indent=2)}\n"
             )
         except j.JSONDecodeError:
             LOGGER.debug(f"HTTP RESPONSE: {pformat(response.text)}")
         LOGGER.debug("")
-        return response
 
     @staticmethod
     def post_request(
@@ -113,6 +305,8 @@ class GenericRequests:
         json: Dict[str, Any] = None,
         data: Any = None,
         file_path: str = None,
+        stream: bool = False,
+        files: List[MultipartFile] = None,
     ) -> requests.Response:
         """Sends a POST REST request with necessary attributes and parameters
 
@@ -123,6 +317,8 @@ class GenericRequests:
             json: (OPTIONAL) The JSON data to send with the request
             data: (OPTIONAL) The data to send with the request. Can be any MIME type
             file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            stream: (OPTIONAL) Whether to defer downloading the response body until it is read
+            files: (OPTIONAL) The files to upload with their form field names and content types
 
         Return:
             requests.Response object
@@ -136,6 +332,8 @@ class GenericRequests:
             json=json,
             data=data,
             file_path=file_path,
+            stream=stream,
+            files=files,
         )
 
     @staticmethod
@@ -146,6 +344,8 @@ class GenericRequests:
         json: Dict[str, Any] = None,
         data: Any = None,
         file_path: str = None,
+        stream: bool = False,
+        files: List[MultipartFile] = None,
     ) -> requests.Response:
         """Sends a GET REST request with necessary attributes and parameters
 
@@ -156,6 +356,8 @@ class GenericRequests:
             json: (OPTIONAL) The JSON data to send with the request
             data: (OPTIONAL) The data to send with the request. Can be any MIME type
             file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            stream: (OPTIONAL) Whether to defer downloading the response body until it is read
+            files: (OPTIONAL) The files to upload with their form field names and content types
 
         Return:
             requests.Response object
@@ -169,6 +371,8 @@ class GenericRequests:
             json=json,
             data=data,
             file_path=file_path,
+            stream=stream,
+            files=files,
         )
 
     @staticmethod
@@ -179,6 +383,8 @@ class GenericRequests:
         json: Dict[str, Any] = None,
         data: Any = None,
         file_path: str = None,
+        stream: bool = False,
+        files: List[MultipartFile] = None,
     ) -> requests.Response:
         """Sends a PUT REST request with necessary attributes and parameters
 
@@ -189,6 +395,8 @@ class GenericRequests:
             json: (OPTIONAL) The JSON data to send with the request
             data: (OPTIONAL) The data to send with the request. Can be any MIME type
             file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            stream: (OPTIONAL) Whether to defer downloading the response body until it is read
+            files: (OPTIONAL) The files to upload with their form field names and content types
 
         Return:
             requests.Response object
@@ -202,6 +410,8 @@ class GenericRequests:
             json=json,
             data=data,
             file_path=file_path,
+            stream=stream,
+            files=files,
         )
 
     @staticmethod
@@ -212,6 +422,8 @@ class GenericRequests:
         json: Dict[str, Any] = None,
         data: Any = None,
         file_path: str = None,
+        stream: bool = False,
+        files: List[MultipartFile] = None,
     ) -> requests.Response:
         """Sends a PATCH REST request with necessary attributes and parameters
 
@@ -222,6 +434,8 @@ class GenericRequests:
             json: (OPTIONAL) The JSON data to send with the request
             data: (OPTIONAL) The data to send with the request. Can be any MIME type
             file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            stream: (OPTIONAL) Whether to defer downloading the response body until it is read
+            files: (OPTIONAL) The files to upload with their form field names and content types
 
         Return:
             requests.Response object
@@ -235,6 +449,8 @@ class GenericRequests:
             json=json,
             data=data,
             file_path=file_path,
+            stream=stream,
+            files=files,
         )
 
     @staticmethod
@@ -245,6 +461,8 @@ class GenericRequests:
         json: Dict[str, Any] = None,
         data: Any = None,
         file_path: str = None,
+        stream: bool = False,
+        files: List[MultipartFile] = None,
     ) -> requests.Response:
         """Sends a DELETE REST request with necessary attributes and parameters
 
@@ -255,6 +473,8 @@ class GenericRequests:
             json: (OPTIONAL) The JSON data to send with the request
             data: (OPTIONAL) The data to send with the request. Can be any MIME type
             file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            stream: (OPTIONAL) Whether to defer downloading the response body until it is read
+            files: (OPTIONAL) The files to upload with their form field names and content types
 
         Return:
             requests.Response object
@@ -268,6 +488,8 @@ class GenericRequests:
             json=json,
             data=data,
             file_path=file_path,
+            stream=stream,
+            files=files,
         )
 
     @staticmethod
@@ -278,6 +500,8 @@ class GenericRequests:
         json: Dict[str, Any] = None,
         data: Any = None,
         file_path: str = None,
+        stream: bool = False,
+        files: List[MultipartFile] = None,
     ) -> requests.Response:
         """Sends a OPTIONS REST request with necessary attributes and parameters
 
@@ -288,6 +512,8 @@ class GenericRequests:
             json: (OPTIONAL) The JSON data to send with the request
             data: (OPTIONAL) The data to send with the request. Can be any MIME type
             file_path: (OPTIONAL) The location of the file to upload plus the actual file name
+            stream: (OPTIONAL) Whether to defer downloading the response body until it is read
+            files: (OPTIONAL) The files to upload with their form field names and content types
 
         Return:
             requests.Response object
@@ -301,4 +527,6 @@ class GenericRequests:
             json=json,
             data=data,
             file_path=file_path,
+            stream=stream,
+            files=files,
         )
@@ -0,0 +1,101 @@
+"""Parse-once JSON view of REST responses
+
+requests.Response.json() decodes the body again on every call. The view in this module decodes it
+once on first use and hands the same object to every caller. A view is attached to each response
+that GenericRequests returns, so a new response always comes with a fresh view.
+
+NOTE: Callers share the decoded object. It must be treated as read only.
+"""
+import logging
+import threading
+from typing import Any, Dict
+
+import requests
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+
+class JsonResponseView:
+    """Lazily parsed, cached view of the JSON body of a response"""
+
+    # Process wide counters of how many times bodies were read and actually decoded
+    _counter_lock = threading.Lock()
+    reads = 0
+    decodes = 0
+
+    def __init__(self, response: requests.Response) -> None:
+        """Initialize a JsonResponseView
+
+        Args:
+            response: The response to decode the body of
+
+        """
+        self.response = response
+        self._parsed = False
+        self._json: Any = None
+        # Values derived from the decoded body by consumers of the view, like lookup indexes
+        self.derived: Dict[str, Any] = {}
+
+    @staticmethod
+    def attach(response: requests.Response) -> "JsonResponseView":
+        """Attach a new view to a response as `json_view`
+
+        Args:
+            response: The response to attach the view to
+
+        Returns:
+            The attached view
+
+        """
+        view = JsonResponseView(response)
+        response.json_view = view
+        return view
+
+    @staticmethod
+    def of(response: requests.Response) -> "JsonResponseView":
+        """Get the view attached to a response, attaching one if there is none
+
+        Args:
+            response: The response to get the view of
+
+        Returns:
+            The view of the response
+
+        """
+        view = getattr(response, "json_view", None)
+        if view is None or view.response is not response:
+            view = JsonResponseView.attach(response)
+        return view
+
+    def json(self) -> Any:
+        """Get the decoded JSON body, decoding it on first use
+
+        Returns:
+            The decoded JSON body. Raises the same error as requests.Response.json() if the body is
+            not JSON
+
+        """
+        with JsonResponseView._counter_lock:
+            JsonResponseView.reads += 1
+        if not self._parsed:
+            self._json = self.response.json()
+            self._parsed = True
+            with JsonResponseView._counter_lock:
+                JsonResponseView.decodes += 1
+        return self._json
+
+    @staticmethod
+    def stats() -> Dict[str, int]:
+        """Get the decode counters
+
+        Returns:
+            A dict of the number of reads, actual decodes and decodes saved by the cache
+
+        """
+        with JsonResponseView._counter_lock:
+            return {
+                "reads": JsonResponseView.reads,
+                "decodes": JsonResponseView.decodes,
+                "saved": JsonResponseView.reads - JsonResponseView.decodes,
+            }
@@ -0,0 +1,143 @@
+"""Compact latency histograms
+
+Latencies are recorded in an array-backed, log-linear histogram (in the style of HdrHistogram) so
+percentiles can be read with bounded memory no matter how many latencies are recorded.
+"""
+from array import array
+import math
+from typing import Dict
+
+
+class LatencyHistogram:
+    """Log-linear histogram of latencies recorded in microseconds
+
+    Values below 2 ** sub_bucket_bits are counted exactly. Larger values are counted in buckets
+    that keep `sub_bucket_bits - 1` bits of precision, which is under 1% relative error with the
+    default of 8 bits.
+    """
+
+    def __init__(self, sub_bucket_bits: int = 8) -> None:
+        """Initialize a LatencyHistogram
+
+        Args:
+            sub_bucket_bits: The number of bits of precision kept for every recorded value
+
+        """
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_bucket_count >> 1
+        self.counts = array("Q", [0] * self.sub_bucket_count)
+        self.total_count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = 0
+
+    def _index(self, value: int) -> int:
+        """Get the bucket index of a value
+
+        Args:
+            value: The value in microseconds
+
+        Returns:
+            The index of the bucket the value is counted in
+
+        """
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return (
+            self.sub_bucket_count
+            + (shift - 1) * self.half_count
+            + ((value >> shift) - self.half_count)
+        )
+
+    def _value_at(self, index: int) -> int:
+        """Get the highest value that is counted in a bucket
+
+        Args:
+            index: The index of the bucket
+
+        Returns:
+            The highest value in microseconds counted in the bucket
+
+        """
+        if index < self.sub_bucket_count:
+            return index
+        shift, offset = divmod(index - self.sub_bucket_count, self.half_count)
+        shift += 1
+        return ((offset + self.half_count) << shift) + (1 << shift) - 1
+
+    def record(self, latency_ms: float) -> None:
+        """Record a latency
+
+        Args:
+            latency_ms: The latency in milliseconds
+
+        """
+        value = max(int(latency_ms * 1000), 0)
+        index = self._index(value)
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.total_count += 1
+        self.total_us += value
+        self.min_us = value if self.min_us is None else min(self.min_us, value)
+        self.max_us = max(self.max_us, value)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add all the counts of another histogram to this one
+
+        Args:
+            other: The histogram to merge in. It must use the same number of sub bucket bits
+
+        """
+        if len(other.counts) > len(self.counts):
+            self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total_count += other.total_count
+        self.total_us += other.total_us
+        if other.min_us is not None:
+            self.min_us = (
+                other.min_us if self.min_us is None else min(self.min_us, other.min_us)
+            )
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, percentile: float) -> float:
+        """Get the latency at a percentile
+
+        Args:
+            percentile: The percentile between 0 and 100
+
+        Returns:
+            The latency in milliseconds. 0.0 if nothing was recorded
+
+        """
+        if not self.total_count:
+            return 0.0
+        target = max(math.ceil(percentile / 100 * self.total_count), 1)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._value_at(index), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self) -> Dict[str, float]:
+        """Get the common latency statistics
+
+        Returns:
+            A dict of the min, mean, p50, p90, p99 and max latencies in milliseconds
+
+        """
+        return {
+            "min": (self.min_us or 0) / 1000,
+            "mean": self.total_us / self.total_count / 1000
+            if self.total_count
+            else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max_us / 1000,
+        }
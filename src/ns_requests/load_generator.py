@@ -0,0 +1,144 @@
+"""Load generation for REST requests with compact latency histograms
+
+A load run sends the same request many times from a pool of worker threads through
+GenericRequests._generic_request. Every latency is recorded in a LatencyHistogram so percentiles
+can be read with bounded memory no matter how many requests are sent.
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import logging
+import time
+from typing import Any, Dict
+
+from ns_requests.generic_requests import GenericRequests
+from ns_requests.latency_histogram import LatencyHistogram
+import requests
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+
+class LoadResult:
+    """Holds the outcome of a load run"""
+
+    def __init__(
+        self, histogram: LatencyHistogram, errors: Counter, duration: float
+    ) -> None:
+        """Initialize a LoadResult
+
+        Args:
+            histogram: The latencies of every request sent
+            errors: The count of failed requests by status code or exception name
+            duration: The wall clock duration of the run in seconds
+
+        """
+        self.histogram = histogram
+        self.errors = errors
+        self.duration = duration
+
+    @property
+    def request_count(self) -> int:
+        """The number of requests sent"""
+        return self.histogram.total_count
+
+    @property
+    def throughput(self) -> float:
+        """The number of requests completed per second"""
+        return self.request_count / self.duration if self.duration else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        """The percentage of requests that failed"""
+        if not self.request_count:
+            return 0.0
+        return sum(self.errors.values()) / self.request_count * 100
+
+    def summary(self) -> Dict[str, Any]:
+        """Get every statistic of the run
+
+        Returns:
+            A dict of the latency statistics, throughput, error rate and error breakdown
+
+        """
+        summary: Dict[str, Any] = self.histogram.summary()
+        summary.update(
+            {
+                "requests": self.request_count,
+                "duration": self.duration,
+                "throughput": self.throughput,
+                "error_rate": self.error_rate,
+                "errors": dict(self.errors),
+            }
+        )
+        return summary
+
+
+class LoadGenerator:
+    """Holds all static methods for generating load against a REST endpoint"""
+
+    @staticmethod
+    def run(
+        client: requests.Session,
+        method: str,
+        url: str,
+        count: int,
+        workers: int,
+        headers: Dict[str, Any] = None,
+        json: Dict[str, Any] = None,
+        data: Any = None,
+    ) -> LoadResult:
+        """Send the same request many times from a pool of worker threads
+
+        Responses with a status code of 400 or above and requests that raise are counted as errors.
+        They do not stop the run.
+
+        Args:
+            client: The HttpClient session object. If None the pooled session for the host is used
+            method: The method of the desired request. IE: POST, GET, etc...
+            url: The URL to send the request to
+            count: The total number of requests to send
+            workers: The number of requests in flight at once
+            headers: (OPTIONAL) The headers dict to send with the request
+            json: (OPTIONAL) The JSON data to send with the request
+            data: (OPTIONAL) The data to send with the request. Can be any MIME type
+
+        Returns:
+            The LoadResult of the run
+
+        """
+        ticket = itertools.count()
+
+        def worker() -> LoadResult:
+            histogram = LatencyHistogram()
+            errors: Counter = Counter()
+            while next(ticket) < count:
+                start = time.perf_counter()
+                try:
+                    response = GenericRequests._generic_request(
+                        client, method, url, headers=headers, json=json, data=data
+                    )
+                    if response.status_code >= 400:
+                        errors[str(response.status_code)] += 1
+                except requests.RequestException as error:
+                    errors[type(error).__name__] += 1
+                histogram.record((time.perf_counter() - start) * 1000)
+            return LoadResult(histogram, errors, 0.0)
+
+        LOGGER.debug(
+            f"Sending {count} {method.upper()} requests to {url} with {workers} workers..."
+        )
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(worker) for _ in range(workers)]
+            partial_results = [future.result() for future in futures]
+        duration = time.perf_counter() - start
+
+        histogram = LatencyHistogram()
+        errors: Counter = Counter()
+        for partial_result in partial_results:
+            histogram.merge(partial_result.histogram)
+            errors.update(partial_result.errors)
+        result = LoadResult(histogram, errors, duration)
+        LOGGER.debug(f"Load run complete: {result.summary()}")
+        return result
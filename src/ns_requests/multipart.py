@@ -0,0 +1,227 @@
+"""Streaming multipart/form-data encoding for large file uploads
+
+The StreamingMultipartEncoder is a file-like request body. It reads every file in binary chunks only
+when the HTTP connection asks for the next block, so uploading a file of any size needs one chunk of
+memory instead of the whole multipart body. Its length is computed from the part headers and the
+file sizes up front, so the request is sent with a Content-Length and not chunked.
+
+The encoder counts the bytes it hands to the connection and the time between the first and the last
+read, which gives the upload throughput of the request.
+"""
+import logging
+import mimetypes
+import os
+import time
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Union
+import uuid
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+# The default number of bytes read from a file at once
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+class MultipartFile:
+    """A file to upload as one part of a multipart body"""
+
+    def __init__(
+        self,
+        path: str,
+        field: str = "upload_file",
+        content_type: str = None,
+        file_name: str = None,
+    ) -> None:
+        """Initialize a MultipartFile
+
+        Args:
+            path: The location of the file to upload
+            field: The form field name of the part
+            content_type: (OPTIONAL) The content type of the part. Guessed from the file name if None
+            file_name: (OPTIONAL) The file name sent with the part. The base name of the path if None
+
+        """
+        self.path = path
+        self.field = field
+        self.file_name = file_name or os.path.basename(path)
+        self.content_type = (
+            content_type
+            or mimetypes.guess_type(self.file_name)[0]
+            or "application/octet-stream"
+        )
+
+    @property
+    def size(self) -> int:
+        """The number of bytes in the file"""
+        return os.path.getsize(self.path)
+
+    def __repr__(self) -> str:
+        """Representation of the file part"""
+        return f"<MultipartFile {self.field}={self.path} ({self.content_type})>"
+
+
+class StreamingMultipartEncoder:
+    """A multipart/form-data body that is read from its files in chunks"""
+
+    def __init__(
+        self,
+        files: Iterable[MultipartFile],
+        fields: Dict[str, Any] = None,
+        boundary: str = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        """Initialize a StreamingMultipartEncoder
+
+        Args:
+            files: The files to upload, in order
+            fields: (OPTIONAL) Plain form fields sent before the files
+            boundary: (OPTIONAL) The multipart boundary. A random one is used if None
+            chunk_size: The maximum number of bytes read from a file at once
+
+        """
+        self.files = list(files)
+        self.boundary = boundary or uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        # The parts of the body in order. Either bytes or a file to read
+        self._parts: List[Union[bytes, MultipartFile]] = []
+        for name, value in (fields or {}).items():
+            self._parts.append(
+                self._part_header(name)
+                + (value if isinstance(value, bytes) else str(value).encode("utf-8"))
+                + b"\r\n"
+            )
+        for file in self.files:
+            self._parts.append(
+                self._part_header(file.field, file.file_name, file.content_type)
+            )
+            self._parts.append(file)
+            self._parts.append(b"\r\n")
+        self._parts.append(f"--{self.boundary}--\r\n".encode("utf-8"))
+        self.length = sum(
+            part.size if isinstance(part, MultipartFile) else len(part)
+            for part in self._parts
+        )
+        self._position = 0
+        self._buffer = b""
+        self._file: Optional[BinaryIO] = None
+
+    def _part_header(
+        self, name: str, file_name: str = None, content_type: str = None
+    ) -> bytes:
+        """Build the boundary and headers of a part
+
+        Args:
+            name: The form field name of the part
+            file_name: (OPTIONAL) The file name of a file part
+            content_type: (OPTIONAL) The content type of a file part
+
+        Returns:
+            The encoded part header
+
+        """
+        disposition = f'form-data; name="{name}"'
+        if file_name is not None:
+            disposition += f'; filename="{file_name}"'
+        header = f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+        if content_type is not None:
+            header += f"Content-Type: {content_type}\r\n"
+        return f"{header}\r\n".encode("utf-8")
+
+    @property
+    def content_type(self) -> str:
+        """The Content-Type header of the body"""
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        """The number of bytes in the body"""
+        return self.length
+
+    def read(self, size: int = -1) -> bytes:
+        """Read the next bytes of the body
+
+        Args:
+            size: The maximum number of bytes to read. Reads the rest of the body if negative
+
+        Returns:
+            The bytes read. Empty once the whole body was read
+
+        """
+        if self._started is None:
+            self._started = time.perf_counter()
+        if size is None or size < 0:
+            size = self.length
+        chunks = []
+        remaining = size
+        while remaining > 0:
+            chunk = self._next_chunk(remaining)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        data = b"".join(chunks)
+        self.bytes_read += len(data)
+        if not data and self._finished is None:
+            self._finished = time.perf_counter()
+        return data
+
+    def _next_chunk(self, size: int) -> bytes:
+        """Read up to size bytes from the current part, moving on to the next part when it ends
+
+        Args:
+            size: The maximum number of bytes to read
+
+        Returns:
+            The bytes read. Empty once every part was read
+
+        """
+        while True:
+            if self._buffer:
+                chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+                return chunk
+            if self._file is not None:
+                chunk = self._file.read(min(size, self.chunk_size))
+                if chunk:
+                    return chunk
+                self._file.close()
+                self._file = None
+                continue
+            if self._position >= len(self._parts):
+                return b""
+            part = self._parts[self._position]
+            self._position += 1
+            if isinstance(part, MultipartFile):
+                self._file = open(part.path, "rb")
+            else:
+                self._buffer = part
+
+    def close(self) -> None:
+        """Close the file that is being read"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> Dict[str, float]:
+        """Get the upload throughput
+
+        Returns:
+            A dict of the bytes sent, the seconds it took and the throughput in megabytes per second
+
+        """
+        if self._started is None:
+            seconds = 0.0
+        else:
+            seconds = (self._finished or time.perf_counter()) - self._started
+        return {
+            "bytes": self.bytes_read,
+            "seconds": round(seconds, 6),
+            "mb_per_s": round(self.bytes_read / seconds / 1e6, 3) if seconds else 0.0,
+        }
+
+    def __repr__(self) -> str:
+        """Short representation that keeps the body out of the logs"""
+        return (
+            f"<StreamingMultipartEncoder {len(self.files)} files, {self.length} bytes>"
+        )
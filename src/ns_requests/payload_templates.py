@@ -0,0 +1,222 @@
+"""Library of JSON payload templates that are rendered without re-serializing the payload
+
+Every `*.json` file under a template directory is read once per process and split into its literal
+text and the `{placeholder}` slots found in its JSON strings. Rendering a variant only substitutes
+those slots and joins the pieces back together:
+- A string that is only a placeholder (ie: `"{order_id}"`) is replaced with the JSON encoding of
+  the value, so numbers, booleans, lists and dicts keep their type
+- A placeholder embedded in a longer string (ie: `"order-{order_id}"`) is replaced with the escaped
+  text of the value
+- A placeholder used as an object key (ie: `"{field}": 1`) is always replaced with the escaped
+  text of the value, so the key stays a string
+- Braces are escaped by doubling them (ie: `"{{literal}}"`) the same as in str.format
+
+The rendered text is wrapped in a JsonBody, which GenericRequests sends as is with a JSON content
+type. The body is only decoded when a step looks up or modifies a value in it, and a modified body
+is a plain decoded document again.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+# JSON string tokens and the placeholders or escaped braces ({{ and }}) inside them
+_JSON_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+_PLACEHOLDER = re.compile(r"\{\{|\}\}|\{([.,\w-]+)\}")
+_KEY_SEPARATOR = re.compile(r"\s*:")
+
+# The kinds of template slots
+_VALUE = "value"
+_TEXT = "text"
+
+
+class JsonBody:
+    """An already serialized JSON request body"""
+
+    def __init__(self, text: str) -> None:
+        """Initialize a JsonBody
+
+        Args:
+            text: The serialized JSON document
+
+        """
+        self.text = text
+        self.content = text.encode("utf-8")
+        self._document: Any = None
+        self._decoded = False
+
+    def json(self) -> Any:
+        """Decode the body, only once
+
+        The decoded document is shared by every caller, so it must not be changed in place. Use copy
+        on write mode to modify it (see ns_behave.common.json_mutation).
+
+        Returns:
+            The decoded JSON document
+
+        """
+        if not self._decoded:
+            self._document = json.loads(self.text)
+            self._decoded = True
+        return self._document
+
+    def __len__(self) -> int:
+        """The number of bytes in the body"""
+        return len(self.content)
+
+    def __repr__(self) -> str:
+        """Short representation that keeps large bodies out of the logs"""
+        return f"<JsonBody {len(self.content)} bytes>"
+
+
+class PayloadTemplate:
+    """A JSON payload file that was split once into literal text and placeholder slots"""
+
+    def __init__(self, name: str, text: str) -> None:
+        """Initialize a PayloadTemplate
+
+        Args:
+            name: The name of the template
+            text: The JSON text of the template. Raises a ValueError if it is not valid JSON
+
+        """
+        json.loads(text)
+        self.name = name
+        self.literals: List[str] = []
+        self.slots: List[Tuple[str, str]] = []
+        literal: List[str] = []
+        position = 0
+        for string_match in _JSON_STRING.finditer(text):
+            token = string_match.group(0)
+            whole = _PLACEHOLDER.fullmatch(token[1:-1])
+            is_key = _KEY_SEPARATOR.match(text, string_match.end()) is not None
+            if whole and whole.group(1) and not is_key:
+                literal.append(text[position : string_match.start()])
+                self._add_slot(literal, _VALUE, whole.group(1))
+                position = string_match.end()
+                continue
+            for placeholder in _PLACEHOLDER.finditer(token):
+                literal.append(
+                    text[position : string_match.start() + placeholder.start()]
+                )
+                if placeholder.group(1):
+                    self._add_slot(literal, _TEXT, placeholder.group(1))
+                else:
+                    # An escaped brace
+                    literal.append(placeholder.group(0)[0])
+                position = string_match.start() + placeholder.end()
+        literal.append(text[position:])
+        self.literals.append("".join(literal))
+
+    def _add_slot(self, literal: List[str], kind: str, name: str) -> None:
+        """End the current literal text and add a placeholder slot after it
+
+        Args:
+            literal: The pieces of the current literal text. It is emptied
+            kind: The kind of the slot
+            name: The name of the placeholder
+
+        """
+        self.literals.append("".join(literal))
+        literal.clear()
+        self.slots.append((kind, name))
+
+    @property
+    def placeholders(self) -> List[str]:
+        """The distinct names of the placeholders in the template"""
+        return list(dict.fromkeys(name for _, name in self.slots))
+
+    def render(self, lookup: Callable[[str], Any]) -> JsonBody:
+        """Render the template by substituting every placeholder slot
+
+        Args:
+            lookup: The function that returns the value of a placeholder name
+
+        Returns:
+            The JsonBody object of the rendered payload
+
+        """
+        values: Dict[str, Any] = {}
+        parts = [self.literals[0]]
+        for (kind, name), literal in zip(self.slots, self.literals[1:]):
+            if name not in values:
+                values[name] = lookup(name)
+            if kind == _VALUE:
+                parts.append(json.dumps(values[name]))
+            else:
+                value = values[name]
+                parts.append(
+                    json.dumps(value if isinstance(value, str) else str(value))[1:-1]
+                )
+            parts.append(literal)
+        return JsonBody("".join(parts))
+
+
+class PayloadTemplateLibrary:
+    """All the payload templates of a directory, loaded once per process"""
+
+    # Libraries shared by every caller in the process by their directory
+    _libraries: Dict[str, "PayloadTemplateLibrary"] = {}
+    _libraries_lock = threading.Lock()
+
+    def __init__(self, directory: str) -> None:
+        """Initialize a PayloadTemplateLibrary and load every template in the directory
+
+        Args:
+            directory: The directory to load the `*.json` templates from. Templates are named by
+                their path relative to the directory without the extension (ie: orders/create)
+
+        """
+        self.directory = directory
+        self.templates: Dict[str, PayloadTemplate] = {}
+        for root, _, file_names in os.walk(directory):
+            for file_name in sorted(file_names):
+                if not file_name.endswith(".json"):
+                    continue
+                path = os.path.join(root, file_name)
+                name = os.path.relpath(path, directory)[: -len(".json")]
+                name = name.replace(os.sep, "/")
+                with open(path, encoding="utf-8") as file:
+                    self.templates[name] = PayloadTemplate(name, file.read())
+        LOGGER.debug(
+            f"Loaded {len(self.templates)} payload templates from: {directory}"
+        )
+
+    @staticmethod
+    def for_directory(directory: str) -> "PayloadTemplateLibrary":
+        """Get the shared library of a directory, loading it on first use
+
+        Args:
+            directory: The template directory
+
+        Returns:
+            The PayloadTemplateLibrary object
+
+        """
+        key = os.path.abspath(directory)
+        with PayloadTemplateLibrary._libraries_lock:
+            if key not in PayloadTemplateLibrary._libraries:
+                PayloadTemplateLibrary._libraries[key] = PayloadTemplateLibrary(key)
+            return PayloadTemplateLibrary._libraries[key]
+
+    def get(self, name: str) -> PayloadTemplate:
+        """Get a template by name
+
+        Args:
+            name: The name of the template
+
+        Returns:
+            The PayloadTemplate object
+
+        """
+        if name not in self.templates:
+            raise KeyError(
+                f"No payload template: '{name}' found in: {self.directory}. "
+                f"We found: {sorted(self.templates)}"
+            )
+        return self.templates[name]
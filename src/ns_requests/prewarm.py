@@ -0,0 +1,234 @@
+"""DNS caching and connection prewarming for the pooled sessions
+
+The first request to a host pays for DNS resolution, the TCP connect and the TLS handshake. The
+DnsCache keeps resolved addresses for the rest of the run. The ConnectionPrewarmer resolves every
+configured host and opens connections in the pooled sessions of GenericRequests on a background
+thread, so that work is done while behave is still parsing features. Connections are opened with
+a HEAD request to the URL of the host and kept in the pool. The time spent on it is recorded as the
+latency the prewarm saved the first requests.
+"""
+import logging
+import socket
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ns_requests.session_manager import SessionManager
+from urllib3.exceptions import HTTPError
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+
+class DnsCache:
+    """Process wide cache of socket.getaddrinfo results"""
+
+    def __init__(self, ttl: float = 300) -> None:
+        """Initialize a DnsCache
+
+        Args:
+            ttl: The number of seconds a resolved address is reused for
+
+        """
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[Any, ...], Tuple[float, List[Any]]] = {}
+        self._lock = threading.Lock()
+        self._original_getaddrinfo = None
+
+    def getaddrinfo(self, *args: Any, **kwargs: Any) -> List[Any]:
+        """Resolve an address the same way as socket.getaddrinfo, reusing cached results
+
+        Returns:
+            The list of address info tuples
+
+        """
+        key = args + tuple(sorted(kwargs.items()))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return list(entry[1])
+            self.misses += 1
+        resolve = self._original_getaddrinfo or socket.getaddrinfo
+        result = resolve(*args, **kwargs)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, list(result))
+        return result
+
+    def install(self) -> None:
+        """Route every socket.getaddrinfo call in the process through the cache"""
+        if self._original_getaddrinfo is None:
+            self._original_getaddrinfo = socket.getaddrinfo
+            socket.getaddrinfo = self.getaddrinfo
+            LOGGER.debug(f"Installed the DNS cache with a ttl of {self.ttl} seconds.")
+
+    def uninstall(self) -> None:
+        """Restore the original socket.getaddrinfo"""
+        if self._original_getaddrinfo is not None:
+            socket.getaddrinfo = self._original_getaddrinfo
+            self._original_getaddrinfo = None
+
+    def stats(self) -> Dict[str, int]:
+        """Get the cache counters
+
+        Returns:
+            A dict with the cache hits, misses and the number of cached entries
+
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+class ConnectionPrewarmer:
+    """Opens pooled connections to a set of hosts on a background thread"""
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        session_manager: SessionManager,
+        connections_per_host: int = 1,
+        timeout: float = 5,
+    ) -> None:
+        """Initialize a ConnectionPrewarmer
+
+        Args:
+            urls: The URLs (or base URLs) of the hosts to prewarm. Duplicate hosts are warmed once
+            session_manager: The session manager whose pooled sessions get the connections
+            connections_per_host: The number of connections to open to each host
+            timeout: The number of seconds to wait for each connection
+
+        """
+        hosts: Dict[str, str] = {}
+        for url in urls:
+            if url and urlsplit(url).hostname:
+                hosts.setdefault(SessionManager._pool_key(url)[0], url)
+        self.urls = list(hosts.values())
+        self.session_manager = session_manager
+        self.connections_per_host = connections_per_host
+        self.timeout = timeout
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "ConnectionPrewarmer":
+        """Start prewarming on a background thread
+
+        Returns:
+            The same prewarmer object
+
+        """
+        self._thread = threading.Thread(
+            target=self.run, name="connection-prewarmer", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def wait(self, timeout: float = None) -> bool:
+        """Wait for the background prewarm to finish
+
+        Args:
+            timeout: (OPTIONAL) The number of seconds to wait. Waits until it is done if None
+
+        Returns:
+            True if the prewarm is done
+
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def run(self) -> None:
+        """Resolve and connect to every host"""
+        for url in self.urls:
+            self.results[url] = self._prewarm(url)
+        LOGGER.debug(f"Connection prewarm finished: {self.stats()}")
+
+    def _prewarm(self, url: str) -> Dict[str, Any]:
+        """Resolve a host and open connections to it in its pooled session
+
+        NOTE: This method is private and for internal class use only.
+
+        Args:
+            url: The URL of the host
+
+        Returns:
+            A dict of the DNS and connect time in milliseconds, the number of connections opened
+            and the error if the prewarm failed
+
+        """
+        result: Dict[str, Any] = {"dns_ms": 0.0, "connect_ms": 0.0, "connections": 0}
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        try:
+            start = time.perf_counter()
+            socket.getaddrinfo(parts.hostname, port, 0, socket.SOCK_STREAM)
+            result["dns_ms"] = (time.perf_counter() - start) * 1000
+
+            session = self.session_manager.get_session(url)
+            adapter = session.get_adapter(url)
+            pool = adapter.poolmanager.connection_from_url(url)
+            # Verify certificates the same way the adapter does when it sends a request
+            adapter.cert_verify(pool, url, session.verify, session.cert)
+            # Hold a HEAD response per connection so every one opens its own, then release them
+            # all back to the pool as idle keep-alive connections
+            responses = []
+            start = time.perf_counter()
+            try:
+                for _ in range(self.connections_per_host):
+                    responses.append(
+                        pool.urlopen(
+                            "HEAD",
+                            parts.path or "/",
+                            retries=False,
+                            redirect=False,
+                            timeout=self.timeout,
+                            preload_content=False,
+                            release_conn=False,
+                        )
+                    )
+                    result["connections"] += 1
+            finally:
+                result["connect_ms"] = (time.perf_counter() - start) * 1000
+                for response in responses:
+                    response.read()
+                    response.release_conn()
+        except (OSError, ValueError, HTTPError) as error:
+            LOGGER.debug(f"Could not prewarm connections to: {url}. Error: {error}")
+            result["error"] = f"{type(error).__name__}: {error}"
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the prewarm timings
+
+        Returns:
+            A dict with the number of hosts and connections warmed, the total DNS and connect time
+            in milliseconds, the time saved (the sum of both for the hosts that were warmed) and
+            the errors by URL
+
+        """
+        results = dict(self.results)
+        warmed = [result for result in results.values() if result["connections"]]
+        dns_ms = sum(result["dns_ms"] for result in results.values())
+        connect_ms = sum(result["connect_ms"] for result in results.values())
+        return {
+            "hosts": len(warmed),
+            "connections": sum(result["connections"] for result in warmed),
+            "dns_ms": round(dns_ms, 3),
+            "connect_ms": round(connect_ms, 3),
+            "saved_ms": round(
+                sum(result["dns_ms"] + result["connect_ms"] for result in warmed), 3
+            ),
+            "errors": {
+                url: result["error"]
+                for url, result in results.items()
+                if "error" in result
+            },
+        }
@@ -0,0 +1,99 @@
+"""Full request and response body logs written on a background thread
+
+Formatting and writing large bodies on the thread that sends the requests slows the requests down.
+A BodyLog takes the raw bodies off a queue and pretty prints them to its file on its own thread, so
+logging a body only costs the request thread a queue put.
+"""
+import json
+import logging
+import queue
+import threading
+from typing import Any, Optional, Tuple
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+
+def truncate(text: str, limit: int) -> str:
+    """Cut a text down to a maximum number of characters
+
+    Args:
+        text: The text to cut
+        limit: The maximum number of characters to keep. 0 keeps the whole text
+
+    Returns:
+        The text, ending with a note of how many characters were cut if it was too long
+
+    """
+    if not limit or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... ({len(text) - limit} more characters)"
+
+
+class BodyLog:
+    """Writes full request and response bodies to a file on a background thread"""
+
+    def __init__(self, path: str) -> None:
+        """Initialize a BodyLog and start its writer thread
+
+        Args:
+            path: The file to append the bodies to
+
+        """
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._queue: "queue.Queue[Optional[Tuple[str, Any]]]" = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._write_bodies, name="body-log-writer", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, title: str, body: Any) -> None:
+        """Queue a body to be written
+
+        Args:
+            title: The line written before the body
+            body: The body. Dicts and lists are written as JSON and bytes are decoded. It must not
+                be changed after it was queued
+
+        """
+        self._queue.put((title, body))
+
+    @staticmethod
+    def _format(body: Any) -> str:
+        """Pretty print a body
+
+        Args:
+            body: The body to format
+
+        Returns:
+            The formatted body
+
+        """
+        if isinstance(body, (bytes, bytearray)):
+            body = body.decode("utf-8", errors="replace")
+            try:
+                body = json.loads(body)
+            except ValueError:
+                return body
+        if isinstance(body, str):
+            return body
+        return json.dumps(body, sort_keys=True, indent=2, default=repr)
+
+    def _write_bodies(self) -> None:
+        """Write every queued body until the log is closed"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            title, body = item
+            try:
+                self._file.write(f"{title}\n{self._format(body)}\n\n")
+            except (OSError, TypeError, ValueError) as error:
+                LOGGER.debug(f"Could not write a body to: {self.path}. Error: {error}")
+
+    def close(self) -> None:
+        """Write the rest of the queued bodies and close the file"""
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
@@ -0,0 +1,301 @@
+"""Per-request timing breakdown of REST requests
+
+The pooled sessions of GenericRequests use connection classes that time every phase of a request:
+DNS resolution, the TCP connect, the TLS handshake and the time to the first byte of the response.
+The phases are recorded on a thread local RequestTiming that GenericRequests starts before it sends
+a request and attaches to the response as `timing` once the body is downloaded. A reused keep-alive
+connection records no DNS, connect or TLS time.
+
+Every timing is also added to the process wide RequestTimingLog, which keeps a latency histogram
+per endpoint for an end of run summary.
+"""
+import logging
+import re
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ns_requests.latency_histogram import LatencyHistogram
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+# Path segments that hold ids. They are collapsed so requests to the same endpoint share a summary
+_ID_SEGMENT = re.compile(
+    r"^(?:[0-9]+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})$"
+)
+
+# The timing of the request being sent on each thread
+_local = threading.local()
+
+
+class RequestTiming:
+    """The timing breakdown of a single request in milliseconds"""
+
+    def __init__(self) -> None:
+        """Initialize a RequestTiming"""
+        self.dns_ms = 0.0
+        self.connect_ms = 0.0
+        self.tls_ms = 0.0
+        self.ttfb_ms: Optional[float] = None
+        self.download_ms: Optional[float] = None
+        self.total_ms: Optional[float] = None
+        self.bytes_sent = 0
+        self.bytes_received: Optional[int] = None
+        self.started = time.perf_counter()
+        self._request_sent: Optional[float] = None
+        self._headers_received: Optional[float] = None
+
+    @staticmethod
+    def start() -> "RequestTiming":
+        """Start timing a request sent on the current thread
+
+        Returns:
+            The new RequestTiming object
+
+        """
+        _local.timing = RequestTiming()
+        return _local.timing
+
+    @staticmethod
+    def current() -> Optional["RequestTiming"]:
+        """Get the timing of the request being sent on the current thread
+
+        Returns:
+            The RequestTiming object, or None if no request is being timed
+
+        """
+        return getattr(_local, "timing", None)
+
+    def finish(self, bytes_received: Optional[int] = None) -> "RequestTiming":
+        """Stop timing the request once its body is downloaded
+
+        Args:
+            bytes_received: (OPTIONAL) The number of body bytes read from the connection. None if
+                the body was not downloaded yet
+
+        Returns:
+            The same RequestTiming object
+
+        """
+        end = time.perf_counter()
+        self.total_ms = (end - self.started) * 1000
+        if self._headers_received is not None and bytes_received is not None:
+            self.download_ms = (end - self._headers_received) * 1000
+        self.bytes_received = bytes_received
+        if getattr(_local, "timing", None) is self:
+            _local.timing = None
+        return self
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the timing breakdown
+
+        Returns:
+            A dict of every phase in milliseconds and the bytes sent and received
+
+        """
+        return {
+            "dns_ms": round(self.dns_ms, 3),
+            "connect_ms": round(self.connect_ms, 3),
+            "tls_ms": round(self.tls_ms, 3),
+            "ttfb_ms": None if self.ttfb_ms is None else round(self.ttfb_ms, 3),
+            "download_ms": None
+            if self.download_ms is None
+            else round(self.download_ms, 3),
+            "total_ms": None if self.total_ms is None else round(self.total_ms, 3),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+        }
+
+    def __repr__(self) -> str:
+        """Representation of the timing breakdown"""
+        return f"<RequestTiming {self.as_dict()}>"
+
+
+class _TimedConnectionMixin:
+    """Records the phases of a urllib3 connection on the timing of the current thread"""
+
+    def _new_conn(self) -> socket.socket:
+        """Resolve the host and open the TCP connection, timing both
+
+        Returns:
+            The connected socket
+
+        """
+        timing = RequestTiming.current()
+        if timing is None:
+            return super()._new_conn()
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(
+                self._dns_host, self.port, 0, socket.SOCK_STREAM
+            )
+        except OSError:
+            # Let urllib3 resolve the host again and raise its own error
+            return super()._new_conn()
+        connected = time.perf_counter()
+        timing.dns_ms += (connected - start) * 1000
+        host = self._dns_host
+        error = None
+        try:
+            # Connect to the resolved addresses in order so the host is not resolved again
+            for address in dict.fromkeys(info[4][0] for info in addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except NewConnectionError as connection_error:
+                    error = connection_error
+            raise error
+        finally:
+            self._dns_host = host
+            timing.connect_ms += (time.perf_counter() - connected) * 1000
+
+    def putrequest(self, *args: Any, **kwargs: Any) -> None:
+        """Mark the start of sending a request"""
+        timing = RequestTiming.current()
+        if timing is not None:
+            timing._request_sent = time.perf_counter()
+        return super().putrequest(*args, **kwargs)
+
+    def send(self, data: Any) -> None:
+        """Send data over the connection, counting the bytes sent
+
+        Args:
+            data: The bytes or file-like object to send
+
+        """
+        timing = RequestTiming.current()
+        if timing is not None and isinstance(data, (bytes, bytearray, memoryview)):
+            timing.bytes_sent += len(data)
+        return super().send(data)
+
+    def getresponse(self, *args: Any, **kwargs: Any) -> Any:
+        """Wait for the response headers, timing the time to the first byte
+
+        Returns:
+            The http.client response object
+
+        """
+        response = super().getresponse(*args, **kwargs)
+        timing = RequestTiming.current()
+        if timing is not None and timing._request_sent is not None:
+            timing._headers_received = time.perf_counter()
+            timing.ttfb_ms = (timing._headers_received - timing._request_sent) * 1000
+        return response
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    """HTTP connection that records its timing"""
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    """HTTPS connection that records its timing"""
+
+    def connect(self) -> None:
+        """Connect to the host. Any time spent after the TCP connect is the TLS handshake"""
+        timing = RequestTiming.current()
+        if timing is None:
+            return super().connect()
+        start = time.perf_counter()
+        before = timing.dns_ms + timing.connect_ms
+        try:
+            super().connect()
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            timing.tls_ms += max(
+                elapsed - (timing.dns_ms + timing.connect_ms - before), 0
+            )
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    """HTTP connection pool of timed connections"""
+
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    """HTTPS connection pool of timed connections"""
+
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """Transport adapter whose pooled connections record their timing"""
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the pool manager with the timed connection pools"""
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+class RequestTimingLog:
+    """Process wide latency histograms of every timed request by endpoint"""
+
+    _lock = threading.Lock()
+    _histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    @staticmethod
+    def endpoint(url: str) -> str:
+        """Get the endpoint of a URL with its id path segments collapsed
+
+        Args:
+            url: The URL of the request
+
+        Returns:
+            The host and path of the URL with ids replaced by {id} (ie: api.com/orders/{id})
+
+        """
+        parts = urlsplit(url)
+        segments = [
+            "{id}" if _ID_SEGMENT.match(segment) else segment
+            for segment in parts.path.split("/")
+        ]
+        return f"{parts.netloc}{'/'.join(segments)}"
+
+    @staticmethod
+    def record(method: str, url: str, timing: RequestTiming) -> None:
+        """Add the total time of a request to the histogram of its endpoint
+
+        Args:
+            method: The method of the request
+            url: The URL of the request
+            timing: The finished timing of the request
+
+        """
+        if timing.total_ms is None:
+            return
+        key = (method.upper(), RequestTimingLog.endpoint(url))
+        with RequestTimingLog._lock:
+            histogram = RequestTimingLog._histograms.get(key)
+            if histogram is None:
+                histogram = RequestTimingLog._histograms[key] = LatencyHistogram()
+            histogram.record(timing.total_ms)
+
+    @staticmethod
+    def summary() -> Dict[Tuple[str, str], Dict[str, float]]:
+        """Get the latency statistics of every endpoint
+
+        Returns:
+            A dict of the latency summary and request count by (method, endpoint)
+
+        """
+        with RequestTimingLog._lock:
+            return {
+                key: dict(histogram.summary(), count=histogram.total_count)
+                for key, histogram in sorted(RequestTimingLog._histograms.items())
+            }
+
+    @staticmethod
+    def reset() -> None:
+        """Forget every recorded timing"""
+        with RequestTimingLog._lock:
+            RequestTimingLog._histograms = {}
@@ -0,0 +1,184 @@
+"""Pooled HTTP session manager used by the generic request functions
+
+Creating a new requests.Session for every request throws away keep-alive connections, so every
+request pays for a fresh TCP/TLS handshake. This module keeps one tuned session per (host, user)
+pair so connections are reused across steps and scenarios.
+
+The shared session of a host with no user never keeps cookies set by the server, so requests sent
+through it stay independent of each other the same as requests sent with a new session.
+"""
+from http.cookiejar import DefaultCookiePolicy
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from ns_requests.request_timing import TimedHTTPAdapter
+import requests
+from requests.adapters import HTTPAdapter, Retry
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+
+class SessionManager:
+    """Holds one pooled requests.Session per (host, user) pair"""
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 20,
+        max_retries: int = 0,
+        backoff_factor: float = 0.0,
+        keep_alive: bool = True,
+    ) -> None:
+        """Initialize a SessionManager
+
+        Args:
+            pool_connections: The number of host connection pools to cache per session
+            pool_maxsize: The maximum number of connections to keep in each host pool
+            max_retries: The number of times a failed connection is retried
+            backoff_factor: The backoff factor applied between retries
+            keep_alive: Whether connections should be kept open between requests
+
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.keep_alive = keep_alive
+        self.hits = 0
+        self.misses = 0
+        self._sessions: Dict[Tuple[str, Optional[str]], requests.Session] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _pool_key(url: str, user: str = None) -> Tuple[str, Optional[str]]:
+        """Build the key a session is pooled under
+
+        Args:
+            url: The URL (or base URL) the session will send requests to
+            user: (OPTIONAL) The test user the session belongs to
+
+        Returns:
+            A tuple of the scheme + host of the URL and the user
+
+        """
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower(), user
+
+    def _make_adapter(self) -> HTTPAdapter:
+        """Create a transport adapter with the configured pool sizes and retries
+
+        Returns:
+            The tuned HTTPAdapter. Its connections record the timing of every request
+
+        """
+        retries = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            raise_on_status=False,
+        )
+        return TimedHTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=retries,
+        )
+
+    def tune_session(self, session: requests.Session) -> requests.Session:
+        """Mount the pooled transport adapters on a session
+
+        Only the default adapters of requests are replaced. Custom adapters of a session created
+        elsewhere (ie: with client certificates, retries or a mocked transport) are kept.
+
+        Args:
+            session: The session to tune
+
+        Returns:
+            The same session object
+
+        """
+        for prefix in ("http://", "https://"):
+            if type(session.adapters.get(prefix)) is HTTPAdapter:
+                session.mount(prefix, self._make_adapter())
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def get_session(self, url: str, user: str = None) -> requests.Session:
+        """Get the pooled session for a URL and user, creating it on first use
+
+        Args:
+            url: The URL (or base URL) the session will send requests to
+            user: (OPTIONAL) The test user the session belongs to
+
+        Returns:
+            The pooled requests.Session object. It only keeps cookies between requests if it
+            belongs to a user
+
+        """
+        key = self._pool_key(url, user)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                self.hits += 1
+                return session
+            self.misses += 1
+            LOGGER.debug(
+                f"Creating a new pooled session for host: {key[0]} user: {user}"
+            )
+            session = self.tune_session(requests.Session())
+            if user is None:
+                # No domain is allowed, so cookies set by responses are never stored or sent
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            self._sessions[key] = session
+            return session
+
+    def register_session(
+        self, url: str, session: requests.Session, user: str = None
+    ) -> requests.Session:
+        """Tune an existing session and pool it under a URL and user
+
+        This is used for sessions that were created elsewhere, like authenticated test user clients.
+        Their custom transport adapters are kept.
+
+        Args:
+            url: The URL (or base URL) the session will send requests to
+            session: The session to pool
+            user: (OPTIONAL) The test user the session belongs to
+
+        Returns:
+            The tuned session
+
+        """
+        key = self._pool_key(url, user)
+        with self._lock:
+            if self._sessions.get(key) is session:
+                self.hits += 1
+                return session
+            self.misses += 1
+            self._sessions[key] = self.tune_session(session)
+            return session
+
+    def stats(self) -> Dict[str, int]:
+        """Get the pool counters
+
+        Returns:
+            A dict with the pool hits, misses and the number of pooled sessions
+
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "sessions": len(self._sessions),
+            }
+
+    def close(self) -> None:
+        """Close every pooled session and reset the counters"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+            self.hits = 0
+            self.misses = 0
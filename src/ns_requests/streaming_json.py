@@ -0,0 +1,173 @@
+"""Streaming JSON reader for very large REST responses
+
+The body of a streamed response is spooled to a temporary file in chunks and then read with the
+ijson incremental parser, so the whole document is never held in memory. Every lookup is a single
+pass over the parser events that stops as soon as the answer is known.
+
+Paths are given as the plain path segments of a compiled JSONPath expression (ie: ("a", "0", "b")
+for `$.a[0].b`). Array positions are matched by their canonical decimal index.
+"""
+import logging
+import tempfile
+from typing import Any, IO, Iterator, Optional, Tuple
+
+import ijson
+from ijson.common import ObjectBuilder
+import requests
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+# Events that begin a value in the ijson event stream
+_VALUE_EVENTS = (
+    "start_map",
+    "start_array",
+    "null",
+    "boolean",
+    "integer",
+    "double",
+    "number",
+    "string",
+)
+
+
+class StreamingJsonReader:
+    """Incremental JSON reader over the body of a streamed response"""
+
+    def __init__(self, response: requests.Response, chunk_size: int = 65536) -> None:
+        """Initialize a StreamingJsonReader
+
+        Args:
+            response: The response sent with stream=True
+            chunk_size: The number of bytes read from the response at a time
+
+        """
+        self.response = response
+        self.chunk_size = chunk_size
+        self.size_in_bytes = 0
+        self._file: Optional[IO[bytes]] = None
+
+    def _spool(self) -> IO[bytes]:
+        """Spool the response body to a temporary file on first use
+
+        Returns:
+            The temporary file rewound to the start
+
+        """
+        if self._file is None:
+            self._file = tempfile.TemporaryFile()
+            for chunk in self.response.iter_content(chunk_size=self.chunk_size):
+                self._file.write(chunk)
+                self.size_in_bytes += len(chunk)
+            self.response.close()
+            LOGGER.debug(
+                f"Spooled {self.size_in_bytes} bytes of the streamed response."
+            )
+        self._file.seek(0)
+        return self._file
+
+    def _events(self) -> Iterator[Tuple[Tuple[str, ...], str, Any]]:
+        """Iterate over the parser events with the path of every value
+
+        Yields:
+            Tuples of the path, event and value. The path of a value event is the path of the value
+            itself. The path of a map_key or end event is the path of its container
+
+        """
+        keys = []
+        kinds = []
+        for _, event, value in ijson.parse(self._spool(), use_float=True):
+            if event == "map_key":
+                keys[-1] = value
+                yield tuple(str(key) for key in keys[:-1]), event, value
+                continue
+            if event in ("end_map", "end_array"):
+                kinds.pop()
+                keys.pop()
+                yield tuple(str(key) for key in keys), event, None
+                continue
+            if kinds and kinds[-1] == "array":
+                keys[-1] += 1
+            yield tuple(str(key) for key in keys), event, value
+            if event == "start_map":
+                kinds.append("map")
+                keys.append(None)
+            elif event == "start_array":
+                kinds.append("array")
+                keys.append(-1)
+
+    def find(self, segments: Tuple[str, ...]) -> Tuple[bool, Any]:
+        """Find the value at a path
+
+        Only the value found is built in memory.
+
+        Args:
+            segments: The plain path segments
+
+        Returns:
+            A tuple of whether the path was found and the value at the path
+
+        """
+        builder = None
+        for path, event, value in self._events():
+            if builder is not None:
+                builder.event(event, value)
+                if event in ("end_map", "end_array") and path == segments:
+                    return True, builder.value
+            elif path == segments and event in _VALUE_EVENTS:
+                if event in ("start_map", "start_array"):
+                    builder = ObjectBuilder()
+                    builder.event(event, value)
+                else:
+                    return True, value
+        return False, None
+
+    def contains(self, segments: Tuple[str, ...]) -> bool:
+        """Check whether a path is present without building its value
+
+        Args:
+            segments: The plain path segments
+
+        Returns:
+            True if the path was found
+
+        """
+        for path, event, _ in self._events():
+            if path == segments and event in _VALUE_EVENTS:
+                return True
+        return False
+
+    def size(self, segments: Tuple[str, ...]) -> Optional[int]:
+        """Count the items of the collection at a path without building it
+
+        Args:
+            segments: The plain path segments
+
+        Returns:
+            The number of items or keys in the collection. None if the path was not found. Raises a
+            TypeError if the value at the path is not a collection
+
+        """
+        depth = len(segments)
+        count = None
+        for path, event, _ in self._events():
+            if count is None:
+                if path == segments and event in _VALUE_EVENTS:
+                    if event not in ("start_map", "start_array"):
+                        raise TypeError(
+                            f"No dict or list found at path: {'.'.join(segments)}. We found: {event}"
+                        )
+                    count = 0
+            elif event in ("end_map", "end_array"):
+                if path == segments:
+                    return count
+            elif len(path) == depth + 1 and event in _VALUE_EVENTS:
+                count += 1
+        return count
+
+    def close(self) -> None:
+        """Delete the spooled body and release the connection of a body that was never read"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.response.close()
@@ -0,0 +1,361 @@
+"""In-process stub HTTP server that stands in for downstream services
+
+The StubServer answers requests from a table of routes that feature files configure at run time. A
+route matches a method and a URL path, where `*` in the path matches any characters (ie:
+/orders/*). Routes added later take precedence, so a scenario can override a default route.
+Unmatched requests are answered with a 404.
+
+Every route can delay its response by a fixed latency, which makes the stub a predictable target
+for benchmarking the request and assertion pipeline. The server uses a thread per keep-alive
+connection with Nagle's algorithm disabled and writes each response with a single send, so it
+answers thousands of requests per second on a laptop.
+"""
+from collections import deque
+import fnmatch
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+import logging
+import re
+from socketserver import ThreadingMixIn
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Pattern
+
+# Initialize a logger
+LOGGER = logging.getLogger(__name__)
+
+
+class StubRoute:
+    """A canned response for the requests that match a method and path"""
+
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        status: int = 200,
+        body: Any = None,
+        headers: Dict[str, str] = None,
+        latency_ms: float = None,
+    ) -> None:
+        """Initialize a StubRoute
+
+        Args:
+            method: The HTTP method to match. * matches every method
+            path: The URL path to match without the query string. * matches any characters
+            status: The status code of the response
+            body: (OPTIONAL) The response body. Dicts and lists are sent as JSON
+            headers: (OPTIONAL) The response headers. The Content-Type defaults to
+                application/json if the body is JSON and to text/plain otherwise
+            latency_ms: (OPTIONAL) The milliseconds to wait before responding. Uses the default
+                latency of the server if None
+
+        """
+        self.method = method.upper()
+        self.path = path
+        self.status = status
+        self.latency_ms = latency_ms
+        self.headers = dict(headers or {})
+        if body is None:
+            self.body = b""
+        elif isinstance(body, bytes):
+            self.body = body
+        elif isinstance(body, str):
+            self.body = body.encode("utf-8")
+        else:
+            self.body = json.dumps(body).encode("utf-8")
+        if self.body and not any(
+            name.lower() == "content-type" for name in self.headers
+        ):
+            self.headers["Content-Type"] = StubRoute.content_type(self.body)
+        self._pattern: Pattern = re.compile(
+            fnmatch.translate(path.split("?", 1)[0]), re.IGNORECASE
+        )
+
+    @staticmethod
+    def content_type(body: bytes) -> str:
+        """Get the default Content-Type of a response body
+
+        Args:
+            body: The encoded response body
+
+        Returns:
+            application/json if the body parses as JSON, text/plain otherwise
+
+        """
+        try:
+            json.loads(body.decode("utf-8"))
+        except ValueError:
+            return "text/plain; charset=utf-8"
+        return "application/json"
+
+    def matches(self, method: str, path: str) -> bool:
+        """Check whether a request matches the route
+
+        Args:
+            method: The method of the request
+            path: The path of the request without the query string
+
+        Returns:
+            True if the route answers the request
+
+        """
+        return self.method in ("*", method) and bool(self._pattern.match(path))
+
+    def __repr__(self) -> str:
+        """Representation of the route"""
+        return f"<StubRoute {self.method} {self.path} -> {self.status}>"
+
+
+class StubRequest:
+    """A request that was received by the stub server"""
+
+    def __init__(
+        self, method: str, path: str, headers: Dict[str, str], body: bytes
+    ) -> None:
+        """Initialize a StubRequest
+
+        Args:
+            method: The method of the request
+            path: The full path of the request including the query string
+            headers: The request headers
+            body: The request body
+
+        """
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        """Decode the request body
+
+        Returns:
+            The decoded JSON body
+
+        """
+        return json.loads(self.body)
+
+    def __repr__(self) -> str:
+        """Representation of the request"""
+        return f"<StubRequest {self.method} {self.path} {len(self.body)} bytes>"
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    """Answers every request from the routes of the stub server"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def _respond(self) -> None:
+        """Answer the request with the first matching route"""
+        try:
+            body = self._read_body()
+        except ValueError:
+            # The rest of the connection can not be parsed after a malformed body
+            self.close_connection = True
+            self.send_error(400, "Malformed request body")
+            return
+        self.server.stub.handle(self, body)
+
+    def _read_body(self) -> bytes:
+        """Read the whole request body so the next request on the connection starts after it
+
+        Returns:
+            The request body. Chunked bodies are decoded
+
+        """
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            chunks = []
+            while True:
+                size = int(self.rfile.readline(65537).split(b";", 1)[0].strip(), 16)
+                if not size:
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline(65537)
+            # Skip any trailers up to the blank line that ends the body
+            while self.rfile.readline(65537) not in (b"\r\n", b"\n", b""):
+                pass
+            return b"".join(chunks)
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    do_GET = _respond
+    do_POST = _respond
+    do_PUT = _respond
+    do_PATCH = _respond
+    do_DELETE = _respond
+    do_OPTIONS = _respond
+    do_HEAD = _respond
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Keep the access log out of the test output"""
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """HTTP server with a daemon thread per connection"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class StubServer:
+    """Local HTTP server that answers requests from configurable routes"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0,
+        history_size: int = 1000,
+    ) -> None:
+        """Initialize a StubServer
+
+        Args:
+            host: The host to bind to
+            port: The port to bind to. 0 binds a free port
+            latency_ms: The default milliseconds to wait before every response
+            history_size: The number of received requests to keep for assertions
+
+        """
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.routes: List[StubRoute] = []
+        self.requests: Deque[StubRequest] = deque(maxlen=history_size)
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server: Optional[_ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """The base URL of the running server"""
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> "StubServer":
+        """Start serving on a background thread
+
+        Returns:
+            The same StubServer object
+
+        """
+        self._server = _ThreadingHTTPServer((self.host, self.port), _StubRequestHandler)
+        self._server.stub = self
+        self.port = self._server.server_port
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="stub-server", daemon=True
+        )
+        self._thread.start()
+        LOGGER.debug(f"Started the stub server at: {self.url}")
+        return self
+
+    def stop(self) -> None:
+        """Stop the server and close its socket"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        LOGGER.debug(
+            f"Stopped the stub server at: {self.url}. It answered {self.request_count} requests"
+        )
+
+    def add_route(self, route: StubRoute) -> StubRoute:
+        """Add a route. It takes precedence over every route added before it
+
+        Args:
+            route: The route to add
+
+        Returns:
+            The same StubRoute object
+
+        """
+        with self._lock:
+            self.routes.insert(0, route)
+        return route
+
+    def reset(self) -> None:
+        """Remove every route and forget the received requests"""
+        with self._lock:
+            self.routes = []
+            self.requests.clear()
+            self.request_count = 0
+
+    def find_route(self, method: str, path: str) -> Optional[StubRoute]:
+        """Find the route that answers a request
+
+        Args:
+            method: The method of the request
+            path: The path of the request. The query string is ignored
+
+        Returns:
+            The matching StubRoute object, or None if no route matches
+
+        """
+        path = path.split("?", 1)[0]
+        with self._lock:
+            routes = self.routes
+        for route in routes:
+            if route.matches(method.upper(), path):
+                return route
+        return None
+
+    def received(self, method: str = "*", path: str = "*") -> List[StubRequest]:
+        """Get the received requests that match a method and path
+
+        Args:
+            method: The method to match. * matches every method
+            path: The path to match without the query string. * matches any characters
+
+        Returns:
+            The list of matching StubRequest objects, oldest first
+
+        """
+        route = StubRoute(method, path)
+        with self._lock:
+            requests = list(self.requests)
+        return [
+            request
+            for request in requests
+            if route.matches(request.method, request.path.split("?", 1)[0])
+        ]
+
+    def handle(self, handler: BaseHTTPRequestHandler, body: bytes) -> None:
+        """Record a request and send the response of its route
+
+        Args:
+            handler: The request handler of the connection
+            body: The request body
+
+        """
+        method = handler.command
+        with self._lock:
+            self.request_count += 1
+            self.requests.append(
+                StubRequest(method, handler.path, dict(handler.headers), body)
+            )
+        route = self.find_route(method, handler.path)
+        if route is None:
+            status = 404
+            response_body = json.dumps(
+                {"message": f"No stub route for {method} {handler.path}"}
+            ).encode("utf-8")
+            headers = {"Content-Type": "application/json"}
+            latency_ms = self.latency_ms
+        else:
+            status = route.status
+            response_body = route.body
+            headers = route.headers
+            latency_ms = (
+                self.latency_ms if route.latency_ms is None else route.latency_ms
+            )
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        # Build the whole response so it is written with a single send
+        lines = [f"HTTP/1.1 {status} {handler.responses.get(status, ('',))[0]}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        lines.append(f"Content-Length: {len(response_body)}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        handler.wfile.write(head if method == "HEAD" else head + response_body)
@@ -0,0 +1,65 @@
+"""Tests of the step executor of the setup and teardown scenarios"""
+from behave.configuration import Configuration
+from behave.model_core import Status
+from behave.parser import parse_feature
+from behave.runner import Context, ModelRunner
+from behave.step_registry import StepRegistry
+from ns_behave.common.environment_functions import execute_scenario_by_steps
+import pytest
+
+FEATURE = """
+Feature: Setup
+
+  Scenario: Setup steps
+    Given a first step
+    And a second step
+"""
+
+
+def _make_context(first_step, hooks=None):
+    """Build a behave runner and context whose registry has a first and a second step
+
+    The context only holds a weak reference to its runner, so the runner is returned as well.
+    """
+    config = Configuration([], load_config=False)
+    registry = StepRegistry()
+    registry.add_step_definition("given", "a first step", first_step)
+    registry.add_step_definition(
+        "given", "a second step", lambda ctx: ctx.calls.append("second")
+    )
+    runner = ModelRunner(config, step_registry=registry)
+    runner.hooks = hooks or {}
+    ctx = Context(runner)
+    runner.context = ctx
+    ctx.calls = []
+    return runner, ctx, parse_feature(FEATURE).scenarios[0]
+
+
+def test_failing_before_step_hook_skips_the_step() -> None:
+    """A failed before_step hook fails the step without running its step function"""
+
+    def before_step(ctx, step):
+        raise RuntimeError("hook failed")
+
+    runner, ctx, scenario = _make_context(
+        lambda ctx: ctx.calls.append("first"), hooks={"before_step": before_step}
+    )
+    with pytest.raises(AssertionError, match="FAILED SUB-STEP: Given a first step"):
+        execute_scenario_by_steps(ctx, scenario)
+    assert ctx.calls == []
+    assert scenario.steps[0].status == Status.failed
+    assert "hook failed" in scenario.steps[0].error_message
+
+
+def test_step_that_skips_itself_stays_skipped() -> None:
+    """A step that marks itself skipped is not reported as passed and does not fail the scenario"""
+
+    def first_step(ctx):
+        ctx.calls.append("first")
+        scenario.steps[0].status = Status.skipped
+
+    runner, ctx, scenario = _make_context(first_step)
+    execute_scenario_by_steps(ctx, scenario)
+    assert ctx.calls == ["first", "second"]
+    assert scenario.steps[0].status == Status.skipped
+    assert scenario.steps[1].status == Status.passed
@@ -0,0 +1,20 @@
+"""Tests of the parallel execution of Scenario Outline rows"""
+from behave.configuration import Configuration
+from behave.runner import Context, ModelRunner
+from ns_behave.common.parallel_examples import ParallelExamples
+import requests
+
+
+def test_row_context_shares_test_user_clients() -> None:
+    """A row gets its own copy of test_users that holds the same pooled clients"""
+    config = Configuration([], load_config=False)
+    ctx = Context(ModelRunner(config))
+    client = requests.Session()
+    ctx.test_users = {"admin": {"client": client, "roles": ["admin"]}}
+
+    row_ctx = ParallelExamples._copy_context(ctx, ModelRunner(config))
+
+    assert row_ctx.test_users is not ctx.test_users
+    assert row_ctx.test_users["admin"] is not ctx.test_users["admin"]
+    assert row_ctx.test_users["admin"]["roles"] == ["admin"]
+    assert row_ctx.test_users["admin"]["client"] is client
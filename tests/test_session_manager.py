@@ -0,0 +1,19 @@
+"""Tests of the pool of requests sessions"""
+from ns_requests.request_timing import TimedHTTPAdapter
+from ns_requests.session_manager import SessionManager
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CustomAdapter(HTTPAdapter):
+    """A transport adapter set up by the creator of a session"""
+
+
+def test_register_session_keeps_custom_adapters() -> None:
+    """Only the default adapters of a registered session are replaced by pooled ones"""
+    session = requests.Session()
+    adapter = CustomAdapter()
+    session.mount("https://", adapter)
+    SessionManager().register_session("https://example.com", session, user="admin")
+    assert session.adapters["https://"] is adapter
+    assert isinstance(session.adapters["http://"], TimedHTTPAdapter)
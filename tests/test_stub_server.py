@@ -0,0 +1,28 @@
+"""Tests of the routes of the stub server"""
+from ns_requests.stub_server import StubRoute
+
+
+def test_route_content_type_defaults_to_the_body() -> None:
+    """A route without a Content-Type header gets one from its body"""
+    assert (
+        StubRoute("GET", "/a", body={"a": 1}).headers["Content-Type"]
+        == "application/json"
+    )
+    assert (
+        StubRoute("GET", "/a", body='{"a": 1}').headers["Content-Type"]
+        == "application/json"
+    )
+    assert (
+        StubRoute("GET", "/a", body="ok")
+        .headers["Content-Type"]
+        .startswith("text/plain")
+    )
+    assert "Content-Type" not in StubRoute("GET", "/a").headers
+
+
+def test_route_keeps_its_content_type() -> None:
+    """A Content-Type header of the route is not replaced"""
+    route = StubRoute(
+        "GET", "/a", body="<a/>", headers={"content-type": "application/xml"}
+    )
+    assert route.headers == {"content-type": "application/xml"}